@@ -0,0 +1,54 @@
+# Gunicorn Configuration for ASGI (uvicorn workers)
+#
+#   gunicorn -c gunicorn_config_asgi.py homework_scraper.asgi:application
+#
+# Same sizing, environment overrides, logging and hooks as
+# gunicorn_config_optimized.py, so both modes get the same workers and the
+# same memory budget. Each worker runs one event loop instead of a thread
+# pool: the async views (homework_scraper/async_views.py) wait on Google and
+# shell commands without holding a thread, and sync views still run in
+# Django's thread pool. GUNICORN_THREADS has no effect here.
+#
+# Needs uvicorn and httpx; the worker class comes from the uvicorn-worker
+# package, or from uvicorn itself on versions that still bundle it.
+import os
+import signal
+import sys
+
+# gunicorn loads config files by path; make the shared config importable
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gunicorn_config_optimized import *  # noqa: F401,F403
+from gunicorn_config_optimized import MB, _rss_bytes, max_rss_bytes
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:
+    from uvicorn.workers import UvicornWorker
+
+
+class RecyclingUvicornWorker(UvicornWorker):
+    """Uvicorn worker that restarts itself past GUNICORN_MAX_RSS_MB"""
+
+    # gunicorn only calls post_request for its own workers, so check on the
+    # heartbeat uvicorn sends every timeout / 2 seconds instead
+    async def callback_notify(self):
+        await super().callback_notify()
+        rss = _rss_bytes()
+        if self.alive and rss and rss > max_rss_bytes:
+            self.log.warning(
+                f"Worker {self.pid} RSS {rss // MB}MB exceeds {max_rss_bytes // MB}MB; recycling"
+            )
+            self.alive = False
+            # uvicorn finishes in-flight requests on SIGTERM, then the
+            # arbiter starts a fresh worker
+            os.kill(self.pid, signal.SIGTERM)
+
+
+worker_class = RecyclingUvicornWorker
+proc_name = 'homework-scraper-asgi'
+
+
+def on_starting(server):
+    """Called just before the master process is initialized."""
+    print("Starting Homework Scraper Backend (ASGI)")
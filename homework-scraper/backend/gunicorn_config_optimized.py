@@ -1,18 +1,125 @@
-# Gunicorn Configuration for Raspberry Pi (Optimized for Limited RAM)
-import multiprocessing
+# Gunicorn Configuration (sized to the host at startup)
+#
+# One config for the Raspberry Pi, Render and Docker. Workers and threads
+# are worked out from the CPUs and memory this process may actually use
+# (cgroup v2/v1 limits included, so containers get their quota rather than
+# the host's size), and every value can be overridden from the environment:
+#
+#   GUNICORN_WORKERS, GUNICORN_THREADS   fixed counts instead of auto-sizing
+#   GUNICORN_MAX_WORKERS                 cap for auto-sizing (default 8)
+#   GUNICORN_WORKER_MEMORY_MB            expected RSS per worker (default 150)
+#   GUNICORN_MEMORY_FRACTION             share of available memory gunicorn
+#                                        may use (default 0.5; Celery and
+#                                        Redis share the host)
+#   GUNICORN_MAX_RSS_MB                  recycle a worker past this RSS
+#                                        (default 2x the per-worker estimate)
+#   GUNICORN_MAX_REQUESTS                also recycle after N requests (default off)
+#   GUNICORN_BIND                        default 0.0.0.0:$PORT, PORT default 8000
+import math
 import os
 
+MB = 1024 * 1024
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    """CPUs usable by this process: affinity, capped by a cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<quota|max> <period>"
+    if cpu_max:
+        parts = cpu_max.split()
+        if parts[0] != 'max':
+            quota, period = int(parts[0]), int(parts[1])
+    else:  # cgroup v1
+        cfs_quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        cfs_period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if cfs_quota and cfs_period and int(cfs_quota) > 0:
+            quota, period = int(cfs_quota), int(cfs_period)
+
+    if quota and period:
+        cpus = min(cpus, max(1, math.ceil(quota / period)))
+    return cpus
+
+
+def memory_available():
+    """Bytes this process could still use: MemAvailable, capped by the cgroup limit"""
+    available = None
+    meminfo = _read('/proc/meminfo')
+    if meminfo:
+        for line in meminfo.splitlines():
+            if line.startswith('MemAvailable:'):
+                available = int(line.split()[1]) * 1024
+                break
+
+    limit = _read('/sys/fs/cgroup/memory.max')  # cgroup v2
+    usage = _read('/sys/fs/cgroup/memory.current')
+    if limit is None:  # cgroup v1
+        limit = _read('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+        usage = _read('/sys/fs/cgroup/memory/memory.usage_in_bytes')
+    # v1 reports "no limit" as a huge number
+    if limit and limit != 'max' and int(limit) < 1 << 60:
+        cgroup_free = int(limit) - int(usage or 0)
+        available = cgroup_free if available is None else min(available, cgroup_free)
+    return available
+
+
+def size_pool():
+    """(workers, threads) for this host, or as overridden"""
+    cpus = cpu_limit()
+    worker_mb = _env_int('GUNICORN_WORKER_MEMORY_MB', 150)
+    available = memory_available()
+
+    by_memory = cpus
+    if available is not None:
+        budget = available * _env_float('GUNICORN_MEMORY_FRACTION', 0.5)
+        by_memory = int(budget // (worker_mb * MB))
+
+    auto_workers = max(1, min(cpus, by_memory, _env_int('GUNICORN_MAX_WORKERS', 8)))
+    # Requests mostly wait on the database and Google, so threads carry the
+    # concurrency; keep fewer on hosts that can only afford one worker
+    auto_threads = 4 if by_memory > 1 else 2
+    return (
+        _env_int('GUNICORN_WORKERS', auto_workers),
+        _env_int('GUNICORN_THREADS', auto_threads),
+        {'cpus': cpus, 'available_mb': available // MB if available else None, 'worker_mb': worker_mb},
+    )
+
+
+workers, threads, sizing = size_pool()
+max_rss_bytes = _env_int('GUNICORN_MAX_RSS_MB', sizing['worker_mb'] * 2) * MB
+
 # Server socket
-bind = '0.0.0.0:8000'
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 backlog = 64  # Reduced from default 2048 for lower memory
 
-# Worker processes - Single worker for low RAM environment
-workers = 1
-worker_class = 'gthread'
-threads = 2  # Optimal for Raspberry Pi - balance between performance and memory
+# Worker processes
+worker_class = 'gthread'  # Better for I/O bound Django apps
 worker_connections = 100  # Reduced from default 1000
-max_requests = 1000  # Restart worker after this many requests (prevents memory leaks)
-max_requests_jitter = 100
+# Workers are recycled on memory growth instead (post_request below)
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 0)
+max_requests_jitter = max_requests // 10
 timeout = 120  # Reduced from 600 - most requests should complete faster
 graceful_timeout = 60
 keepalive = 2
@@ -21,7 +128,9 @@ keepalive = 2
 worker_tmp_dir = '/dev/shm'
 
 # Logging
-accesslog = '-'  # Log to stdout
+# Set GUNICORN_ACCESS_LOG to a file (e.g. /var/log/homework-scraper/gunicorn-access.log)
+# so the monitoring app can build per-route latency tables from %(D)s
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')  # Log to stdout by default
 errorlog = '-'   # Log to stderr
 loglevel = 'warning'  # Only log warnings and errors
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)sμs'
@@ -40,9 +149,14 @@ tmp_upload_dir = None
 # Preload app for better memory efficiency with multiple workers
 preload_app = True
 
-# Worker lifecycle
-worker_class = 'gthread'  # Better for I/O bound Django apps
-worker_tmp_dir = '/dev/shm'  # Use RAM for temp files
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
 
 def on_starting(server):
     """Called just before the master process is initialized."""
@@ -54,7 +168,11 @@ def on_reload(server):
 
 def when_ready(server):
     """Called just after the server is started."""
-    print(f"Server is ready. Spawning {workers} workers")
+    print(
+        f"Server is ready. Spawning {workers} workers x {threads} threads "
+        f"(cpus={sizing['cpus']}, available={sizing['available_mb']}MB, "
+        f"recycle above {max_rss_bytes // MB}MB RSS)"
+    )
 
 def worker_int(worker):
     """Called just after a worker exited on SIGINT or SIGQUIT."""
@@ -63,3 +181,29 @@ def worker_int(worker):
 def post_worker_init(worker):
     """Called just after a worker has initialized the application."""
     print(f"Worker {worker.pid} initialized")
+
+    # Opt-in tracemalloc reports (MONITORING_TRACEMALLOC), started per worker
+    # because threads and tracing state don't survive the fork from preload
+    from monitoring.memory import maybe_start_tracing
+    maybe_start_tracing()
+
+    # Connect, load the URLconf and fetch remote keys now rather than on the
+    # first requests (homework_scraper/warmup.py, within WARMUP_BUDGET)
+    from homework_scraper import warmup
+    steps = warmup.run()
+    if steps:
+        print(
+            f"Worker {worker.pid} warmed up: "
+            + ', '.join(f"{name} {ms:.0f}ms{' (failed)' if error else ''}" for name, ms, error in steps)
+        )
+
+def post_request(worker, req, environ, resp):
+    """Called after a worker processes the request."""
+    # Reading statm costs microseconds; a grown worker finishes its in-flight
+    # requests and exits, and the arbiter starts a fresh one
+    rss = _rss_bytes()
+    if worker.alive and rss and rss > max_rss_bytes:
+        worker.log.warning(
+            f"Worker {worker.pid} RSS {rss // MB}MB exceeds {max_rss_bytes // MB}MB; recycling"
+        )
+        worker.alive = False
@@ -0,0 +1,19 @@
+"""
+ASGI config for homework_scraper project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Served by gunicorn with uvicorn workers (gunicorn_config_asgi.py), which
+routes the async versions of the I/O-bound views (see
+homework_scraper/async_views.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'homework_scraper.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
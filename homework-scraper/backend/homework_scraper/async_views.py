@@ -0,0 +1,28 @@
+"""
+Choosing between the sync and async versions of I/O-bound views
+
+The Google-facing task views, the RISC receiver and the subprocess-heavy
+monitoring views have async versions (each app's async_views.py). Under
+ASGI (homework_scraper/asgi.py, gunicorn_config_asgi.py) those are routed,
+so a request waiting on Google or a shell command holds no thread. Under
+WSGI the sync versions stay: Django would run an async view in a fresh
+event loop per request, losing the async HTTP session's connection pool.
+
+ASYNC_VIEWS in settings forces either choice; by default it follows the
+DJANGO_ASYNC_VIEWS environment variable, which asgi.py sets.
+"""
+import os
+
+from django.conf import settings
+
+
+def async_views_enabled():
+    enabled = getattr(settings, 'ASYNC_VIEWS', None)
+    if enabled is None:
+        enabled = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+    return bool(enabled)
+
+
+def sync_or_async(sync_view, async_view):
+    """The view to route for this deployment"""
+    return async_view if async_views_enabled() else sync_view
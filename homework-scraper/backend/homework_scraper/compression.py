@@ -0,0 +1,111 @@
+"""
+Size-thresholded gzip / brotli compression of API responses
+
+Add it near the top of MIDDLEWARE, above anything that reads or changes
+response bodies (it replaces django.middleware.gzip.GZipMiddleware):
+
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'homework_scraper.compression.CompressionMiddleware',
+        ...
+    ]
+
+Responses of at least COMPRESSION_MIN_SIZE bytes (default 1024) with a
+JSON, text or JavaScript content type are compressed with brotli when the
+client accepts it and the brotli package is installed, otherwise with gzip.
+Smaller responses aren't worth the CPU and rarely shrink. Streaming responses
+(NDJSON task lists, log downloads) are left alone so each line still
+reaches the client as soon as it is written.
+
+COMPRESSION_GZIP_LEVEL (default 6) and COMPRESSION_BROTLI_QUALITY (default
+4) trade CPU for size. On the Pi, nginx also gzips
+(deployment/nginx-homework-scraper.conf) and passes responses compressed
+here through unchanged.
+"""
+import gzip
+import re
+import secrets
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_MAX_RANDOM_BYTES = 100
+
+COMPRESSIBLE_TYPES = re.compile(r'^(application/(json|javascript|x-ndjson|xml)|text/)', re.IGNORECASE)
+
+_coding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Codings an Accept-Encoding header allows, ignoring those with q=0"""
+    codings = set()
+    for part in header.split(','):
+        match = _coding_re.match(part)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        codings.add(coding.lower())
+    return codings
+
+
+def choose_encoding(header):
+    """'br', 'gzip' or None for a request's Accept-Encoding header"""
+    codings = accepted_encodings(header)
+    if brotli is not None and ('br' in codings or '*' in codings):
+        return 'br'
+    if 'gzip' in codings or '*' in codings:
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+
+    data = gzip.compress(content, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), mtime=0)
+    # A random-length file name in the header, like Django's GZipMiddleware,
+    # so the compressed length leaks less about the body (BREACH)
+    header = bytearray(data[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + b'a' * secrets.randbelow(GZIP_MAX_RANDOM_BYTES) + b'\x00' + data[10:]
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress large text responses with brotli or gzip"""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # A compressed body is a different representation (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,69 @@
+"""
+Fast JSON encoding for API responses
+
+dumps() encodes with orjson when it is installed, several times faster than
+the stdlib encoder on the large payloads (task lists, logs, RISC events),
+and falls back to the json module otherwise. Output is compact UTF-8 either
+way, with no spaces after separators and no \\u escapes for non-ASCII text.
+
+Values orjson doesn't handle natively, plus datetimes, go through the
+encoder's default(), so each caller gets its encoder's formatting on both
+paths:
+
+- DjangoJSONEncoder (the default): datetimes in ISO 8601 with milliseconds
+  and 'Z' for UTC, Decimal and UUID as strings, lazy strings translated
+- DRF's JSONEncoder (homework_scraper/renderers.py): DRF's formatting
+
+JsonResponse here is a drop-in replacement for django.http.JsonResponse
+that renders with dumps(); views import it instead of Django's.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.http import JsonResponse as DjangoJsonResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Datetimes go to default() so they are formatted like the encoder does
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+_defaults = {}
+
+
+def _default_for(encoder):
+    default = _defaults.get(encoder)
+    if default is None:
+        default = _defaults[encoder] = encoder().default
+    return default
+
+
+def dumps(data, encoder=DjangoJSONEncoder):
+    """data as compact UTF-8 JSON bytes, encoding other types with encoder"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_default_for(encoder), option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson is stricter (integers over 64 bits, say); let json decide
+            pass
+    return json.dumps(data, cls=encoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class JsonResponse(DjangoJsonResponse):
+    """django.http.JsonResponse rendered with dumps()"""
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        if json_dumps_params:
+            # Formatting options only the json module understands
+            content = json.dumps(data, cls=encoder, **json_dumps_params)
+        else:
+            content = dumps(data, encoder)
+        HttpResponse.__init__(self, content=content, **kwargs)
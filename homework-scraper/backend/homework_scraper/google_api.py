@@ -0,0 +1,367 @@
+"""
+Shared Google API HTTP layer
+
+Every call to a Google endpoint goes through get_session(), a keep-alive
+requests session created once per worker process:
+
+- connection pool of GOOGLE_API_POOL_SIZE (default 10) per host, so TLS
+  handshakes are paid once per connection rather than once per call
+- default timeout GOOGLE_API_TIMEOUT (connect, read) = (5, 30) seconds
+- urllib3 retries (GOOGLE_API_RETRIES, default 3) with exponential
+  backoff for connection errors and 500/502/503/504 responses; reads and
+  5xx are only retried for idempotent methods
+- per-endpoint latency recorded into Redis (see get_latency_stats())
+
+The session itself lives in google_session.py, so requests and urllib3
+are only imported by the first process that calls Google, not at startup.
+
+Async views (ASGI deployments) use get_async_session() instead: the same
+timeouts, pool size, retries and latency recording on an httpx.AsyncClient,
+one per event loop. httpx is only imported when it is first used.
+
+get_access_token(user) returns the user's Google OAuth access token from
+django-allauth, cached per process until GOOGLE_TOKEN_REFRESH_MARGIN
+seconds (default 300) before it expires. Refreshes are single-flight: one
+thread refreshes while the others wait for its result.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from homework_scraper.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = 'https://oauth2.googleapis.com/token'
+
+STATS_KEY_PREFIX = 'google-api:latency'
+ENDPOINTS_KEY = f'{STATS_KEY_PREFIX}:endpoints'
+STATS_TTL = 7 * 24 * 3600
+
+# Latency histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+# Path segments kept as-is in endpoint names; anything else is an id
+_static_segment_re = re.compile(r'^(v\d+\w*|@\w+|[a-z][a-zA-Z:._-]*)$')
+
+
+class GoogleAPIError(Exception):
+    """A Google API call failed"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class GoogleAuthError(GoogleAPIError):
+    """The user has no usable Google credentials"""
+
+
+def endpoint_name(method, url):
+    """'GET tasks.googleapis.com/tasks/v1/lists/{id}/tasks' style name for a URL"""
+    parts = urlsplit(url)
+    segments = [
+        segment if _static_segment_re.match(segment) else '{id}'
+        for segment in parts.path.split('/') if segment
+    ]
+    return f"{method.upper()} {parts.netloc}/{'/'.join(segments)}"
+
+
+def latency_bucket(ms):
+    for bound in LATENCY_BUCKETS:
+        if ms <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+# After a Redis failure, stop recording for a while rather than adding a
+# connect timeout to every Google call
+_recording_paused_until = 0
+
+
+def record_latency(endpoint, ms, status):
+    """Add one call to an endpoint's latency stats, never failing the caller"""
+    global _recording_paused_until
+    if time.monotonic() < _recording_paused_until:
+        return
+    key = f'{STATS_KEY_PREFIX}:{endpoint}'
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(ENDPOINTS_KEY, endpoint)
+        pipe.hincrby(key, 'count', 1)
+        pipe.hincrbyfloat(key, 'latency_sum_ms', ms)
+        pipe.hincrby(key, latency_bucket(ms), 1)
+        if status is None or status >= 500:
+            pipe.hincrby(key, 'errors', 1)
+        elif status == 429:
+            pipe.hincrby(key, 'throttled', 1)
+        pipe.expire(key, STATS_TTL)
+        pipe.expire(ENDPOINTS_KEY, STATS_TTL)
+        pipe.execute()
+    except Exception as e:
+        _recording_paused_until = time.monotonic() + 60
+        logger.warning(f"Failed to record Google API latency: {e}")
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The worker's shared Google API session (recreated after fork)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                from homework_scraper.google_session import build_session
+
+                _session = build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+# Retried like the sync session (google_session.py): connection errors
+# always, read errors and 5xx only for idempotent methods
+RETRY_STATUSES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({'DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'})
+RETRY_BACKOFF = 0.5
+
+
+class AsyncGoogleSession:
+    """httpx.AsyncClient with the shared session's timeouts, retries and latency recording"""
+
+    def __init__(self, client, retries):
+        self.client = client
+        self.retries = retries
+
+    async def request(self, method, url, **kwargs):
+        import httpx
+
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            start = time.perf_counter()
+            status = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                status = response.status_code
+            except httpx.TransportError as e:
+                retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if last_attempt or not retryable:
+                    raise GoogleAPIError(str(e) or type(e).__name__) from e
+            finally:
+                self._record(method, url, start, status)
+
+            if status is not None and (last_attempt or not idempotent or status not in RETRY_STATUSES):
+                return response
+            retry_after = response.headers.get('retry-after') if status is not None else None
+            await asyncio.sleep(
+                float(retry_after) if retry_after and retry_after.isdigit() else RETRY_BACKOFF * 2 ** attempt
+            )
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _record(self, method, url, start, status):
+        # record_latency talks to Redis; keep that off the event loop
+        asyncio.get_running_loop().run_in_executor(
+            None, record_latency, endpoint_name(method, url), (time.perf_counter() - start) * 1000, status
+        )
+
+
+def build_async_session():
+    import httpx
+
+    pool_size = getattr(settings, 'GOOGLE_API_POOL_SIZE', 10)
+    connect_timeout, read_timeout = getattr(settings, 'GOOGLE_API_TIMEOUT', (5, 30))
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    )
+    return AsyncGoogleSession(client, retries=getattr(settings, 'GOOGLE_API_RETRIES', 3))
+
+
+# httpx clients can't be shared between event loops; ASGI workers run one
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def get_async_session():
+    """The running event loop's Google API session"""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None:
+        session = _async_sessions[loop] = build_async_session()
+    return session
+
+
+class TokenCache:
+    """Per-process cache of users' Google access tokens with single-flight refresh"""
+
+    def __init__(self):
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _margin(self):
+        return getattr(settings, 'GOOGLE_TOKEN_REFRESH_MARGIN', 300)
+
+    def _cached(self, user_id):
+        entry = self._tokens.get(user_id)
+        if entry and entry[1] - self._margin() > time.time():
+            return entry[0]
+        return None
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = self._locks[user_id] = threading.Lock()
+            return lock
+
+    def get(self, user):
+        token = self._cached(user.pk)
+        if token:
+            return token
+
+        with self._user_lock(user.pk):
+            # Another thread may have refreshed while we waited
+            token = self._cached(user.pk)
+            if token:
+                return token
+            token, expires_at = load_access_token(user, self._margin())
+            self._tokens[user.pk] = (token, expires_at)
+            return token
+
+    async def aget(self, user):
+        # Cached tokens need no thread; loading one reads the database
+        return self._cached(user.pk) or await sync_to_async(self.get)(user)
+
+    def invalidate(self, user_id):
+        """Forget a user's token, e.g. after a 401 or a RISC revocation"""
+        self._tokens.pop(user_id, None)
+
+
+def load_access_token(user, margin):
+    """
+    Read a user's token from allauth, refreshing it if it expires within margin
+
+    Returns (token, expiry as a Unix timestamp). Refreshed tokens are saved
+    back, so other workers pick them up from the database.
+    """
+    import requests
+    from allauth.socialaccount.models import SocialToken
+
+    token = SocialToken.objects.filter(
+        account__user=user, account__provider='google'
+    ).select_related('app').first()
+
+    if not token:
+        raise GoogleAuthError('No Google account connected', status=401)
+
+    if token.expires_at is None:
+        # Non-expiring token: re-read it from the database now and then
+        return token.token, time.time() + margin + 300
+
+    if token.expires_at > timezone.now() + timedelta(seconds=margin):
+        return token.token, token.expires_at.timestamp()
+
+    if not token.token_secret:
+        raise GoogleAuthError('Google access token expired and no refresh token is stored', status=401)
+
+    client_id = token.app.client_id if token.app else settings.GOOGLE_OAUTH2_CLIENT_ID
+    client_secret = token.app.secret if token.app else settings.GOOGLE_OAUTH2_CLIENT_SECRET
+
+    try:
+        response = get_session().post(TOKEN_URL, data={
+            'client_id': client_id,
+            'client_secret': client_secret,
+            'refresh_token': token.token_secret,
+            'grant_type': 'refresh_token',
+        })
+    except requests.RequestException as e:
+        raise GoogleAPIError(f'Failed to refresh Google token: {str(e)}')
+
+    if response.status_code != 200:
+        raise GoogleAuthError(f'Failed to refresh Google token: {response.text[:200]}', status=401)
+
+    data = response.json()
+    token.token = data['access_token']
+    token.expires_at = timezone.now() + timedelta(seconds=data.get('expires_in', 3600))
+    token.save(update_fields=['token', 'expires_at'])
+    logger.info(f"Refreshed Google access token for user {user.pk}")
+    return token.token, token.expires_at.timestamp()
+
+
+token_cache = TokenCache()
+
+
+def get_access_token(user):
+    """A valid Google OAuth access token for a user"""
+    return token_cache.get(user)
+
+
+async def aget_access_token(user):
+    return await token_cache.aget(user)
+
+
+def get_latency_stats(redis_client=None):
+    """Call count, error count and latency percentiles per Google endpoint"""
+    client = redis_client or get_redis()
+    endpoints = sorted(name.decode() for name in client.smembers(ENDPOINTS_KEY))
+
+    pipe = client.pipeline(transaction=False)
+    for endpoint in endpoints:
+        pipe.hgetall(f'{STATS_KEY_PREFIX}:{endpoint}')
+    replies = pipe.execute()
+
+    results = []
+    for endpoint, raw_stats in zip(endpoints, replies):
+        stats = {key.decode(): float(value) for key, value in raw_stats.items()}
+        count = int(stats.get('count', 0))
+        histogram = [
+            {'le': bound, 'count': int(stats.get(f'le_{bound}', 0))}
+            for bound in LATENCY_BUCKETS + ['inf']
+        ]
+        results.append({
+            'endpoint': endpoint,
+            'count': count,
+            'errors': int(stats.get('errors', 0)),
+            'throttled': int(stats.get('throttled', 0)),
+            'avg_ms': round(stats.get('latency_sum_ms', 0) / count, 1) if count else None,
+            'p50_ms': _histogram_quantile(histogram, count, 0.5),
+            'p95_ms': _histogram_quantile(histogram, count, 0.95),
+            'latency_histogram': histogram,
+        })
+    results.sort(key=lambda row: row['count'], reverse=True)
+    return results
+
+
+def _histogram_quantile(histogram, count, quantile):
+    """Upper bound of the bucket holding the given quantile"""
+    if not count:
+        return None
+    seen = 0
+    for bucket in histogram:
+        seen += bucket['count']
+        if seen >= quantile * count:
+            return bucket['le']
+    return 'inf'
@@ -0,0 +1,58 @@
+"""
+The requests session behind google_api.get_session()
+
+Kept out of google_api.py so importing the shared Google API layer (which
+every view module does) doesn't import requests and urllib3; this module
+is imported the first time a process calls Google. Settings are described
+in google_api.py.
+"""
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from homework_scraper.google_api import endpoint_name, record_latency
+
+
+class GoogleSession(requests.Session):
+    """requests session with default timeouts and latency recording"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        start = time.perf_counter()
+        status = None
+        try:
+            response = super().request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            record_latency(endpoint_name(method, url), (time.perf_counter() - start) * 1000, status)
+
+
+def build_session():
+    retries = getattr(settings, 'GOOGLE_API_RETRIES', 3)
+    pool_size = getattr(settings, 'GOOGLE_API_POOL_SIZE', 10)
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = GoogleSession(timeout=tuple(getattr(settings, 'GOOGLE_API_TIMEOUT', (5, 30))))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
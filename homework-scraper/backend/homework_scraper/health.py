@@ -0,0 +1,220 @@
+"""
+Readiness checks measured in the background
+
+/api/health only says the process answers. /api/ready says whether its
+dependencies do: checks run every HEALTH_CHECK_INTERVAL seconds (default 5)
+in the background and the last result is kept, so a probe costs a
+dictionary read however often the load balancer polls.
+
+Every web worker has a checker thread, but only one per host runs the
+checks: it holds a Redis lease and stores each result in Redis, where the
+other workers' threads read it. If Redis can't be reached, or the shared
+result is missing or old, a worker checks for itself. The checking thread
+keeps its database connection open between passes.
+
+Checks, each with its latency in the result:
+
+- database: SELECT 1 on every configured database
+- redis: PING on the broker Redis (homework_scraper/redis_client.py)
+- celery: a worker heartbeat (monitoring/celery_stats.py) newer than
+  HEALTH_CELERY_MAX_AGE seconds (default 60)
+- disk: at least HEALTH_DISK_MIN_FREE_MB (default 500) free under each of
+  HEALTH_DISK_PATHS (default [BASE_DIR])
+
+Probes answer 503 when a check in HEALTH_REQUIRED_CHECKS (default database,
+redis and disk) fails, or when the last result is over a minute (or three
+intervals) old because the checker stopped. A failing optional check, like no
+Celery worker, only marks the result degraded.
+
+Anonymous callers get only the status; the per-check details (errors,
+worker hostnames, paths) go to staff users, or to everyone with
+HEALTH_PUBLIC_DETAILS = True.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUIRED_CHECKS = ('database', 'redis', 'disk')
+
+_LEASE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class CheckFailed(Exception):
+    """A dependency answered, but not well enough"""
+
+
+def check_database():
+    from django.db import connections
+
+    # The checker thread's connections stay open between passes; one the
+    # server dropped is reopened and tried again
+    for connection in connections.all():
+        for attempt in range(2):
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                break
+            except Exception:
+                connection.close()
+                if attempt:
+                    raise
+
+
+def check_redis():
+    from homework_scraper.redis_client import get_redis
+
+    get_redis().ping()
+
+
+def check_celery():
+    from monitoring.celery_stats import get_worker_heartbeats
+
+    max_age = getattr(settings, 'HEALTH_CELERY_MAX_AGE', 60)
+    heartbeats = get_worker_heartbeats()
+    alive = sorted(hostname for hostname, age in heartbeats.items() if age <= max_age)
+    if not alive:
+        raise CheckFailed(f'No Celery worker heartbeat in the last {max_age}s')
+    return {'workers': alive}
+
+
+def check_disk():
+    min_free_mb = getattr(settings, 'HEALTH_DISK_MIN_FREE_MB', 500)
+    paths = getattr(settings, 'HEALTH_DISK_PATHS', None) or [str(getattr(settings, 'BASE_DIR', '/'))]
+    free = {}
+    for path in paths:
+        free[path] = shutil.disk_usage(path).free // (1024 * 1024)
+    low = [path for path, mb in free.items() if mb < min_free_mb]
+    if low:
+        raise CheckFailed(f'Less than {min_free_mb}MB free under {", ".join(low)}')
+    return {'free_mb': free}
+
+
+CHECKS = {
+    'database': check_database,
+    'redis': check_redis,
+    'celery': check_celery,
+    'disk': check_disk,
+}
+
+
+def run_checks():
+    """Run every check once; {name: {'ok', 'latency_ms', 'error' or details}}"""
+    results = {}
+    for name, check in CHECKS.items():
+        start = time.perf_counter()
+        try:
+            details = check() or {}
+            result = {'ok': True, **details}
+        except Exception as e:
+            result = {'ok': False, 'error': str(e) or type(e).__name__}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        results[name] = result
+    return results
+
+
+class HealthChecker:
+    """Per-process thread keeping the latest result, checking if it leads the host"""
+
+    def __init__(self):
+        self._result = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def interval(self):
+        return getattr(settings, 'HEALTH_CHECK_INTERVAL', 5)
+
+    def max_age(self):
+        """Seconds after which a result is stale"""
+        return max(3 * self.interval(), 60)
+
+    def start(self):
+        """Start checking in this process (again after a fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._result = None
+            threading.Thread(target=self._run, name='health-checker', daemon=True).start()
+
+    def _run(self):
+        from homework_scraper.redis_client import get_redis
+
+        host = socket.gethostname()
+        lease_key, result_key = f'health:checker:{host}', f'health:result:{host}'
+        token = f'{host}:{os.getpid()}'
+        while True:
+            try:
+                redis = get_redis()
+                leader = redis.register_script(_LEASE_SCRIPT)(keys=[lease_key], args=[token, math.ceil(3 * self.interval())])
+                shared = None if leader else json.loads(redis.get(result_key) or 'null')
+            except Exception:
+                # Redis is down: check for ourselves (its check fails too)
+                leader, shared = False, None
+
+            if shared and time.time() - shared['checked_at'] <= self.max_age():
+                self._result = shared
+            else:
+                self._check()
+                if leader:
+                    try:
+                        redis.set(result_key, json.dumps(self._result, default=str), ex=math.ceil(self.max_age()))
+                    except Exception:
+                        pass
+            time.sleep(self.interval())
+
+    def _check(self):
+        results = run_checks()
+        failed = [name for name, result in results.items() if not result['ok']]
+        previous = self._result['failed'] if self._result else []
+        if failed and failed != previous:
+            logger.warning(f"Health checks failing: {', '.join(failed)}")
+        elif previous and not failed:
+            logger.info("Health checks passing again")
+        self._result = {'checks': results, 'failed': failed, 'checked_at': time.time()}
+
+    def latest(self):
+        """The last result with its overall status; starts the checker if needed"""
+        self.start()
+        result = self._result
+        if result is None:
+            return {'status': 'starting', 'ready': False, 'checks': {}}
+
+        required = getattr(settings, 'HEALTH_REQUIRED_CHECKS', DEFAULT_REQUIRED_CHECKS)
+        age = time.time() - result['checked_at']
+        stale = age > self.max_age()
+        ready = not stale and not any(name in required for name in result['failed'])
+        if stale:
+            status = 'stale'
+        elif not ready:
+            status = 'fail'
+        else:
+            status = 'degraded' if result['failed'] else 'ok'
+        return {
+            'status': status,
+            'ready': ready,
+            'age_seconds': round(age, 1),
+            'checks': result['checks'],
+        }
+
+
+health_checker = HealthChecker()
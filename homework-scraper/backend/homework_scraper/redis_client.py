@@ -0,0 +1,38 @@
+"""
+Shared Redis connection for app-level state
+
+Uses the Celery broker Redis (CELERY_BROKER_URL, falling back to REDIS_URL),
+so web workers and Celery workers see the same keys. The client keeps its
+own connection pool and is safe to share between threads.
+"""
+import os
+import threading
+
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_url():
+    return (
+        getattr(settings, 'CELERY_BROKER_URL', None) or
+        getattr(settings, 'REDIS_URL', None) or
+        os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    )
+
+
+def get_redis():
+    """Get the process-wide Redis client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+                _client = redis.Redis.from_url(
+                    get_redis_url(),
+                    socket_timeout=5,
+                    socket_connect_timeout=5,
+                    health_check_interval=30
+                )
+    return _client
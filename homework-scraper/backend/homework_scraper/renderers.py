@@ -0,0 +1,32 @@
+"""
+DRF renderer using the fast JSON encoder (homework_scraper/fastjson.py)
+
+Make it the default JSON renderer in settings:
+
+    REST_FRAMEWORK = {
+        ...
+        'DEFAULT_RENDERER_CLASSES': [
+            'homework_scraper.renderers.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ],
+    }
+
+Responses keep DRF's encoding of dates, Decimals, querysets and so on.
+Requests asking for indented output (Accept: application/json; indent=4)
+are rendered by DRF's own JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from .fastjson import dumps
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by DRF too: JavaScript treats them as line breaks
+        return dumps(data, self.encoder_class).replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -14,9 +14,10 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from django.http import JsonResponse
+from .fastjson import JsonResponse
 from . import test_views
 from authentication.views import CSRFTokenView
 
@@ -28,6 +29,19 @@ def health_check(request):
         'version': '1.0.0'
     })
 
+def readiness_check(request):
+    """Readiness of the database, Redis, Celery and disk, from the background checker"""
+    from .health import health_checker
+
+    result = health_checker.latest()
+    if not (request.user.is_staff or getattr(settings, 'HEALTH_PUBLIC_DETAILS', False)):
+        # Check errors can name hosts, users and paths; probes only need the status
+        result = {'status': result['status'], 'ready': result['ready']}
+    return JsonResponse(
+        {**result, 'service': 'homework-scraper-backend'},
+        status=200 if result['ready'] else 503
+    )
+
 def api_root(request):
     """API root endpoint with available endpoints"""
     base_url = 'https://api.dovydas.space' if 'api.dovydas.space' in request.get_host() else ''
@@ -37,6 +51,7 @@ def api_root(request):
         'version': '1.0.0',
         'endpoints': {
             'health': f'{base_url}/health',
+            'ready': f'{base_url}/ready',
             'api_root': f'{base_url}/api/',
             'test': f'{base_url}/api/test/',
             'auth': f'{base_url}/api/auth/',
@@ -53,6 +68,8 @@ urlpatterns = [
     path('api/', api_root, name='api-root'),
     path('api/health', health_check, name='api-health'),
     path('health', health_check, name='health'),
+    path('api/ready', readiness_check, name='api-ready'),
+    path('ready', readiness_check, name='ready'),
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
     path('api/scraper/', include('scraper.urls')),
@@ -0,0 +1,147 @@
+"""
+Worker warm-up before the first request
+
+gunicorn forks workers from the preloaded master, but each fresh worker
+(including every one recycled by max_requests or the RSS limit) still
+connects to the database, loads the URLconf and template engines, fills
+model metadata caches and fetches Google's RISC key set on its first
+requests. post_worker_init in both gunicorn configs calls run(), so that
+cost is paid before the worker accepts connections.
+
+The project registers the generic steps below. Apps add their own in a
+warmup.py module, which run() imports for every installed app:
+
+    from homework_scraper.warmup import register
+
+    @register('risc-jwks')
+    def prime_jwks():
+        RISCTokenValidator().get_jwks()
+
+Steps run one after another in registration order (these first, then apps
+in INSTALLED_APPS order) on a helper thread. Each step's time is logged; a
+failing step is logged and the next one runs. The worker waits at most
+WARMUP_BUDGET seconds (default 5) and then starts serving while the
+remaining steps finish in the background. Keep the budget well under
+gunicorn's timeout. WARMUP_ENABLED = False turns warm-up off.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_steps = {}
+_discovered = False
+
+
+def register(name):
+    """Decorator adding a warm-up step; registering a name again replaces it"""
+    def decorator(func):
+        _steps[name] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    global _discovered
+    if not _discovered:
+        from django.utils.module_loading import autodiscover_modules
+
+        autodiscover_modules('warmup')
+        _discovered = True
+
+
+@register('database')
+def check_database():
+    from django.db import connections
+
+    # Connections are per thread, so this one can't serve requests; it
+    # loads the driver, checks credentials and warms the server's caches
+    try:
+        for connection in connections.all():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+    finally:
+        connections.close_all()
+
+
+@register('urlconf')
+def resolve_urlconf():
+    from django.urls import get_resolver
+
+    # Imports every view module and compiles the URL patterns
+    get_resolver().url_patterns
+    get_resolver().reverse_dict
+
+
+@register('templates')
+def load_template_engines():
+    from django.template import engines
+
+    engines.all()
+
+
+@register('models')
+def touch_model_metadata():
+    from django.apps import apps
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.concrete_fields
+
+
+@register('health-checker')
+def start_health_checker():
+    from homework_scraper.health import health_checker
+
+    # Probes of /api/ready read its result, so have one before they arrive
+    health_checker.start()
+
+
+def _run_steps(steps, results):
+    for name, func in steps:
+        start = time.perf_counter()
+        error = None
+        try:
+            func()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        results.append((name, elapsed_ms, error))
+        if error:
+            logger.warning(f"Warm-up step {name} failed after {elapsed_ms:.0f}ms: {error}")
+        else:
+            logger.info(f"Warm-up step {name} took {elapsed_ms:.0f}ms")
+
+
+def run(budget=None):
+    """
+    Run the warm-up steps, waiting at most budget seconds for them
+
+    Returns (name, ms, error) for each step finished within the budget.
+    """
+    if not getattr(settings, 'WARMUP_ENABLED', True):
+        return []
+    if budget is None:
+        budget = getattr(settings, 'WARMUP_BUDGET', 5)
+
+    autodiscover()
+    steps = list(_steps.items())
+    results = []
+    start = time.perf_counter()
+    thread = threading.Thread(target=_run_steps, args=(steps, results), name='warmup', daemon=True)
+    thread.start()
+    thread.join(budget)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    finished = list(results)
+    if thread.is_alive():
+        logger.warning(
+            f"Warm-up over its {budget}s budget after {elapsed_ms:.0f}ms; "
+            f"{len(steps) - len(finished)} of {len(steps)} steps continue in the background"
+        )
+    else:
+        logger.info(f"Warm-up finished {len(steps)} steps in {elapsed_ms:.0f}ms")
+    return finished
@@ -0,0 +1,352 @@
+"""
+Incremental access-log latency analytics
+
+Reads the gunicorn and nginx access logs from a saved byte offset, maps each
+request path onto its Django route template (e.g.
+`/api/tasks/lists/<list_id>/tasks`) and keeps, per route and per time
+bucket, the request count, error count and an HDR-style log-bucketed latency
+histogram. Percentiles are answered from the histograms, so the logs are
+never rescanned.
+
+Sources are configured with MONITORING_ACCESS_LOGS:
+
+    MONITORING_ACCESS_LOGS = [
+        {'name': 'gunicorn', 'format': 'gunicorn',
+         'path': '/var/log/homework-scraper/gunicorn-access.log'},
+        {'name': 'nginx', 'format': 'nginx',
+         'path': '/var/log/nginx/homework-scraper-access.log'},
+    ]
+
+The gunicorn format is `access_log_format` from gunicorn_config_optimized.py
+(latency from `%(D)s`, in microseconds). The nginx format is the `timed`
+log_format in deployment/nginx-homework-scraper.conf (combined plus
+`$request_time`, in seconds).
+
+The logs are read by `manage.py analyze_access_logs` (from cron) or by a
+background thread the route latency view starts at most every
+MONITORING_ACCESS_LOG_REFRESH seconds (default 60); requests only read the
+saved state.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+from django.conf import settings
+from django.urls import resolve, Resolver404
+
+from .logfiles import LOG_FILES
+from .utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCES = [
+    {
+        'name': 'gunicorn',
+        'format': 'gunicorn',
+        'path': '/var/log/homework-scraper/gunicorn-access.log',
+    },
+    {
+        'name': 'nginx',
+        'format': 'nginx',
+        'path': LOG_FILES['nginx'],
+    },
+]
+
+BUCKET_SECONDS = 300
+MAX_BUCKETS = 288  # 24 hours of 5 minute buckets
+MAX_READ_BYTES = 32 * 1024 * 1024  # Per source per refresh
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Relative precision of the latency histogram (about 5%)
+HISTOGRAM_BASE = 1.05
+_log_base = math.log(HISTOGRAM_BASE)
+
+_request_prefix = (
+    r'^\S+ \S+ \S+ \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) \S+ '
+    r'"[^"]*" "[^"]*" '
+)
+LINE_PATTERNS = {
+    'gunicorn': re.compile(_request_prefix + r'(?P<micros>\d+)'),
+    'nginx': re.compile(_request_prefix + r'(?P<seconds>\d+(?:\.\d+)?)'),
+}
+
+_converter_re = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+@lru_cache(maxsize=4096)
+def route_template(path):
+    """Map a request path onto its URL pattern, e.g. /api/tasks/lists/<list_id>/tasks"""
+    path = path.split('?', 1)[0]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return UNMATCHED_ROUTE
+    except Exception:
+        return UNMATCHED_ROUTE
+    return '/' + _converter_re.sub(r'<\1>', match.route or '')
+
+
+@lru_cache(maxsize=1024)
+def _parse_log_time(value):
+    return int(datetime.strptime(value, '%d/%b/%Y:%H:%M:%S %z').timestamp())
+
+
+def histogram_bucket(micros):
+    """Log-scale histogram bucket for a latency in microseconds"""
+    if micros < 1:
+        return 0
+    return int(math.log(micros) / _log_base)
+
+
+def histogram_quantiles(histogram, quantiles):
+    """Approximate quantiles (in milliseconds) from a bucket -> count histogram"""
+    total = sum(histogram.values())
+    if not total:
+        return {q: None for q in quantiles}
+
+    results = {}
+    buckets = sorted((int(b), c) for b, c in histogram.items())
+    for q in quantiles:
+        rank = q * total
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen >= rank:
+                # Geometric midpoint of the bucket
+                micros = HISTOGRAM_BASE ** (bucket + 0.5)
+                results[q] = round(micros / 1000, 3)
+                break
+    return results
+
+
+class AccessLogAnalyzer:
+    """Tail access logs incrementally and aggregate per-route latency"""
+
+    def __init__(self, sources=None, state_path=None):
+        self._sources = sources
+        self._state_path = state_path
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state = None
+        self._state_mtime = None
+        self._refresh_thread = None
+        self._refreshed_at = None
+
+    @property
+    def sources(self):
+        if self._sources is None:
+            self._sources = getattr(settings, 'MONITORING_ACCESS_LOGS', DEFAULT_SOURCES)
+        return self._sources
+
+    @property
+    def state_path(self):
+        if self._state_path is None:
+            self._state_path = os.path.join(get_data_dir('accesslog'), 'state.json')
+        return self._state_path
+
+    def refresh(self, blocking=True):
+        """Read any new log lines and persist the updated state"""
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            # Several gunicorn workers share the state file
+            with open(f'{self.state_path}.lock', 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # A private copy, so route_table() never sees it half updated
+                state = self._read_state()
+                changed = False
+                for source in self.sources:
+                    changed |= self._read_source(source, state)
+                if changed:
+                    self._prune(state)
+                    self._save_state(state)
+            self._refreshed_at = time.monotonic()
+            return True
+        finally:
+            self._lock.release()
+
+    def refresh_in_background(self):
+        """Start a refresh thread unless one runs or ran in the last interval"""
+        interval = getattr(settings, 'MONITORING_ACCESS_LOG_REFRESH', 60)
+        with self._state_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < interval:
+                return False
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_quietly, name='accesslog-refresh', daemon=True
+            )
+            self._refresh_thread.start()
+        return True
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh(blocking=False)
+        except Exception as e:
+            self._refreshed_at = time.monotonic()
+            logger.error(f"Access log refresh failed: {e}")
+
+    def route_table(self, source_name, window_seconds=3600, now=None, order_by='count'):
+        """Return per-route count, error rate and p50/p95/p99 for a time window"""
+        state = self._load_state()
+        buckets = state['buckets'].get(source_name, {})
+        cutoff = (now or datetime.now().timestamp()) - window_seconds
+
+        routes = {}
+        for bucket_start, bucket in buckets.items():
+            if int(bucket_start) + BUCKET_SECONDS <= cutoff:
+                continue
+            for route, stats in bucket.items():
+                totals = routes.setdefault(route, {'count': 0, 'errors': 0, 'histogram': {}})
+                totals['count'] += stats['count']
+                totals['errors'] += stats['errors']
+                for b, c in stats['histogram'].items():
+                    totals['histogram'][b] = totals['histogram'].get(b, 0) + c
+
+        rows = []
+        for route, totals in routes.items():
+            quantiles = histogram_quantiles(totals['histogram'], (0.5, 0.95, 0.99))
+            rows.append({
+                'route': route,
+                'count': totals['count'],
+                'errors': totals['errors'],
+                'error_rate': round(totals['errors'] / totals['count'], 4),
+                'p50_ms': quantiles[0.5],
+                'p95_ms': quantiles[0.95],
+                'p99_ms': quantiles[0.99],
+            })
+
+        sort_keys = {
+            'count': lambda row: row['count'],
+            'errors': lambda row: row['error_rate'],
+            'p50': lambda row: row['p50_ms'] or 0,
+            'p95': lambda row: row['p95_ms'] or 0,
+            'p99': lambda row: row['p99_ms'] or 0,
+        }
+        rows.sort(key=sort_keys.get(order_by, sort_keys['count']), reverse=True)
+        return rows
+
+    def _read_source(self, source, state):
+        path = source['path']
+        pattern = LINE_PATTERNS[source.get('format', 'gunicorn')]
+        offsets = state['offsets'].setdefault(source['name'], {'inode': None, 'offset': 0})
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        if offsets['inode'] != stat.st_ino or stat.st_size < offsets['offset']:
+            # The file was rotated: finish the previous file if logrotate kept
+            # it uncompressed, then start the new one from the beginning
+            changed = False
+            rotated = f'{path}.1'
+            if offsets['inode'] is not None and os.path.exists(rotated):
+                if os.stat(rotated).st_ino == offsets['inode']:
+                    changed = self._read_lines(rotated, offsets['offset'], pattern, source, state)[1]
+            offsets['inode'] = stat.st_ino
+            offsets['offset'] = 0
+        else:
+            changed = False
+
+        if stat.st_size == offsets['offset']:
+            return changed
+
+        offsets['offset'], read_any = self._read_lines(path, offsets['offset'], pattern, source, state)
+        return changed or read_any
+
+    def _read_lines(self, path, offset, pattern, source, state):
+        buckets = state['buckets'].setdefault(source['name'], {})
+        read_any = False
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(MAX_READ_BYTES)
+
+        # Only consume complete lines; the rest is picked up next time
+        end = data.rfind(b'\n')
+        if end < 0:
+            return offset, False
+
+        for raw_line in data[:end].split(b'\n'):
+            match = pattern.match(raw_line.decode('utf-8', errors='replace'))
+            if not match:
+                continue
+
+            if match.groupdict().get('micros') is not None:
+                micros = int(match.group('micros'))
+            else:
+                micros = int(float(match.group('seconds')) * 1_000_000)
+
+            try:
+                timestamp = _parse_log_time(match.group('time'))
+            except ValueError:
+                continue
+
+            bucket_start = str(timestamp - timestamp % BUCKET_SECONDS)
+            route = route_template(match.group('path'))
+            stats = buckets.setdefault(bucket_start, {}).setdefault(
+                route, {'count': 0, 'errors': 0, 'histogram': {}}
+            )
+            stats['count'] += 1
+            if int(match.group('status')) >= 500:
+                stats['errors'] += 1
+            bucket = str(histogram_bucket(micros))
+            stats['histogram'][bucket] = stats['histogram'].get(bucket, 0) + 1
+            read_any = True
+
+        return offset + end + 1, read_any
+
+    def _prune(self, state):
+        for name, buckets in state['buckets'].items():
+            for bucket_start in sorted(buckets, key=int)[:-MAX_BUCKETS]:
+                del buckets[bucket_start]
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'offsets': {}, 'buckets': {}}
+
+    def _load_state(self):
+        """The saved state, reusing the parsed copy while the file is unchanged"""
+        with self._state_lock:
+            try:
+                mtime = os.stat(self.state_path).st_mtime_ns
+            except OSError:
+                mtime = None
+
+            if self._state is None or mtime != self._state_mtime:
+                self._state = self._read_state()
+                self._state_mtime = mtime
+            return self._state
+
+    def _save_state(self, state):
+        tmp_path = f'{self.state_path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Failed to save access log state: {e}")
+            return
+        with self._state_lock:
+            self._state, self._state_mtime = state, mtime
+
+
+access_log_analyzer = AccessLogAnalyzer()
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        # Connect the Celery signal handlers that feed /api/monitoring/celery/
+        from . import celery_stats  # noqa: F401
@@ -0,0 +1,186 @@
+"""
+Async versions of the subprocess-heavy monitoring views
+
+Routed instead of the DRF views in monitoring/views.py under ASGI (see
+homework_scraper/async_views.py), with the same URLs, parameters, caching
+and responses. Their shell commands run as asyncio subprocesses, so a slow
+`journalctl` holds no thread. DRF has no async views; requests are
+authenticated with DRF's configured authentication classes in a thread.
+"""
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from homework_scraper.fastjson import JsonResponse
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import acached_endpoint
+from .collectors import (
+    acollect_system_status, acollect_services, acollect_logs,
+    acollect_errors, acollect_processes
+)
+from .snapshot import SECTIONS, acollect_snapshot
+
+
+def _authenticate(request):
+    """(user, WWW-Authenticate header of the first authenticator) as DRF sees them"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    header = authenticators[0].authenticate_header(request) if authenticators else None
+    return Request(request, authenticators=authenticators).user, header
+
+
+def authenticated(view_func):
+    """IsAuthenticated for an async view, answering like DRF does"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user, header = await sync_to_async(_authenticate)(request)
+        except exceptions.AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+
+        if not (user and user.is_authenticated):
+            response = JsonResponse(
+                {'detail': str(exceptions.NotAuthenticated.default_detail)},
+                status=401 if header else 403
+            )
+            if header:
+                response['WWW-Authenticate'] = header
+            return response
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('system-status')
+async def get_system_status(request):
+    """Get system status information"""
+    try:
+        return JsonResponse({
+            'success': True,
+            **await acollect_system_status()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('running-services')
+async def get_running_services(request):
+    """Get status of homework scraper services"""
+    try:
+        return JsonResponse({
+            'success': True,
+            **await acollect_services()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('application-logs')
+async def get_application_logs(request):
+    """Get application logs"""
+    try:
+        log_type = request.GET.get('type', 'django')
+        lines = int(request.GET.get('lines', 100))
+
+        try:
+            logs = await acollect_logs(log_type, lines)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+
+        return JsonResponse({
+            'success': True,
+            **logs
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('recent-errors')
+async def get_recent_errors(request):
+    """Get recent errors from logs"""
+    try:
+        lines = int(request.GET.get('lines', 50))
+
+        return JsonResponse({
+            'success': True,
+            **await acollect_errors(lines)
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('process-info')
+async def get_process_info(request):
+    """Get information about running Python processes"""
+    try:
+        return JsonResponse({
+            'success': True,
+            **await acollect_processes()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+@authenticated
+@acached_endpoint('snapshot')
+async def get_snapshot(request):
+    """
+    Collect several monitoring sections concurrently in one request
+
+    GET /api/monitoring/snapshot/ (see monitoring.views.get_snapshot)
+    """
+    try:
+        requested = request.GET.get('sections')
+        sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(SECTIONS)
+
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown sections: {", ".join(unknown)}',
+                'available_sections': list(SECTIONS)
+            }, status=400)
+
+        results = await acollect_snapshot(sections, request.GET)
+
+        return JsonResponse({
+            'success': all(r['success'] for r in results.values()),
+            'timestamp': datetime.now().isoformat(),
+            'sections': results
+        })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
@@ -0,0 +1,241 @@
+"""
+Short-lived, single-flight response cache for monitoring endpoints
+
+Every monitoring view shells out to `top`, `systemctl`, `journalctl` and
+friends. When several dashboards poll at the same time we only want to pay
+for those subprocesses once per TTL window: the first request computes the
+response, concurrent identical requests wait for it, and later requests are
+served from memory until the entry expires.
+
+TTLs (in seconds) can be overridden per endpoint in settings:
+
+    MONITORING_CACHE_TTLS = {
+        'system-status': 5,
+        'running-services': 10,
+    }
+
+A TTL of 0 disables caching for that endpoint.
+
+The async monitoring views (monitoring/async_views.py) share the same
+entries through acached_endpoint(); their concurrent misses wait on an
+asyncio event instead of blocking a thread.
+"""
+import asyncio
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+DEFAULT_TTLS = {
+    'system-status': 5,
+    'running-services': 10,
+    'application-logs': 5,
+    'recent-errors': 15,
+    'process-info': 5,
+    'snapshot': 5,
+    'celery': 5,
+    'google-api': 5,
+}
+
+DEFAULT_TTL = 5
+MAX_ENTRIES = 128
+
+
+class _InFlight:
+    """A computation other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncInFlight:
+    """A computation other coroutines can wait on"""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """In-process TTL cache that collapses concurrent misses into one call"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (stored_at, ttl, value)
+        self._inflight = {}  # key -> _InFlight
+        self._ainflight = {}  # key -> _AsyncInFlight
+
+    def get_or_compute(self, key, ttl, compute):
+        """
+        Return (value, age_seconds, cache_state) for key
+
+        cache_state is 'HIT' when served from memory, 'SHARED' when this
+        request waited on another thread's computation and 'MISS' when this
+        request did the work itself.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < ttl:
+                return entry[2], now - entry[0], 'HIT'
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._inflight[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, 0, 'SHARED'
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            # SystemExit and the like too, so waiters don't get a cached None
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None and self._is_cacheable(call.result):
+                    self._store(key, ttl, call.result)
+            call.done.set()
+
+        return call.result, 0, 'MISS'
+
+    async def aget_or_compute(self, key, ttl, compute):
+        """get_or_compute() for a coroutine function compute"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < ttl:
+                return entry[2], now - entry[0], 'HIT'
+
+            call = self._ainflight.get(key)
+            leader = call is None
+            if leader:
+                call = _AsyncInFlight()
+                self._ainflight[key] = call
+
+        if not leader:
+            await call.done.wait()
+            if isinstance(call.error, asyncio.CancelledError):
+                # The leader's request went away; compute it ourselves
+                return await self.aget_or_compute(key, ttl, compute)
+            if call.error is not None:
+                raise call.error
+            return call.result, 0, 'SHARED'
+
+        try:
+            call.result = await compute()
+        except BaseException as e:
+            # Cancelled too, so waiters don't hang on a leader that went away
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._ainflight.pop(key, None)
+                if call.error is None and self._is_cacheable(call.result):
+                    self._store(key, ttl, call.result)
+            call.done.set()
+
+        return call.result, 0, 'MISS'
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_cacheable(self, value):
+        status_code = value[0] if isinstance(value, tuple) else 200
+        return status_code < 400
+
+    def _store(self, key, ttl, value):
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            # Drop expired entries first, then the oldest ones
+            self._entries = {
+                k: v for k, v in self._entries.items()
+                if now - v[0] < v[1]
+            }
+            while len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+        self._entries[key] = (now, ttl, value)
+
+
+response_cache = SingleFlightCache()
+
+
+def get_ttl(name):
+    """Get the configured TTL for a monitoring endpoint"""
+    ttls = getattr(settings, 'MONITORING_CACHE_TTLS', {})
+    return ttls.get(name, DEFAULT_TTLS.get(name, DEFAULT_TTL))
+
+
+def cached_endpoint(name):
+    """
+    Cache a DRF monitoring view for its configured TTL
+
+    Must be applied below @api_view/@permission_classes so authentication
+    and permission checks still run for every request.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            ttl = get_ttl(name)
+            if ttl <= 0:
+                return view_func(request, *args, **kwargs)
+
+            params = tuple((k, tuple(v)) for k, v in sorted(request.query_params.lists()))
+            key = (name, args, tuple(sorted(kwargs.items())), params)
+
+            def compute():
+                response = view_func(request, *args, **kwargs)
+                return response.status_code, response.data
+
+            (status_code, data), age, state = response_cache.get_or_compute(key, ttl, compute)
+
+            response = Response(data, status=status_code)
+            response['X-Cache'] = state
+            response['Age'] = str(int(age))
+            return response
+        return wrapper
+    return decorator
+
+
+def acached_endpoint(name):
+    """cached_endpoint() for async views returning a JsonResponse"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            ttl = get_ttl(name)
+            if ttl <= 0:
+                return await view_func(request, *args, **kwargs)
+
+            params = tuple((k, tuple(v)) for k, v in sorted(request.GET.lists()))
+            # Entries hold the encoded body rather than data, so keep them apart
+            key = ('async', name, args, tuple(sorted(kwargs.items())), params)
+
+            async def compute():
+                response = await view_func(request, *args, **kwargs)
+                return response.status_code, response.content
+
+            (status_code, content), age, state = await response_cache.aget_or_compute(key, ttl, compute)
+
+            response = HttpResponse(content, status=status_code, content_type='application/json')
+            response['X-Cache'] = state
+            response['Age'] = str(int(age))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,281 @@
+"""
+Celery queue and task runtime introspection
+
+Signal handlers (connected in MonitoringConfig.ready) record task runtimes,
+failures, retries, per-worker concurrency usage and worker heartbeats into
+Redis, where the web workers can read them. Queue depth and the age of the oldest waiting message
+are read straight from the Redis broker.
+
+Queues to inspect are configured with MONITORING_CELERY_QUEUES (default
+['celery']).
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from celery.signals import (
+    before_task_publish, task_prerun, task_postrun, task_failure,
+    task_retry, celeryd_after_setup, worker_shutdown, heartbeat_sent
+)
+from django.conf import settings
+
+from homework_scraper.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'monitoring:celery'
+TASK_NAMES_KEY = f'{KEY_PREFIX}:task-names'
+WORKERS_KEY = f'{KEY_PREFIX}:workers'
+ACTIVE_KEY = f'{KEY_PREFIX}:active'
+HEARTBEATS_KEY = f'{KEY_PREFIX}:heartbeats'
+STATS_TTL = 7 * 24 * 3600
+
+# Runtime histogram bucket upper bounds in seconds
+RUNTIME_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600]
+
+# Kombu's Redis transport stores priorities 1-9 in separate lists
+PRIORITY_SEPARATOR = '\x06\x16'
+PRIORITY_STEPS = [3, 6, 9]
+
+# Celery sends event heartbeats every 2 seconds; write one in this many
+HEARTBEAT_RECORD_INTERVAL = 10
+
+# task_id -> start time, for tasks running in this worker process
+_task_starts = {}
+_task_starts_lock = threading.Lock()
+_last_heartbeat = 0
+
+
+def task_stats_key(task_name):
+    return f'{KEY_PREFIX}:task:{task_name}'
+
+
+def runtime_bucket(seconds):
+    for bound in RUNTIME_BUCKETS:
+        if seconds <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+def _record(callback):
+    """Run a Redis update without ever failing the task that triggered it"""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        callback(pipe)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record Celery stats: {e}")
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    """Stamp outgoing messages so the oldest waiting message's age is known"""
+    if headers is not None:
+        headers.setdefault('sent_at', time.time())
+
+
+@task_prerun.connect
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    with _task_starts_lock:
+        _task_starts[task_id] = time.monotonic()
+
+    hostname = getattr(task.request, 'hostname', None) or 'unknown'
+    _record(lambda pipe: pipe.hincrby(ACTIVE_KEY, hostname, 1))
+
+
+@task_postrun.connect
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    with _task_starts_lock:
+        started = _task_starts.pop(task_id, None)
+
+    hostname = getattr(task.request, 'hostname', None) or 'unknown'
+    runtime = time.monotonic() - started if started is not None else None
+
+    def update(pipe):
+        pipe.hincrby(ACTIVE_KEY, hostname, -1)
+        key = task_stats_key(task.name)
+        pipe.sadd(TASK_NAMES_KEY, task.name)
+        if runtime is not None:
+            pipe.hincrby(key, 'count', 1)
+            pipe.hincrbyfloat(key, 'runtime_sum', runtime)
+            pipe.hincrby(key, runtime_bucket(runtime), 1)
+        if state == 'SUCCESS':
+            pipe.hincrby(key, 'succeeded', 1)
+        pipe.expire(key, STATS_TTL)
+
+    _record(update)
+
+
+@task_failure.connect
+def on_task_failure(sender=None, **kwargs):
+    name = getattr(sender, 'name', 'unknown')
+    _record(lambda pipe: pipe.hincrby(task_stats_key(name), 'failed', 1))
+
+
+@task_retry.connect
+def on_task_retry(sender=None, **kwargs):
+    name = getattr(sender, 'name', 'unknown')
+    _record(lambda pipe: pipe.hincrby(task_stats_key(name), 'retried', 1))
+
+
+@celeryd_after_setup.connect
+def on_worker_setup(sender=None, instance=None, **kwargs):
+    """Register the worker's pool size and reset its active-task counter"""
+    info = json.dumps({
+        'concurrency': getattr(instance, 'concurrency', None),
+        'pid': os.getpid(),
+        'started_at': time.time(),
+    })
+
+    def update(pipe):
+        pipe.hset(WORKERS_KEY, sender, info)
+        pipe.hset(ACTIVE_KEY, sender, 0)
+        pipe.hset(HEARTBEATS_KEY, sender, time.time())
+
+    _record(update)
+
+
+@heartbeat_sent.connect
+def on_heartbeat(sender=None, **kwargs):
+    """Note that the worker is alive, for the readiness check"""
+    global _last_heartbeat
+    now = time.time()
+    hostname = getattr(getattr(sender, 'eventer', None), 'hostname', None)
+    if not hostname or now - _last_heartbeat < HEARTBEAT_RECORD_INTERVAL:
+        return
+    _last_heartbeat = now
+    _record(lambda pipe: pipe.hset(HEARTBEATS_KEY, hostname, now))
+
+
+@worker_shutdown.connect
+def on_worker_shutdown(sender=None, **kwargs):
+    hostname = getattr(sender, 'hostname', None)
+    if hostname:
+        _record(lambda pipe: (
+            pipe.hdel(WORKERS_KEY, hostname), pipe.hdel(ACTIVE_KEY, hostname), pipe.hdel(HEARTBEATS_KEY, hostname)
+        ))
+
+
+def get_queue_stats(redis_client=None):
+    """Depth and oldest-message age for each configured broker queue"""
+    client = redis_client or get_redis()
+    queues = getattr(settings, 'MONITORING_CELERY_QUEUES', ['celery'])
+    now = time.time()
+
+    results = []
+    for queue in queues:
+        lists = [queue] + [f'{queue}{PRIORITY_SEPARATOR}{step}' for step in PRIORITY_STEPS]
+
+        pipe = client.pipeline(transaction=False)
+        for name in lists:
+            pipe.llen(name)
+        for name in lists:
+            # Kombu LPUSHes and BRPOPs, so the oldest message is at the tail
+            pipe.lindex(name, -1)
+        replies = pipe.execute()
+
+        depth = sum(replies[:len(lists)])
+        oldest_sent_at = None
+        for raw in replies[len(lists):]:
+            sent_at = _message_sent_at(raw)
+            if sent_at is not None and (oldest_sent_at is None or sent_at < oldest_sent_at):
+                oldest_sent_at = sent_at
+
+        results.append({
+            'queue': queue,
+            'depth': depth,
+            'oldest_message_age_seconds': round(now - oldest_sent_at, 1) if oldest_sent_at else None,
+        })
+
+    return {
+        'queues': results,
+        # Messages a worker has prefetched but not yet acknowledged
+        'unacked': client.hlen('unacked'),
+    }
+
+
+def _message_sent_at(raw):
+    if not raw:
+        return None
+    try:
+        message = json.loads(raw)
+        return float(message.get('headers', {}).get('sent_at'))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_worker_stats(redis_client=None):
+    """Concurrency and currently running task count per worker"""
+    client = redis_client or get_redis()
+    workers = client.hgetall(WORKERS_KEY)
+    active = client.hgetall(ACTIVE_KEY)
+
+    results = []
+    for hostname, raw_info in workers.items():
+        info = json.loads(raw_info)
+        running = max(0, int(active.get(hostname, 0)))
+        concurrency = info.get('concurrency')
+        results.append({
+            'hostname': hostname.decode(),
+            'pid': info.get('pid'),
+            'concurrency': concurrency,
+            'active_tasks': running,
+            'utilization': round(running / concurrency, 2) if concurrency else None,
+            'started_at': info.get('started_at'),
+        })
+    return results
+
+
+def get_worker_heartbeats(redis_client=None):
+    """{hostname: seconds since the worker's last recorded heartbeat}"""
+    client = redis_client or get_redis()
+    now = time.time()
+    return {
+        hostname.decode(): round(now - float(beat), 1)
+        for hostname, beat in client.hgetall(HEARTBEATS_KEY).items()
+    }
+
+
+def get_task_stats(redis_client=None):
+    """Runtime histogram, failure and retry counts per task name"""
+    client = redis_client or get_redis()
+    names = sorted(name.decode() for name in client.smembers(TASK_NAMES_KEY))
+
+    pipe = client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(task_stats_key(name))
+    replies = pipe.execute()
+
+    results = []
+    for name, raw_stats in zip(names, replies):
+        stats = {key.decode(): float(value) for key, value in raw_stats.items()}
+        count = int(stats.get('count', 0))
+        histogram = [
+            {'le': bound, 'count': int(stats.get(f'le_{bound}', 0))}
+            for bound in RUNTIME_BUCKETS + ['inf']
+        ]
+        results.append({
+            'task': name,
+            'count': count,
+            'succeeded': int(stats.get('succeeded', 0)),
+            'failed': int(stats.get('failed', 0)),
+            'retried': int(stats.get('retried', 0)),
+            'avg_runtime_seconds': round(stats.get('runtime_sum', 0) / count, 3) if count else None,
+            'p95_runtime_seconds': _histogram_quantile(histogram, count, 0.95),
+            'runtime_histogram': histogram,
+        })
+    return results
+
+
+def _histogram_quantile(histogram, count, quantile):
+    """Upper bound of the bucket holding the given quantile"""
+    if not count:
+        return None
+    seen = 0
+    for bucket in histogram:
+        seen += bucket['count']
+        if seen >= quantile * count:
+            return bucket['le']
+    return 'inf'
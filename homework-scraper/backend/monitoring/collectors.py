@@ -0,0 +1,352 @@
+"""
+Data collectors behind the monitoring views
+
+Each collector gathers one section of monitoring data and returns a plain
+dict, so the same code serves both the individual endpoints and the
+combined snapshot endpoint. `timeout` is the collector's whole budget:
+its shell commands share it, each getting the time that remains.
+
+The `a`-prefixed collectors return the same data for async views. They run
+their commands with asyncio.create_subprocess_exec (no shell; pipes like
+`| grep` are done in Python) and run a section's commands concurrently.
+"""
+import asyncio
+import subprocess
+import os
+import platform
+import re
+import time
+from datetime import datetime
+
+from .logfiles import LOG_FILES
+
+
+DEFAULT_COMMAND_TIMEOUT = 10
+
+SERVICES = [
+    'homework-scraper.service',
+    'homework-scraper-celery.service',
+    'homework-scraper-celery-beat.service',
+]
+
+
+class Deadline:
+    """A time budget shared by several commands"""
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0, self.expires - time.monotonic())
+
+
+def _timed_out():
+    return {
+        'success': False,
+        'output': '',
+        'error': 'Command timed out',
+        'returncode': -1
+    }
+
+
+def run_command(command, timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Execute shell command and return output"""
+    if timeout <= 0:
+        return _timed_out()
+    try:
+        result = subprocess.run(
+            command,
+            shell=True,
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        return {
+            'success': True,
+            'output': result.stdout,
+            'error': result.stderr,
+            'returncode': result.returncode
+        }
+    except subprocess.TimeoutExpired:
+        return _timed_out()
+    except Exception as e:
+        return {
+            'success': False,
+            'output': '',
+            'error': str(e),
+            'returncode': -1
+        }
+
+
+async def arun_command(args, timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Execute a command (argument list, no shell) and return output like run_command()"""
+    if timeout <= 0:
+        return _timed_out()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except Exception as e:
+        return {
+            'success': False,
+            'output': '',
+            'error': str(e),
+            'returncode': -1
+        }
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return _timed_out()
+    except asyncio.CancelledError:
+        # The request went away: don't leave the command running
+        process.kill()
+        raise
+    return {
+        'success': True,
+        'output': stdout.decode('utf-8', errors='replace'),
+        'error': stderr.decode('utf-8', errors='replace'),
+        'returncode': process.returncode
+    }
+
+
+def _grep(output, pattern, ignore_case=False):
+    """Lines of output matching a regex, like grep -E"""
+    regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    return [line for line in output.splitlines() if regex.search(line)]
+
+
+def _section_output(result, select=None):
+    """A command's (selected) output, or 'N/A' if it failed"""
+    if not result['success']:
+        return 'N/A'
+    lines = result['output'].splitlines()
+    return '\n'.join(select(lines) if select else lines).strip()
+
+
+def collect_system_status(timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Get system status information"""
+    system_info = {
+        'hostname': platform.node(),
+        'system': platform.system(),
+        'release': platform.release(),
+        'version': platform.version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'timestamp': datetime.now().isoformat(),
+    }
+
+    # Get uptime
+    if platform.system() == 'Linux':
+        deadline = Deadline(timeout)
+        uptime_result = run_command('uptime -p', deadline.remaining())
+        system_info['uptime'] = uptime_result['output'].strip() if uptime_result['success'] else 'N/A'
+
+        # Get memory info
+        mem_result = run_command('free -h | grep Mem', deadline.remaining())
+        system_info['memory'] = mem_result['output'].strip() if mem_result['success'] else 'N/A'
+
+        # Get disk usage
+        disk_result = run_command('df -h / | tail -1', deadline.remaining())
+        system_info['disk'] = disk_result['output'].strip() if disk_result['success'] else 'N/A'
+
+        # Get CPU usage
+        cpu_result = run_command('top -bn1 | grep "Cpu(s)"', deadline.remaining())
+        system_info['cpu'] = cpu_result['output'].strip() if cpu_result['success'] else 'N/A'
+
+    return {'system_info': system_info}
+
+
+async def acollect_system_status(timeout=DEFAULT_COMMAND_TIMEOUT):
+    system_info = {
+        'hostname': platform.node(),
+        'system': platform.system(),
+        'release': platform.release(),
+        'version': platform.version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'timestamp': datetime.now().isoformat(),
+    }
+
+    if platform.system() == 'Linux':
+        uptime, memory, disk, cpu = await asyncio.gather(
+            arun_command(['uptime', '-p'], timeout),
+            arun_command(['free', '-h'], timeout),
+            arun_command(['df', '-h', '/'], timeout),
+            arun_command(['top', '-bn1'], timeout),
+        )
+        system_info['uptime'] = _section_output(uptime)
+        system_info['memory'] = _section_output(memory, lambda lines: [line for line in lines if 'Mem' in line])
+        system_info['disk'] = _section_output(disk, lambda lines: lines[-1:])
+        system_info['cpu'] = _section_output(cpu, lambda lines: [line for line in lines if 'Cpu(s)' in line])
+
+    return {'system_info': system_info}
+
+
+def collect_services(timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Get status of homework scraper services"""
+    service_status = []
+    deadline = Deadline(timeout)
+
+    for service in SERVICES:
+        if platform.system() == 'Linux':
+            # Check if service exists and get status
+            status_cmd = f'systemctl is-active {service} 2>/dev/null || echo "not-found"'
+            status_result = run_command(status_cmd, deadline.remaining())
+            status = status_result['output'].strip()
+
+            # Get service details if active
+            if status == 'active':
+                details_cmd = f'systemctl status {service} --no-pager -l | head -20'
+                details_result = run_command(details_cmd, deadline.remaining())
+                details = details_result['output'] if details_result['success'] else ''
+            else:
+                details = ''
+
+            service_status.append({
+                'name': service,
+                'status': status,
+                'details': details
+            })
+        else:
+            service_status.append({
+                'name': service,
+                'status': 'unavailable',
+                'details': 'Service monitoring only available on Linux'
+            })
+
+    return {'services': service_status}
+
+
+async def acollect_services(timeout=DEFAULT_COMMAND_TIMEOUT):
+    if platform.system() != 'Linux':
+        return await asyncio.to_thread(collect_services, timeout)
+    deadline = Deadline(timeout)
+    return {'services': list(await asyncio.gather(*(_aservice_status(service, deadline) for service in SERVICES)))}
+
+
+async def _aservice_status(service, deadline):
+    status_result = await arun_command(['systemctl', 'is-active', service], deadline.remaining())
+    status = status_result['output'].strip() or 'not-found'
+
+    details = ''
+    if status == 'active':
+        details_result = await arun_command(['systemctl', 'status', service, '--no-pager', '-l'], deadline.remaining())
+        if details_result['success']:
+            details = '\n'.join(details_result['output'].splitlines()[:20]) + '\n'
+
+    return {
+        'name': service,
+        'status': status,
+        'details': details
+    }
+
+
+def collect_logs(log_type='django', lines=100, timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Get application logs, raising ValueError for unknown log types"""
+    log_file = LOG_FILES.get(log_type)
+
+    if not log_file:
+        raise ValueError(f'Invalid log type: {log_type}')
+
+    # Try to read the log file
+    if os.path.exists(log_file):
+        result = run_command(f'tail -n {lines} {log_file}', timeout)
+        logs = result['output'] if result['success'] else result['error']
+    else:
+        # Fallback: try to get logs from journalctl
+        if log_type in ['django', 'celery', 'celery-beat']:
+            service_name = f'homework-scraper-{log_type}.service' if log_type != 'django' else 'homework-scraper.service'
+            result = run_command(f'journalctl -u {service_name} -n {lines} --no-pager', timeout)
+            logs = result['output'] if result['success'] else f'Log file not found: {log_file}'
+        else:
+            logs = f'Log file not found: {log_file}'
+
+    return {
+        'log_type': log_type,
+        'logs': logs,
+        'lines_requested': lines
+    }
+
+
+async def acollect_logs(log_type='django', lines=100, timeout=DEFAULT_COMMAND_TIMEOUT):
+    log_file = LOG_FILES.get(log_type)
+
+    if not log_file:
+        raise ValueError(f'Invalid log type: {log_type}')
+
+    if os.path.exists(log_file):
+        result = await arun_command(['tail', '-n', str(lines), log_file], timeout)
+        logs = result['output'] if result['success'] else result['error']
+    elif log_type in ['django', 'celery', 'celery-beat']:
+        service_name = f'homework-scraper-{log_type}.service' if log_type != 'django' else 'homework-scraper.service'
+        result = await arun_command(['journalctl', '-u', service_name, '-n', str(lines), '--no-pager'], timeout)
+        logs = result['output'] if result['success'] else f'Log file not found: {log_file}'
+    else:
+        logs = f'Log file not found: {log_file}'
+
+    return {
+        'log_type': log_type,
+        'logs': logs,
+        'lines_requested': lines
+    }
+
+
+def collect_errors(lines=50, timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Get recent errors from logs"""
+    # Search for errors in Django logs
+    if platform.system() == 'Linux':
+        error_cmd = f'journalctl -u homework-scraper.service -n {lines * 10} --no-pager | grep -i "error\\|exception\\|critical" | tail -n {lines}'
+        result = run_command(error_cmd, timeout)
+        errors = result['output'] if result['success'] else 'No errors found or unable to access logs'
+    else:
+        errors = 'Error monitoring only available on Linux'
+
+    return {
+        'errors': errors,
+        'lines_requested': lines
+    }
+
+
+async def acollect_errors(lines=50, timeout=DEFAULT_COMMAND_TIMEOUT):
+    if platform.system() == 'Linux':
+        result = await arun_command(
+            ['journalctl', '-u', 'homework-scraper.service', '-n', str(lines * 10), '--no-pager'], timeout
+        )
+        matches = _grep(result['output'], r'error|exception|critical', ignore_case=True)[-lines:] if result['success'] else []
+        errors = '\n'.join(matches) + '\n' if matches else 'No errors found or unable to access logs'
+    else:
+        errors = 'Error monitoring only available on Linux'
+
+    return {
+        'errors': errors,
+        'lines_requested': lines
+    }
+
+
+def collect_processes(timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Get information about running Python processes"""
+    if platform.system() == 'Linux':
+        # Get Python processes
+        ps_cmd = 'ps aux | grep -E "python|celery|django" | grep -v grep'
+        result = run_command(ps_cmd, timeout)
+        processes = result['output'] if result['success'] else 'Unable to get process info'
+    else:
+        processes = 'Process monitoring only available on Linux'
+
+    return {'processes': processes}
+
+
+async def acollect_processes(timeout=DEFAULT_COMMAND_TIMEOUT):
+    if platform.system() == 'Linux':
+        result = await arun_command(['ps', 'aux'], timeout)
+        matches = _grep(result['output'], r'python|celery|django') if result['success'] else []
+        processes = '\n'.join(matches) + '\n' if matches else 'Unable to get process info'
+    else:
+        processes = 'Process monitoring only available on Linux'
+
+    return {'processes': processes}
@@ -0,0 +1,130 @@
+"""
+Log file locations and helpers for streaming whole log files
+
+Downloads are served in one of three ways:
+
+- Behind nginx, with MONITORING_LOG_ACCEL_REDIRECT configured, the view only
+  returns an X-Accel-Redirect header and nginx sends the file itself (with
+  Range support), so the gunicorn thread is released immediately:
+
+      MONITORING_LOG_ACCEL_REDIRECT = {
+          '/var/log/homework-scraper/': '/protected-logs/app/',
+          '/var/log/nginx/': '/protected-logs/nginx/',
+      }
+
+- Otherwise the file is returned as a FileResponse, which gunicorn sends with
+  sendfile(), or as a 206 partial response when a Range header is present.
+
+- With ?compress=gzip an uncompressed file is gzipped on the fly in chunks.
+  Rotated archives that are already gzipped are always sent as-is.
+"""
+import os
+import re
+import zlib
+
+from django.conf import settings
+
+
+LOG_FILES = {
+    'django': '/var/log/homework-scraper/django.log',
+    'celery': '/var/log/homework-scraper/celery.log',
+    'celery-beat': '/var/log/homework-scraper/celery-beat.log',
+    'nginx': '/var/log/nginx/homework-scraper-access.log',
+    'nginx-error': '/var/log/nginx/homework-scraper-error.log',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+_range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resolve_log_file(log_type, rotation=0):
+    """
+    Get the path of a configured log file or one of its rotated archives
+
+    rotation=0 is the live file, rotation=N is `<file>.N` or `<file>.N.gz`
+    as written by logrotate. Returns None if no such file exists.
+    """
+    log_file = LOG_FILES.get(log_type)
+    if not log_file:
+        return None
+
+    if rotation == 0:
+        candidates = [log_file]
+    else:
+        candidates = [f'{log_file}.{rotation}', f'{log_file}.{rotation}.gz']
+
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def get_accel_redirect(path):
+    """Map a log path to an nginx internal location, if configured"""
+    locations = getattr(settings, 'MONITORING_LOG_ACCEL_REDIRECT', {})
+    for prefix, location in locations.items():
+        if path.startswith(prefix):
+            return location + path[len(prefix):]
+    return None
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range `Range: bytes=...` header
+
+    Returns (start, end) inclusive, None when the header should be ignored
+    (missing, malformed or multi-range) and raises ValueError when the range
+    cannot be satisfied.
+    """
+    if not header:
+        return None
+
+    match = _range_re.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            # RFC 9110 14.1.2: unsatisfiable on an empty file
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path, start, end, chunk_size=CHUNK_SIZE):
+    """Yield bytes start..end (inclusive) of a file in chunks"""
+    remaining = end - start + 1
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def iter_gzip(path, chunk_size=CHUNK_SIZE):
+    """Yield a gzip stream of a file, compressing one chunk at a time"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
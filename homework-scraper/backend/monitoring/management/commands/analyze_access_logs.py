@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from monitoring.accesslog import access_log_analyzer
+
+
+class Command(BaseCommand):
+    help = 'Read new access log lines into the route latency tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            type=str,
+            default='gunicorn',
+            help='Access log source to print after refreshing'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=3600,
+            help='Time window in seconds for the printed table'
+        )
+
+    def handle(self, *args, **options):
+        access_log_analyzer.refresh()
+        rows = access_log_analyzer.route_table(options['source'], window_seconds=options['window'])
+
+        if not rows:
+            self.stdout.write(self.style.WARNING(f"No requests recorded for {options['source']}"))
+            return
+
+        self.stdout.write(f"{'route':<50} {'count':>8} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['route'][:50]:<50} {row['count']:>8} {row['error_rate'] * 100:>6.2f} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+            )
@@ -0,0 +1,156 @@
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse as DjangoJsonResponse
+
+from homework_scraper import compression, fastjson
+
+
+def application_logs(size):
+    """Like GET /api/monitoring/logs/: one string of log lines (DRF view)"""
+    start = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    lines = [
+        f'[{(start + timedelta(seconds=i * 7)).isoformat()}] INFO tasks.views '
+        f'GET /api/tasks/lists/{uuid.UUID(int=i % 40).hex}/tasks 200 {35 + i % 90}ms'
+        for i in range(size)
+    ]
+    return {'success': True, 'log_type': 'django', 'logs': '\n'.join(lines), 'lines_requested': size}
+
+
+def recent_events(size):
+    """Like GET /risc/status/: rows from .values() with datetimes (JsonResponse view)"""
+    start = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+    return {
+        'configured': True,
+        'statistics': {'total_events': size, 'processed_events': size - 3, 'failed_events': 3},
+        'recent_events': [
+            {
+                'event_type': 'https://schemas.openid.net/secevent/risc/event-type/sessions-revoked',
+                'google_email': f'mokinys{i}@example.com',
+                'received_at': start + timedelta(minutes=i, microseconds=i * 1013),
+                'processed': i % 5 != 0,
+                'action_taken': 'Sesijos atšauktos, žetonai panaikinti',
+                'jti': uuid.UUID(int=i),
+                'score': Decimal('0.75') + i,
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def task_list(size):
+    """Like GET /api/tasks/lists/<id>/tasks: Google task resources (JsonResponse view)"""
+    return {
+        'success': True,
+        'tasks': [
+            {
+                'id': f'MTIzNDU2Nzg5MDEy{i:06d}',
+                'title': f'Matematika: uždaviniai {i}–{i + 5} (vadovėlio {i % 200} psl.)',
+                'notes': 'Išspręsti lygtis, patikrinti atsakymus ir įkelti į Eduką. ' * 2,
+                'due': f'2026-03-{i % 28 + 1:02d}T00:00:00.000Z',
+                'status': 'completed' if i % 3 == 0 else 'needsAction',
+                'updated': f'2026-02-{i % 28 + 1:02d}T12:{i % 60:02d}:00.000Z',
+            }
+            for i in range(size)
+        ],
+    }
+
+
+PAYLOADS = {
+    'logs': (application_logs, 'drf'),
+    'risc-events': (recent_events, 'django'),
+    'tasks': (task_list, 'django'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare JSON encoding time and response size before (stdlib encoder, as JsonResponse '
+        'and DRF render) and after (homework_scraper.fastjson), with gzip and brotli sizes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--payload',
+            choices=sorted(PAYLOADS),
+            action='append',
+            dest='payloads',
+            help='Only this payload (repeatable; default all)'
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=500,
+            help='Log lines, events or tasks per payload'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Encodings timed per payload; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        self.stdout.write(
+            f"orjson: {'yes' if fastjson.orjson else 'no (json fallback)'}, "
+            f"brotli: {'yes' if compression.brotli else 'no'}, "
+            f"{options['size']} items per payload, median of {options['iterations']} runs\n"
+        )
+        self.stdout.write(
+            f"{'payload':<12} {'before ms':>9} {'after ms':>9} {'speedup':>8} "
+            f"{'before B':>9} {'after B':>9} {'gzip B':>8} {'gzip ms':>8} {'br B':>8} {'br ms':>7}"
+        )
+
+        for name in options['payloads'] or list(PAYLOADS):
+            build, view_type = PAYLOADS[name]
+            data = build(options['size'])
+            before, after = self.encoders(view_type)
+
+            before_ms, before_body = self.time(before, data, options['iterations'])
+            after_ms, after_body = self.time(after, data, options['iterations'])
+            if json.loads(before_body) != json.loads(after_body):
+                raise CommandError(f'{name}: fast encoder output differs from the stdlib encoder')
+
+            gzip_ms, gzip_body = self.time(lambda body: compression.compress(body, 'gzip'), after_body, 10)
+            if compression.brotli:
+                br_ms, br_body = self.time(lambda body: compression.compress(body, 'br'), after_body, 10)
+                br_bytes, br_time = f'{len(br_body):>8}', f'{br_ms:>7.2f}'
+            else:
+                br_bytes, br_time = f"{'-':>8}", f"{'-':>7}"
+
+            self.stdout.write(
+                f"{name:<12} {before_ms:>9.2f} {after_ms:>9.2f} {before_ms / after_ms:>7.1f}x "
+                f"{len(before_body):>9} {len(after_body):>9} {len(gzip_body):>8} {gzip_ms:>8.2f} "
+                f"{br_bytes} {br_time}"
+            )
+
+    def encoders(self, view_type):
+        """(before, after) functions rendering data to response bytes"""
+        if view_type == 'django':
+            return (
+                lambda data: DjangoJsonResponse(data).content,
+                lambda data: fastjson.JsonResponse(data).content,
+            )
+
+        from rest_framework.renderers import JSONRenderer
+
+        from homework_scraper.renderers import FastJSONRenderer
+
+        return JSONRenderer().render, FastJSONRenderer().render
+
+    def time(self, func, data, iterations):
+        """(median ms, result) of calling func(data)"""
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result = func(data)
+            times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times), result
@@ -0,0 +1,153 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Where manage.py lives; the child process imports the project from here
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# What a worker does before serving its first request: settings and app
+# registry, middleware, then the URLconf, which gunicorn workers load after
+# the fork from the preloaded master
+STARTUP_SCRIPT = '''\
+import time
+start = time.perf_counter()
+import django
+django.setup()
+from {handler_module} import {handler}
+{handler}()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(f'startup-ms {{(time.perf_counter() - start) * 1000:.1f}}')
+'''
+
+HANDLERS = {
+    'wsgi': ('django.core.handlers.wsgi', 'WSGIHandler'),
+    'asgi': ('django.core.handlers.asgi', 'ASGIHandler'),
+}
+
+# import time:       self [us] |  cumulative | imported package
+_importtime_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$')
+
+
+def parse_importtime(output):
+    """(module, self ms, cumulative ms, depth) for each line of -X importtime output"""
+    modules = []
+    for line in output.splitlines():
+        match = _importtime_re.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+    return modules
+
+
+def package_totals(modules):
+    """{top-level package: (self ms, module count)}"""
+    totals = defaultdict(lambda: [0.0, 0])
+    for name, self_ms, _, _ in modules:
+        total = totals[name.split('.')[0]]
+        total[0] += self_ms
+        total[1] += 1
+    return {package: tuple(total) for package, total in totals.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Report which modules a worker spends its cold start importing (python -X importtime), '
+        'and optionally fail when the start-up time goes over a budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=25,
+            help='Number of modules and packages to list'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'self'],
+            default='cumulative',
+            help='cumulative finds what pulls a heavy dependency in; self finds the slow module itself'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=sorted(HANDLERS),
+            default='wsgi',
+            help='Handler and view routing to start (asgi routes the async views)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Start-ups timed without -X importtime; the median is reported'
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            help='Exit with an error when the median start-up time is over this (for CI)'
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+
+        # -X importtime slows imports down, so time start-up in separate runs
+        _, report = self.start(options['mode'], importtime=True)
+        modules = parse_importtime(report)
+        if not modules:
+            raise CommandError('No -X importtime output from the start-up process')
+        times = [self.start(options['mode'])[0] for _ in range(options['runs'])]
+        median = statistics.median(times)
+
+        if options['top'] > 0:
+            self.print_modules(modules, options['sort'], options['top'])
+            self.print_packages(modules, options['top'])
+
+        self.stdout.write(
+            f"\n{len(modules)} modules, {sum(m[1] for m in modules):.0f}ms of imports (under -X importtime)"
+        )
+        self.stdout.write(
+            f"{options['mode']} start-up: median {median:.0f}ms, "
+            f"min {min(times):.0f}ms over {len(times)} runs"
+        )
+
+        budget = options['budget_ms']
+        if budget is not None:
+            if median > budget:
+                raise CommandError(f'Start-up took {median:.0f}ms, over the {budget:.0f}ms budget')
+            self.stdout.write(self.style.SUCCESS(f'Within the {budget:.0f}ms budget'))
+
+    def start(self, mode, importtime=False):
+        """Start a fresh interpreter like a worker would; (start-up ms, stderr)"""
+        handler_module, handler = HANDLERS[mode]
+        env = dict(os.environ, DJANGO_ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += ['-c', STARTUP_SCRIPT.format(handler_module=handler_module, handler=handler)]
+
+        result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+        match = re.search(r'^startup-ms ([\d.]+)$', result.stdout, re.MULTILINE)
+        if result.returncode != 0 or not match:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+            raise CommandError('Start-up failed:\n' + '\n'.join(errors[-20:]))
+        return float(match.group(1)), result.stderr
+
+    def print_modules(self, modules, sort, top):
+        key = 2 if sort == 'cumulative' else 1
+        self.stdout.write(f"Top {top} modules by {sort} import time")
+        self.stdout.write(f"{'self ms':>8} {'cumul ms':>9}  module")
+        for name, self_ms, cumulative_ms, depth in sorted(modules, key=lambda m: m[key], reverse=True)[:top]:
+            self.stdout.write(f"{self_ms:>8.1f} {cumulative_ms:>9.1f}  {'  ' * min(depth, 8)}{name}")
+
+    def print_packages(self, modules, top):
+        totals = package_totals(modules)
+        self.stdout.write(f"\nTop {top} packages by import time")
+        self.stdout.write(f"{'ms':>8} {'modules':>8}  package")
+        for package, (self_ms, count) in sorted(totals.items(), key=lambda t: t[1][0], reverse=True)[:top]:
+            self.stdout.write(f"{self_ms:>8.1f} {count:>8}  {package}")
@@ -0,0 +1,243 @@
+"""
+tracemalloc-based memory growth reports per worker process
+
+Opt in with MONITORING_TRACEMALLOC = True (or the MONITORING_TRACEMALLOC=1
+environment variable). gunicorn's post_worker_init hook then starts
+tracemalloc in each worker together with a daemon thread that takes a
+snapshot every MONITORING_TRACEMALLOC_INTERVAL seconds (default 300), diffs
+it against the first snapshot and the previous one, and writes the top
+allocation sites by growth to `<data dir>/memory/<pid>.json`.
+
+Reports are files so any worker can serve any other worker's report through
+/api/monitoring/memory/<pid>/. An on-demand snapshot of another worker is
+requested by touching `<pid>.request`, which its sampler thread polls for.
+
+tracemalloc slows allocations down noticeably, so leave it off unless a leak
+is being investigated.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+
+from .utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+TOP_SITES = 25
+REQUEST_POLL_INTERVAL = 2
+
+_snapshot_filters = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def is_enabled():
+    return bool(
+        getattr(settings, 'MONITORING_TRACEMALLOC', False) or
+        os.environ.get('MONITORING_TRACEMALLOC') == '1'
+    )
+
+
+def report_path(pid):
+    return os.path.join(get_data_dir('memory'), f'{pid}.json')
+
+
+def request_path(pid):
+    return os.path.join(get_data_dir('memory'), f'{pid}.request')
+
+
+def read_rss_bytes():
+    """Resident set size of this process (Linux only)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _format_growth(stats, limit=TOP_SITES):
+    rows = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        rows.append({
+            'site': f'{frame.filename}:{frame.lineno}',
+            'traceback': [f'{f.filename}:{f.lineno}' for f in stat.traceback],
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'count_diff': stat.count_diff,
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        })
+    return rows
+
+
+class MemoryTracer:
+    """Periodic tracemalloc snapshots and growth reports for this process"""
+
+    def __init__(self):
+        self.pid = None
+        self.started_at = None
+        self._baseline = None
+        self._previous = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.pid == os.getpid() and tracemalloc.is_tracing()
+
+    def start(self):
+        if self.running:
+            return
+        frames = getattr(settings, 'MONITORING_TRACEMALLOC_FRAMES', 10)
+        tracemalloc.start(frames)
+
+        self.pid = os.getpid()
+        self.started_at = datetime.now().isoformat()
+        self._baseline = self._take_snapshot()
+        self._previous = self._baseline
+
+        self._thread = threading.Thread(
+            target=self._run, name='tracemalloc-sampler', daemon=True
+        )
+        self._thread.start()
+        logger.warning(f"tracemalloc started in worker {self.pid} ({frames} frames)")
+
+    def snapshot(self):
+        """Take a snapshot now, write the report file and return the report"""
+        with self._lock:
+            current = self._take_snapshot()
+            since_start = current.compare_to(self._baseline, 'traceback')
+            since_last = current.compare_to(self._previous, 'traceback')
+            self._previous = current
+
+            traced_current, traced_peak = tracemalloc.get_traced_memory()
+            report = {
+                'pid': self.pid,
+                'tracing_since': self.started_at,
+                'snapshot_at': datetime.now().isoformat(),
+                'rss_kb': (read_rss_bytes() or 0) // 1024,
+                'traced_current_kb': traced_current // 1024,
+                'traced_peak_kb': traced_peak // 1024,
+                'top_growth_since_start': _format_growth(since_start),
+                'top_growth_since_last': _format_growth(since_last),
+            }
+
+            tmp_path = f'{report_path(self.pid)}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(report, f)
+            os.replace(tmp_path, report_path(self.pid))
+            return report
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_snapshot_filters)
+
+    def _run(self):
+        interval = getattr(settings, 'MONITORING_TRACEMALLOC_INTERVAL', 300)
+        next_snapshot = time.monotonic() + interval
+        while True:
+            time.sleep(REQUEST_POLL_INTERVAL)
+            requested = os.path.exists(request_path(self.pid))
+            if requested or time.monotonic() >= next_snapshot:
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    logger.error(f"tracemalloc snapshot failed: {e}")
+                if requested:
+                    try:
+                        os.remove(request_path(self.pid))
+                    except OSError:
+                        pass
+                next_snapshot = time.monotonic() + interval
+
+
+memory_tracer = MemoryTracer()
+
+
+def maybe_start_tracing():
+    """Start tracing in this worker if memory diagnostics are enabled"""
+    if is_enabled():
+        memory_tracer.start()
+
+
+def list_reports():
+    """Summaries of the latest report of every live worker"""
+    reports = []
+    directory = get_data_dir('memory')
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        pid = int(name[:-len('.json')])
+        if not _pid_alive(pid):
+            # Worker was recycled; its report is no longer useful
+            _remove(os.path.join(directory, name))
+            continue
+        report = read_report(pid)
+        if report:
+            reports.append({
+                'pid': pid,
+                'snapshot_at': report['snapshot_at'],
+                'rss_kb': report['rss_kb'],
+                'traced_current_kb': report['traced_current_kb'],
+                'traced_peak_kb': report['traced_peak_kb'],
+                'top_site': (report['top_growth_since_start'] or [None])[0],
+            })
+    return reports
+
+
+def read_report(pid):
+    try:
+        with open(report_path(pid)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def request_snapshot(pid, wait=10):
+    """Get a fresh report for a worker, asking its sampler thread if needed"""
+    if pid == os.getpid() and memory_tracer.running:
+        return memory_tracer.snapshot()
+
+    if not _pid_alive(pid):
+        return None
+
+    # Only tracing workers write reports; nothing else would answer
+    previous = read_report(pid)
+    if previous is None:
+        return None
+    open(request_path(pid), 'w').close()
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        report = read_report(pid)
+        if report and report['snapshot_at'] != previous['snapshot_at']:
+            return report
+
+    _remove(request_path(pid))
+    return previous
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,221 @@
+"""
+On-demand request profiling for staff users
+
+Add the middleware after AuthenticationMiddleware:
+
+    MIDDLEWARE = [
+        ...
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'monitoring.profiling.ProfilingMiddleware',
+    ]
+
+A request is profiled only when it carries an `X-Profile: 1` header or a
+`?_profile=1` query flag, comes from a staff user and passes the sample rate
+(MONITORING_PROFILE_SAMPLE_RATE, default 1.0). Every other request only pays
+for one header lookup.
+
+cProfile hooks the calling thread, so profiles are taken one at a time: if a
+profile is already running in another gthread thread the request is served
+normally. Results are written to a bounded ring of files in the monitoring
+data directory (MONITORING_PROFILE_MAX, default 50) and can be listed and
+downloaded through /api/monitoring/profiles/.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+
+from .utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_FLAG = '_profile'
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+TOP_FUNCTIONS = 30
+
+# Only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+class SQLTimer:
+    """Execute wrapper that counts queries and the time spent running them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class ProfileStore:
+    """Bounded on-disk ring of request profiles"""
+
+    def __init__(self, directory=None, max_profiles=None):
+        self._directory = directory
+        self.max_profiles = max_profiles or getattr(settings, 'MONITORING_PROFILE_MAX', 50)
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = get_data_dir('profiles')
+        return self._directory
+
+    def save(self, summary, profiler):
+        """Write summary JSON and raw pstats data, then trim the ring"""
+        profile_id = summary['id']
+        profiler.dump_stats(self.stats_path(profile_id))
+        with open(self.summary_path(profile_id), 'w') as f:
+            json.dump(summary, f)
+        self._trim()
+
+    def list(self):
+        """Return stored profile summaries, newest first"""
+        summaries = []
+        for profile_id in self._ids(reverse=True):
+            summary = self.get(profile_id)
+            if summary:
+                summaries.append(summary)
+        return summaries
+
+    def get(self, profile_id):
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self.summary_path(profile_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def summary_path(self, profile_id):
+        return os.path.join(self.directory, f'{profile_id}.json')
+
+    def stats_path(self, profile_id):
+        return os.path.join(self.directory, f'{profile_id}.prof')
+
+    def _ids(self, reverse=False):
+        ids = [
+            name[:-len('.json')] for name in os.listdir(self.directory)
+            if name.endswith('.json')
+        ]
+        # IDs start with a millisecond timestamp so they sort chronologically
+        return sorted(ids, key=lambda i: int(i.split('-')[0]), reverse=reverse)
+
+    def _trim(self):
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            for path in (self.summary_path(profile_id), self.stats_path(profile_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+profile_store = ProfileStore()
+
+
+def summarize_stats(profiler, limit=TOP_FUNCTIONS):
+    """Extract the top functions by cumulative time from a profiler"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (cc, nc, tottime, cumtime, callers) in stats.stats.items():
+        rows.append({
+            'function': func,
+            'file': filename,
+            'line': line,
+            'calls': nc,
+            'primitive_calls': cc,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class ProfilingMiddleware:
+    """Profile individual requests when a staff user asks for it"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._is_requested(request):
+            return self.get_response(request)
+
+        if not self._is_allowed(request):
+            return self.get_response(request)
+
+        if not _profile_lock.acquire(blocking=False):
+            logger.info("Profile already running, serving request unprofiled")
+            return self.get_response(request)
+
+        try:
+            return self._profile(request)
+        finally:
+            _profile_lock.release()
+
+    def _is_requested(self, request):
+        return (
+            request.META.get(PROFILE_HEADER) == '1' or
+            request.GET.get(PROFILE_QUERY_FLAG) == '1'
+        )
+
+    def _is_allowed(self, request):
+        user = getattr(request, 'user', None)
+        if not (user and user.is_authenticated and user.is_staff):
+            return False
+        sample_rate = getattr(settings, 'MONITORING_PROFILE_SAMPLE_RATE', 1.0)
+        return random.random() < sample_rate
+
+    def _profile(self, request):
+        profiler = cProfile.Profile()
+        sql_timer = SQLTimer()
+        started_at = datetime.now()
+        start = time.perf_counter()
+
+        with connection.execute_wrapper(sql_timer):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        wall_time = time.perf_counter() - start
+        profile_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}'
+
+        summary = {
+            'id': profile_id,
+            'method': request.method,
+            'path': request.path,
+            'user': request.user.get_username(),
+            'status_code': response.status_code,
+            'created_at': started_at.isoformat(),
+            'wall_time_ms': round(wall_time * 1000, 3),
+            'sql_time_ms': round(sql_timer.duration * 1000, 3),
+            'sql_queries': sql_timer.count,
+            'top_functions': summarize_stats(profiler),
+        }
+
+        try:
+            profile_store.save(summary, profiler)
+            response['X-Profile-Id'] = profile_id
+        except OSError as e:
+            logger.error(f"Failed to store request profile: {e}")
+
+        return response
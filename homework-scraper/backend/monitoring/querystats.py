@@ -0,0 +1,198 @@
+"""
+Per-request SQL instrumentation: query counts, slow queries and N+1 detection
+
+Add the middleware to settings:
+
+    MIDDLEWARE = [
+        ...
+        'monitoring.querystats.QueryStatsMiddleware',
+    ]
+
+Every request gets a connection execute wrapper that counts queries and DB
+time. Queries slower than MONITORING_SLOW_QUERY_MS (default 100) are kept
+with a short stack of project frames, and a query shape (SQL with literals
+and IN-lists collapsed) repeated MONITORING_N_PLUS_ONE_THRESHOLD times
+(default 5) within one request is flagged as a likely N+1.
+
+Results are aggregated per view into a bounded in-memory store and exposed
+through /api/monitoring/queries/.
+"""
+import re
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict, deque
+
+from django.conf import settings
+from django.db import connection
+
+
+MAX_VIEWS = 200
+MAX_SLOW_QUERIES = 10
+MAX_SHAPES = 10
+STACK_DEPTH = 5
+
+_whitespace_re = re.compile(r'\s+')
+_in_list_re = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\w\'".]+)\s*,?)+\)', re.IGNORECASE)
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def normalize_sql(sql):
+    """Reduce a SQL statement to its shape so repeated queries compare equal"""
+    shape = _whitespace_re.sub(' ', sql).strip()
+    shape = _string_re.sub('?', shape)
+    shape = _number_re.sub('?', shape)
+    shape = _in_list_re.sub('IN (...)', shape)
+    return shape.replace('%s', '?')
+
+
+def short_stack(depth=STACK_DEPTH):
+    """Return the innermost project frames that led to a query"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if 'site-packages' not in frame.filename
+        and '/django/' not in frame.filename
+        and not frame.filename.endswith('querystats.py')
+    ]
+    return [
+        f'{frame.filename}:{frame.lineno} in {frame.name}'
+        for frame in frames[-depth:]
+    ]
+
+
+class QueryRecorder:
+    """Execute wrapper collecting query statistics for a single request"""
+
+    def __init__(self, slow_threshold):
+        self.slow_threshold = slow_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.shapes[normalize_sql(sql)] += 1
+            if elapsed >= self.slow_threshold:
+                self.slow_queries.append({
+                    'sql': sql[:2000],
+                    'duration_ms': round(elapsed * 1000, 3),
+                    'stack': short_stack(),
+                })
+
+
+class QueryStatsStore:
+    """Bounded per-view aggregate of query statistics"""
+
+    def __init__(self, max_views=MAX_VIEWS):
+        self.max_views = max_views
+        self._lock = threading.Lock()
+        self._views = OrderedDict()
+
+    def record(self, view_name, recorder, n_plus_one_threshold):
+        repeated = {
+            shape: count for shape, count in recorder.shapes.items()
+            if count >= n_plus_one_threshold
+        }
+
+        with self._lock:
+            stats = self._views.pop(view_name, None)
+            if stats is None:
+                stats = {
+                    'requests': 0,
+                    'queries': 0,
+                    'db_time': 0.0,
+                    'max_queries': 0,
+                    'max_db_time': 0.0,
+                    'n_plus_one_requests': 0,
+                    'n_plus_one_shapes': Counter(),
+                    'slow_queries': deque(maxlen=MAX_SLOW_QUERIES),
+                }
+            # Re-inserting keeps the most recently used views at the end
+            self._views[view_name] = stats
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+
+            stats['requests'] += 1
+            stats['queries'] += recorder.count
+            stats['db_time'] += recorder.duration
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            stats['max_db_time'] = max(stats['max_db_time'], recorder.duration)
+            stats['slow_queries'].extend(recorder.slow_queries)
+
+            if repeated:
+                stats['n_plus_one_requests'] += 1
+                shapes = stats['n_plus_one_shapes']
+                for shape, count in repeated.items():
+                    shapes[shape] = max(shapes[shape], count)
+                if len(shapes) > MAX_SHAPES:
+                    stats['n_plus_one_shapes'] = Counter(dict(shapes.most_common(MAX_SHAPES)))
+
+    def report(self, order_by='db_time', limit=20):
+        """Rank views by total DB time, query count, N+1 requests or slow queries"""
+        with self._lock:
+            rows = []
+            for view_name, stats in self._views.items():
+                requests = stats['requests']
+                rows.append({
+                    'view': view_name,
+                    'requests': requests,
+                    'queries': stats['queries'],
+                    'avg_queries': round(stats['queries'] / requests, 2),
+                    'max_queries': stats['max_queries'],
+                    'db_time_ms': round(stats['db_time'] * 1000, 3),
+                    'avg_db_time_ms': round(stats['db_time'] * 1000 / requests, 3),
+                    'max_db_time_ms': round(stats['max_db_time'] * 1000, 3),
+                    'n_plus_one_requests': stats['n_plus_one_requests'],
+                    'n_plus_one_shapes': [
+                        {'sql': shape, 'repeats': count}
+                        for shape, count in stats['n_plus_one_shapes'].most_common()
+                    ],
+                    'slow_queries': list(stats['slow_queries']),
+                })
+
+        sort_keys = {
+            'db_time': lambda row: row['db_time_ms'],
+            'avg_db_time': lambda row: row['avg_db_time_ms'],
+            'queries': lambda row: row['queries'],
+            'avg_queries': lambda row: row['avg_queries'],
+            'n_plus_one': lambda row: row['n_plus_one_requests'],
+            'slow': lambda row: len(row['slow_queries']),
+        }
+        rows.sort(key=sort_keys.get(order_by, sort_keys['db_time']), reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+query_stats = QueryStatsStore()
+
+
+class QueryStatsMiddleware:
+    """Record query count, DB time, slow queries and N+1 patterns per view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, 'MONITORING_SLOW_QUERY_MS', 100) / 1000
+        self.n_plus_one_threshold = getattr(settings, 'MONITORING_N_PLUS_ONE_THRESHOLD', 5)
+
+    def __call__(self, request):
+        recorder = QueryRecorder(self.slow_threshold)
+
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name or match._func_path) if match else '<unresolved>'
+        query_stats.record(view_name, recorder, self.n_plus_one_threshold)
+
+        return response
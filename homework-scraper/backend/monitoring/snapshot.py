@@ -0,0 +1,160 @@
+"""
+Concurrent collection of several monitoring sections in one request
+
+Sections run on a shared thread pool (MONITORING_SNAPSHOT_WORKERS, default
+one thread per section). Each section has its own timeout
+(MONITORING_SNAPSHOT_TIMEOUTS), counted from when a thread starts running
+it. Its collector gives its shell commands only the part of that budget
+that remains, so one slow `journalctl` marks its own section as timed out
+and frees its thread instead of stalling the whole snapshot. A section
+still waiting for a thread after its timeout (the pool busy with other
+requests) is cancelled.
+
+acollect_snapshot() is the async version: sections run as concurrent tasks
+on the event loop (their commands as subprocesses), with no thread pool.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+
+from .collectors import (
+    collect_system_status, collect_services, collect_logs,
+    collect_errors, collect_processes,
+    acollect_system_status, acollect_services, acollect_logs,
+    acollect_errors, acollect_processes
+)
+
+
+DEFAULT_TIMEOUTS = {
+    'system': 5,
+    'services': 8,
+    'logs': 5,
+    'errors': 8,
+    'processes': 5,
+}
+
+SECTIONS = {
+    'system': lambda params, timeout: collect_system_status(timeout),
+    'services': lambda params, timeout: collect_services(timeout),
+    'logs': lambda params, timeout: collect_logs(
+        params.get('log_type', 'django'), int(params.get('lines', 100)), timeout
+    ),
+    'errors': lambda params, timeout: collect_errors(int(params.get('error_lines', 50)), timeout),
+    'processes': lambda params, timeout: collect_processes(timeout),
+}
+
+ASYNC_SECTIONS = {
+    'system': lambda params, timeout: acollect_system_status(timeout),
+    'services': lambda params, timeout: acollect_services(timeout),
+    'logs': lambda params, timeout: acollect_logs(
+        params.get('log_type', 'django'), int(params.get('lines', 100)), timeout
+    ),
+    'errors': lambda params, timeout: acollect_errors(int(params.get('error_lines', 50)), timeout),
+    'processes': lambda params, timeout: acollect_processes(timeout),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'MONITORING_SNAPSHOT_WORKERS', len(SECTIONS)),
+            thread_name_prefix='monitoring-snapshot'
+        )
+    return _executor
+
+
+def get_section_timeout(section):
+    timeouts = getattr(settings, 'MONITORING_SNAPSHOT_TIMEOUTS', {})
+    return timeouts.get(section, DEFAULT_TIMEOUTS[section])
+
+
+def _run_section(section, params, timeout, started):
+    started.append(time.monotonic())
+    start = time.perf_counter()
+    data = SECTIONS[section](params, timeout)
+    data['success'] = True
+    data['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return data
+
+
+def collect_snapshot(sections, params):
+    """
+    Collect the requested sections concurrently
+
+    Returns a dict of section name -> section data. Sections that fail or
+    exceed their timeout are returned with success=False and an error.
+    """
+    executor = get_executor()
+    submitted = time.monotonic()
+
+    futures = {}
+    for section in sections:
+        timeout = get_section_timeout(section)
+        started = []  # When a thread picks it up
+        future = executor.submit(_run_section, section, params, timeout, started)
+        futures[section] = (future, timeout, started)
+
+    results = {}
+    for section, (future, timeout, started) in futures.items():
+        try:
+            results[section] = _wait_for_section(future, timeout, started, submitted)
+        except TimeoutError:
+            results[section] = {
+                'success': False,
+                'error': f'Timed out after {timeout}s'
+            }
+        except Exception as e:
+            results[section] = {
+                'success': False,
+                'error': str(e)
+            }
+    return results
+
+
+def _wait_for_section(future, timeout, started, submitted):
+    """A section's result, waiting at most timeout from when it started running"""
+    try:
+        return future.result(timeout=max(0, submitted + timeout - time.monotonic()))
+    except TimeoutError:
+        if future.cancel():
+            # Never got a thread
+            raise
+
+    # Running, but it may have waited for a thread first
+    start = started[0] if started else time.monotonic()
+    return future.result(timeout=max(0, start + timeout - time.monotonic()))
+
+
+async def _arun_section(section, params, timeout):
+    start = time.perf_counter()
+    data = await ASYNC_SECTIONS[section](params, timeout)
+    data['success'] = True
+    data['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return data
+
+
+async def _arun_section_within(section, params):
+    timeout = get_section_timeout(section)
+    try:
+        return await asyncio.wait_for(_arun_section(section, params, timeout), timeout)
+    except asyncio.TimeoutError:
+        return {
+            'success': False,
+            'error': f'Timed out after {timeout}s'
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+async def acollect_snapshot(sections, params):
+    """collect_snapshot() with every section as a task on the event loop"""
+    results = await asyncio.gather(*(_arun_section_within(section, params) for section in sections))
+    return dict(zip(sections, results))
@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from .logfiles import parse_range_header
+
+# A cold worker start on the Pi; override with STARTUP_BUDGET_MS
+DEFAULT_STARTUP_BUDGET_MS = 3000
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def test_cold_start_within_budget(self):
+        """A new top-level import of a heavy client fails this"""
+        budget_ms = getattr(settings, 'STARTUP_BUDGET_MS', DEFAULT_STARTUP_BUDGET_MS)
+        try:
+            call_command('profile_imports', budget_ms=budget_ms, runs=3, top=0, stdout=StringIO())
+        except CommandError as e:
+            self.fail(str(e))
+
+
+class ParseRangeHeaderTests(SimpleTestCase):
+    def test_no_or_ignored_header(self):
+        self.assertIsNone(parse_range_header('', 100))
+        self.assertIsNone(parse_range_header('bytes=-', 100))
+        self.assertIsNone(parse_range_header('bytes=0-1,5-6', 100))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range_header('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range_header('bytes=90-200', 100), (90, 99))
+
+    def test_open_range(self):
+        self.assertEqual(parse_range_header('bytes=40-', 100), (40, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range_header('bytes=-30', 100), (70, 99))
+        self.assertEqual(parse_range_header('bytes=-500', 100), (0, 99))
+
+    def test_empty_file(self):
+        for header in ('bytes=-30', 'bytes=0-', 'bytes=0-10'):
+            with self.assertRaises(ValueError):
+                parse_range_header(header, 0)
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=150-200', 'bytes=20-10', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range_header(header, 100)
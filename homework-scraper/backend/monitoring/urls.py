@@ -2,13 +2,24 @@
 URL configuration for monitoring app
 """
 from django.urls import path
-from . import views
+from homework_scraper.async_views import sync_or_async
+from . import async_views, views
 
 urlpatterns = [
     path('', views.monitoring_info, name='monitoring-info'),
-    path('system-status/', views.get_system_status, name='system-status'),
-    path('services/', views.get_running_services, name='running-services'),
-    path('logs/', views.get_application_logs, name='application-logs'),
-    path('errors/', views.get_recent_errors, name='recent-errors'),
-    path('processes/', views.get_process_info, name='process-info'),
+    path('system-status/', sync_or_async(views.get_system_status, async_views.get_system_status), name='system-status'),
+    path('services/', sync_or_async(views.get_running_services, async_views.get_running_services), name='running-services'),
+    path('logs/', sync_or_async(views.get_application_logs, async_views.get_application_logs), name='application-logs'),
+    path('logs/download/', views.download_log, name='download-log'),
+    path('errors/', sync_or_async(views.get_recent_errors, async_views.get_recent_errors), name='recent-errors'),
+    path('processes/', sync_or_async(views.get_process_info, async_views.get_process_info), name='process-info'),
+    path('snapshot/', sync_or_async(views.get_snapshot, async_views.get_snapshot), name='snapshot'),
+    path('celery/', views.get_celery_status, name='celery-status'),
+    path('google-api/', views.get_google_api_stats, name='google-api-stats'),
+    path('profiles/', views.list_profiles, name='list-profiles'),
+    path('profiles/<str:profile_id>/', views.download_profile, name='download-profile'),
+    path('queries/', views.get_query_stats, name='query-stats'),
+    path('memory/', views.list_memory_reports, name='memory-reports'),
+    path('memory/<int:pid>/', views.get_memory_report, name='memory-report'),
+    path('latency/', views.get_route_latency, name='route-latency'),
 ]
@@ -0,0 +1,24 @@
+"""
+Shared helpers for the monitoring app
+"""
+import os
+import tempfile
+
+from django.conf import settings
+
+
+def get_data_dir(name):
+    """
+    Get (and create) a directory for monitoring data such as stored profiles
+
+    The base directory defaults to a folder in the system temp dir and can be
+    changed with the MONITORING_DATA_DIR setting.
+    """
+    base_dir = getattr(
+        settings,
+        'MONITORING_DATA_DIR',
+        os.path.join(tempfile.gettempdir(), 'homework-scraper-monitoring')
+    )
+    path = os.path.join(base_dir, name)
+    os.makedirs(path, exist_ok=True)
+    return path
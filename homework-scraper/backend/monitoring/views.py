@@ -1,86 +1,41 @@
 """
 Views for monitoring server logs and system status
 """
-import subprocess
 import os
-import platform
 from datetime import datetime
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-
-
-def run_command(command):
-    """Execute shell command and return output"""
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        return {
-            'success': True,
-            'output': result.stdout,
-            'error': result.stderr,
-            'returncode': result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'output': '',
-            'error': 'Command timed out',
-            'returncode': -1
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'output': '',
-            'error': str(e),
-            'returncode': -1
-        }
+from .cache import cached_endpoint
+from .collectors import (
+    collect_system_status, collect_services, collect_logs,
+    collect_errors, collect_processes
+)
+from .snapshot import SECTIONS, collect_snapshot
+from .logfiles import (
+    LOG_FILES, resolve_log_file, get_accel_redirect, parse_range_header,
+    iter_file_range, iter_gzip
+)
+from .profiling import profile_store
+from .querystats import query_stats
+from .accesslog import access_log_analyzer
+from .celery_stats import get_queue_stats, get_worker_stats, get_task_stats
+from homework_scraper.google_api import get_latency_stats
+from . import memory
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_endpoint('system-status')
 def get_system_status(request):
     """Get system status information"""
     try:
-        # Get system info
-        system_info = {
-            'hostname': platform.node(),
-            'system': platform.system(),
-            'release': platform.release(),
-            'version': platform.version(),
-            'machine': platform.machine(),
-            'processor': platform.processor(),
-            'timestamp': datetime.now().isoformat(),
-        }
-        
-        # Get uptime
-        if platform.system() == 'Linux':
-            uptime_result = run_command('uptime -p')
-            system_info['uptime'] = uptime_result['output'].strip() if uptime_result['success'] else 'N/A'
-            
-            # Get memory info
-            mem_result = run_command('free -h | grep Mem')
-            system_info['memory'] = mem_result['output'].strip() if mem_result['success'] else 'N/A'
-            
-            # Get disk usage
-            disk_result = run_command('df -h / | tail -1')
-            system_info['disk'] = disk_result['output'].strip() if disk_result['success'] else 'N/A'
-            
-            # Get CPU usage
-            cpu_result = run_command('top -bn1 | grep "Cpu(s)"')
-            system_info['cpu'] = cpu_result['output'].strip() if cpu_result['success'] else 'N/A'
-        
         return Response({
             'success': True,
-            'system_info': system_info
+            **collect_system_status()
         })
     except Exception as e:
         return Response({
@@ -91,47 +46,13 @@ def get_system_status(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_endpoint('running-services')
 def get_running_services(request):
     """Get status of homework scraper services"""
     try:
-        services = [
-            'homework-scraper.service',
-            'homework-scraper-celery.service',
-            'homework-scraper-celery-beat.service',
-        ]
-        
-        service_status = []
-        
-        for service in services:
-            if platform.system() == 'Linux':
-                # Check if service exists and get status
-                status_cmd = f'systemctl is-active {service} 2>/dev/null || echo "not-found"'
-                status_result = run_command(status_cmd)
-                status = status_result['output'].strip()
-                
-                # Get service details if active
-                if status == 'active':
-                    details_cmd = f'systemctl status {service} --no-pager -l | head -20'
-                    details_result = run_command(details_cmd)
-                    details = details_result['output'] if details_result['success'] else ''
-                else:
-                    details = ''
-                
-                service_status.append({
-                    'name': service,
-                    'status': status,
-                    'details': details
-                })
-            else:
-                service_status.append({
-                    'name': service,
-                    'status': 'unavailable',
-                    'details': 'Service monitoring only available on Linux'
-                })
-        
         return Response({
             'success': True,
-            'services': service_status
+            **collect_services()
         })
     except Exception as e:
         return Response({
@@ -142,46 +63,24 @@ def get_running_services(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_endpoint('application-logs')
 def get_application_logs(request):
     """Get application logs"""
     try:
         log_type = request.GET.get('type', 'django')
         lines = int(request.GET.get('lines', 100))
         
-        log_files = {
-            'django': '/var/log/homework-scraper/django.log',
-            'celery': '/var/log/homework-scraper/celery.log',
-            'celery-beat': '/var/log/homework-scraper/celery-beat.log',
-            'nginx': '/var/log/nginx/homework-scraper-access.log',
-            'nginx-error': '/var/log/nginx/homework-scraper-error.log',
-        }
-        
-        log_file = log_files.get(log_type)
-        
-        if not log_file:
+        try:
+            logs = collect_logs(log_type, lines)
+        except ValueError as e:
             return Response({
                 'success': False,
-                'error': f'Invalid log type: {log_type}'
+                'error': str(e)
             }, status=400)
         
-        # Try to read the log file
-        if os.path.exists(log_file):
-            result = run_command(f'tail -n {lines} {log_file}')
-            logs = result['output'] if result['success'] else result['error']
-        else:
-            # Fallback: try to get logs from journalctl
-            if log_type in ['django', 'celery', 'celery-beat']:
-                service_name = f'homework-scraper-{log_type}.service' if log_type != 'django' else 'homework-scraper.service'
-                result = run_command(f'journalctl -u {service_name} -n {lines} --no-pager')
-                logs = result['output'] if result['success'] else f'Log file not found: {log_file}'
-            else:
-                logs = f'Log file not found: {log_file}'
-        
         return Response({
             'success': True,
-            'log_type': log_type,
-            'logs': logs,
-            'lines_requested': lines
+            **logs
         })
     except Exception as e:
         return Response({
@@ -192,23 +91,94 @@ def get_application_logs(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def download_log(request):
+    """
+    Download a whole log file (or a rotated archive) without buffering it
+    
+    GET /api/monitoring/logs/download/?type=django&rotation=0&compress=gzip
+    """
+    log_type = request.GET.get('type', 'django')
+    compress = request.GET.get('compress', '')
+    
+    try:
+        rotation = int(request.GET.get('rotation', 0))
+    except ValueError:
+        rotation = -1
+    
+    if log_type not in LOG_FILES or rotation < 0:
+        return Response({
+            'success': False,
+            'error': f'Invalid log type or rotation: {log_type}'
+        }, status=400)
+    
+    if compress not in ('', 'gzip'):
+        return Response({
+            'success': False,
+            'error': f'Unsupported compression: {compress}'
+        }, status=400)
+    
+    log_path = resolve_log_file(log_type, rotation)
+    if not log_path:
+        return Response({
+            'success': False,
+            'error': f'Log file not found: {log_type} (rotation {rotation})'
+        }, status=404)
+    
+    is_gzipped = log_path.endswith('.gz')
+    filename = os.path.basename(log_path)
+    content_type = 'application/gzip' if is_gzipped else 'text/plain; charset=utf-8'
+    
+    # Compress uncompressed files on the fly (length unknown, so no Range)
+    if compress == 'gzip' and not is_gzipped:
+        response = StreamingHttpResponse(iter_gzip(log_path), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.gz"'
+        return response
+    
+    # Let nginx send the file when it is configured to
+    accel_path = get_accel_redirect(log_path)
+    if accel_path:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_path
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    size = os.path.getsize(log_path)
+    try:
+        byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(log_path, start, end),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse goes through wsgi.file_wrapper, i.e. sendfile()
+        response = FileResponse(open(log_path, 'rb'), content_type=content_type)
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_endpoint('recent-errors')
 def get_recent_errors(request):
     """Get recent errors from logs"""
     try:
         lines = int(request.GET.get('lines', 50))
         
-        # Search for errors in Django logs
-        if platform.system() == 'Linux':
-            error_cmd = f'journalctl -u homework-scraper.service -n {lines * 10} --no-pager | grep -i "error\\|exception\\|critical" | tail -n {lines}'
-            result = run_command(error_cmd)
-            errors = result['output'] if result['success'] else 'No errors found or unable to access logs'
-        else:
-            errors = 'Error monitoring only available on Linux'
-        
         return Response({
             'success': True,
-            'errors': errors,
-            'lines_requested': lines
+            **collect_errors(lines)
         })
     except Exception as e:
         return Response({
@@ -219,20 +189,229 @@ def get_recent_errors(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_endpoint('process-info')
 def get_process_info(request):
     """Get information about running Python processes"""
     try:
-        if platform.system() == 'Linux':
-            # Get Python processes
-            ps_cmd = 'ps aux | grep -E "python|celery|django" | grep -v grep'
-            result = run_command(ps_cmd)
-            processes = result['output'] if result['success'] else 'Unable to get process info'
+        return Response({
+            'success': True,
+            **collect_processes()
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_endpoint('snapshot')
+def get_snapshot(request):
+    """
+    Collect several monitoring sections concurrently in one request
+    
+    GET /api/monitoring/snapshot/?sections=system,services,logs,errors,processes
+    Optional: log_type, lines (logs section), error_lines (errors section)
+    """
+    try:
+        requested = request.GET.get('sections')
+        sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(SECTIONS)
+        
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            return Response({
+                'success': False,
+                'error': f'Unknown sections: {", ".join(unknown)}',
+                'available_sections': list(SECTIONS)
+            }, status=400)
+        
+        results = collect_snapshot(sections, request.GET)
+        
+        return Response({
+            'success': all(r['success'] for r in results.values()),
+            'timestamp': datetime.now().isoformat(),
+            'sections': results
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_endpoint('celery')
+def get_celery_status(request):
+    """Get Celery queue backlog, worker usage and per-task runtime stats"""
+    try:
+        return Response({
+            'success': True,
+            **get_queue_stats(),
+            'workers': get_worker_stats(),
+            'tasks': get_task_stats()
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_endpoint('google-api')
+def get_google_api_stats(request):
+    """Get call counts, errors and latency percentiles per Google API endpoint"""
+    try:
+        return Response({
+            'success': True,
+            'endpoints': get_latency_stats()
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def list_profiles(request):
+    """List stored request profiles, newest first"""
+    try:
+        profiles = profile_store.list()
+        for profile in profiles:
+            profile['top_functions'] = profile['top_functions'][:5]
+        
+        return Response({
+            'success': True,
+            'profiles': profiles
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def download_profile(request, profile_id):
+    """Download a stored profile as pstats data (or ?format=json for the summary)"""
+    summary = profile_store.get(profile_id)
+    
+    if not summary:
+        return Response({
+            'success': False,
+            'error': f'Profile not found: {profile_id}'
+        }, status=404)
+    
+    if request.GET.get('format') == 'json':
+        return Response({
+            'success': True,
+            'profile': summary
+        })
+    
+    stats_path = profile_store.stats_path(profile_id)
+    if not os.path.exists(stats_path):
+        return Response({
+            'success': False,
+            'error': f'Profile data missing: {profile_id}'
+        }, status=404)
+    
+    return FileResponse(
+        open(stats_path, 'rb'),
+        as_attachment=True,
+        filename=f'profile-{profile_id}.prof',
+        content_type='application/octet-stream'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def list_memory_reports(request):
+    """List workers with tracemalloc reports"""
+    try:
+        return Response({
+            'success': True,
+            'enabled': memory.is_enabled(),
+            'current_pid': os.getpid(),
+            'workers': memory.list_reports()
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_memory_report(request, pid):
+    """Get a worker's top allocation sites by growth (?snapshot=1 for a fresh one)"""
+    try:
+        if request.GET.get('snapshot') == '1':
+            report = memory.request_snapshot(pid)
         else:
-            processes = 'Process monitoring only available on Linux'
+            report = memory.read_report(pid)
+        
+        if not report:
+            return Response({
+                'success': False,
+                'error': f'No memory report for worker {pid}'
+            }, status=404)
+        
+        return Response({
+            'success': True,
+            'report': report
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_query_stats(request):
+    """Rank views by database cost, slow queries and likely N+1 patterns"""
+    try:
+        order_by = request.GET.get('order', 'db_time')
+        limit = int(request.GET.get('limit', 20))
+        
+        return Response({
+            'success': True,
+            'order': order_by,
+            'views': query_stats.report(order_by=order_by, limit=limit)
+        })
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_route_latency(request):
+    """Per-route request count, error rate and latency percentiles from access logs"""
+    try:
+        source = request.GET.get('source', 'gunicorn')
+        window = int(request.GET.get('window', 3600))
+        order_by = request.GET.get('order', 'count')
+        
+        # New log lines are read off the request thread; this answers from
+        # the saved state
+        access_log_analyzer.refresh_in_background()
         
         return Response({
             'success': True,
-            'processes': processes
+            'source': source,
+            'window_seconds': window,
+            'routes': access_log_analyzer.route_table(source, window_seconds=window, order_by=order_by)
         })
     except Exception as e:
         return Response({
@@ -253,9 +432,17 @@ def monitoring_info(request):
             'system_status': f'{base_url}system-status/',
             'running_services': f'{base_url}services/',
             'application_logs': f'{base_url}logs/?type=django&lines=100',
+            'log_download': f'{base_url}logs/download/?type=django',
             'recent_errors': f'{base_url}errors/',
             'process_info': f'{base_url}processes/',
+            'celery': f'{base_url}celery/',
+            'google_api': f'{base_url}google-api/',
+            'snapshot': f'{base_url}snapshot/?sections=system,services,logs,errors,processes',
+            'profiles': f'{base_url}profiles/',
+            'query_stats': f'{base_url}queries/?order=db_time',
+            'memory_reports': f'{base_url}memory/',
+            'route_latency': f'{base_url}latency/?source=gunicorn&window=3600',
         },
-        'log_types': ['django', 'celery', 'celery-beat', 'nginx', 'nginx-error'],
+        'log_types': list(LOG_FILES),
         'note': 'All endpoints require authentication'
     })
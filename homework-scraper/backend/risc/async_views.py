@@ -0,0 +1,31 @@
+"""
+Async version of the RISC receiver, routed under ASGI
+
+Google's key set is fetched on the event loop's async session (the slow
+part on a cold worker); validation and event handling are database work
+and run in a thread like any sync view.
+"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+import logging
+from .services import RISCTokenValidator
+from .views import receive_event
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def risc_receiver(request):
+    """
+    RISC Security Event Token receiver endpoint
+    Receives JWT tokens from Google's RISC service
+    """
+    validator = RISCTokenValidator()
+    try:
+        jwks = await validator.aget_jwks()
+    except Exception:
+        # receive_event() retries the fetch and answers with the error
+        jwks = None
+    return await sync_to_async(receive_event)(request, validator, jwks)
@@ -1,10 +1,8 @@
 import json
 import time
-import requests
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from homework_scraper.google_api import get_session
 from risc.models import RISCConfiguration
 import logging
 
@@ -40,6 +38,10 @@ class Command(BaseCommand):
 
     def get_access_token(self, service_account_file):
         """Generate access token from service account"""
+        # google-auth is only needed here, not for --help or model checks
+        from google.auth.transport.requests import Request
+        from google.oauth2 import service_account
+
         try:
             # Try with cloud-platform scope which has broader access
             credentials = service_account.Credentials.from_service_account_file(
@@ -48,7 +50,7 @@ class Command(BaseCommand):
             )
             
             # Refresh to get access token
-            credentials.refresh(Request())
+            credentials.refresh(Request(session=get_session()))
             
             if not credentials.token:
                 self.stdout.write(self.style.ERROR("No access token received"))
@@ -59,7 +61,7 @@ class Command(BaseCommand):
                     service_account_file,
                     scopes=['https://www.googleapis.com/auth/risc']
                 )
-                credentials.refresh(Request())
+                credentials.refresh(Request(session=get_session()))
             
             return credentials.token
             
@@ -112,7 +114,7 @@ class Command(BaseCommand):
         self.stdout.write(f"Subscribed events: {len(config.get_subscribed_events())}")
         
         try:
-            response = requests.post(url, headers=headers, json=stream_config)
+            response = get_session().post(url, headers=headers, json=stream_config)
             
             if response.status_code == 200:
                 self.stdout.write(self.style.SUCCESS("Stream configured successfully!"))
@@ -163,7 +165,7 @@ class Command(BaseCommand):
         self.stdout.write(f"Verification state: {state}")
         
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = get_session().post(url, headers=headers, json=data)
             
             if response.status_code == 200:
                 self.stdout.write(self.style.SUCCESS("Verification event sent!"))
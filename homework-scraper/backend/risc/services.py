@@ -1,69 +1,115 @@
 import json
-import jwt
-import requests
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.sessions.models import Session
 from django.utils import timezone
+from homework_scraper.google_api import get_async_session, get_session, token_cache
 from .models import SecurityEvent, RISCConfiguration, UserSecurityAction
 import logging
 
 logger = logging.getLogger(__name__)
 
+RISC_CONFIGURATION_URL = 'https://accounts.google.com/.well-known/risc-configuration'
+
+# Used when the configuration can't be fetched
+DEFAULT_RISC_CONFIGURATION = {
+    'issuer': 'https://accounts.google.com/',
+    'jwks_uri': 'https://www.googleapis.com/oauth2/v3/certs'
+}
+
 
 class RISCTokenValidator:
     """Validates JWT tokens from Google's RISC service"""
     
-    def __init__(self):
-        self.jwks_cache = None
-        self.jwks_cache_time = None
-        self.cache_duration = timedelta(hours=24)
+    # The receiver builds a validator per request, so the key set is cached
+    # for the whole process: (keys, fetched at). A token signed with a key
+    # not in it (Google rotated its keys) refetches it, at most once per
+    # refresh_interval.
+    _jwks = None
+    cache_duration = timedelta(hours=24)
+    refresh_interval = timedelta(minutes=1)
     
     def get_risc_configuration(self):
         """Fetch RISC configuration from Google"""
         try:
-            response = requests.get('https://accounts.google.com/.well-known/risc-configuration')
+            response = get_session().get(RISC_CONFIGURATION_URL)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"Failed to fetch RISC configuration: {e}")
-            # Return defaults
-            return {
-                'issuer': 'https://accounts.google.com/',
-                'jwks_uri': 'https://www.googleapis.com/oauth2/v3/certs'
-            }
+            return DEFAULT_RISC_CONFIGURATION
+
+    async def aget_risc_configuration(self):
+        try:
+            response = await get_async_session().get(RISC_CONFIGURATION_URL)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch RISC configuration: {e}")
+            return DEFAULT_RISC_CONFIGURATION
     
-    def get_jwks(self):
-        """Get JSON Web Key Set from Google"""
+    def _cached_jwks(self, refresh=False):
+        cached = RISCTokenValidator._jwks
+        max_age = self.refresh_interval if refresh else self.cache_duration
+        if cached and timezone.now() - cached[1] < max_age:
+            return cached[0]
+        return None
+    
+    def _store_jwks(self, jwks):
+        RISCTokenValidator._jwks = (jwks, timezone.now())
+        return jwks
+    
+    def get_jwks(self, refresh=False):
+        """Get JSON Web Key Set from Google; refresh skips the cache unless just fetched"""
         # Check cache
-        if (self.jwks_cache and self.jwks_cache_time and 
-            timezone.now() - self.jwks_cache_time < self.cache_duration):
-            return self.jwks_cache
+        jwks = self._cached_jwks(refresh)
+        if jwks:
+            return jwks
         
         try:
             config = self.get_risc_configuration()
-            jwks_uri = config.get('jwks_uri', 'https://www.googleapis.com/oauth2/v3/certs')
+            jwks_uri = config.get('jwks_uri', DEFAULT_RISC_CONFIGURATION['jwks_uri'])
             
-            response = requests.get(jwks_uri)
+            response = get_session().get(jwks_uri)
             response.raise_for_status()
             
-            self.jwks_cache = response.json()
-            self.jwks_cache_time = timezone.now()
+            return self._store_jwks(response.json())
+        except Exception as e:
+            logger.error(f"Failed to fetch JWKS: {e}")
+            raise
+    
+    async def aget_jwks(self, refresh=False):
+        jwks = self._cached_jwks(refresh)
+        if jwks:
+            return jwks
+        
+        try:
+            config = await self.aget_risc_configuration()
+            jwks_uri = config.get('jwks_uri', DEFAULT_RISC_CONFIGURATION['jwks_uri'])
+            
+            response = await get_async_session().get(jwks_uri)
+            response.raise_for_status()
             
-            return self.jwks_cache
+            return self._store_jwks(response.json())
         except Exception as e:
             logger.error(f"Failed to fetch JWKS: {e}")
             raise
     
-    def validate_token(self, token_string):
+    def validate_token(self, token_string, jwks=None):
         """
         Validate JWT token from RISC event
         Returns decoded token if valid, raises exception if invalid
+        
+        jwks, if given, is the key set to check against (async callers
+        fetch it with aget_jwks() first)
         """
+        # PyJWT (and cryptography behind it) only when an event arrives
+        import jwt
+
         try:
             # Get signing keys
-            jwks = self.get_jwks()
+            jwks = jwks or self.get_jwks()
             
             # Decode header to get key ID
             unverified_header = jwt.get_unverified_header(token_string)
@@ -73,11 +119,10 @@ class RISCTokenValidator:
                 raise ValueError("Token header missing 'kid' field")
             
             # Find the correct key
-            signing_key = None
-            for key in jwks.get('keys', []):
-                if key.get('kid') == kid:
-                    signing_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
-                    break
+            signing_key = self._find_signing_key(jwks, kid)
+            if not signing_key:
+                # Google may have rotated its keys since they were cached
+                signing_key = self._find_signing_key(self.get_jwks(refresh=True), kid)
             
             if not signing_key:
                 raise ValueError(f"No signing key found for kid: {kid}")
@@ -125,6 +170,15 @@ class RISCTokenValidator:
             raise
 
 
+    def _find_signing_key(self, jwks, kid):
+        import jwt
+
+        for key in jwks.get('keys', []):
+            if key.get('kid') == kid:
+                return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+        return None
+
+
 class RISCEventHandler:
     """Handles different types of RISC security events"""
     
@@ -197,6 +251,7 @@ class RISCEventHandler:
             tokens = SocialToken.objects.filter(account__user=user, account__provider='google')
             token_count = tokens.count()
             tokens.delete()
+            token_cache.invalidate(user.pk)
             
             # Create security action record
             UserSecurityAction.objects.create(
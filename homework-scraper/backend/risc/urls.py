@@ -1,7 +1,8 @@
 from django.urls import path
-from . import views
+from homework_scraper.async_views import sync_or_async
+from . import async_views, views
 
 urlpatterns = [
-    path('receiver/', views.risc_receiver, name='risc-receiver'),
+    path('receiver/', sync_or_async(views.risc_receiver, async_views.risc_receiver), name='risc-receiver'),
     path('status/', views.risc_status, name='risc-status'),
 ]
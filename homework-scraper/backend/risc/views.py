@@ -1,8 +1,9 @@
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
 import logging
+from homework_scraper.fastjson import JsonResponse
 from .services import RISCTokenValidator, RISCEventHandler
 from .models import SecurityEvent
 
@@ -16,6 +17,11 @@ def risc_receiver(request):
     RISC Security Event Token receiver endpoint
     Receives JWT tokens from Google's RISC service
     """
+    return receive_event(request, RISCTokenValidator())
+
+
+def receive_event(request, validator, jwks=None):
+    """Validate and process one security event token; jwks as for validate_token()"""
     try:
         # Get JWT from request body
         content_type = request.headers.get('Content-Type', '')
@@ -41,9 +47,8 @@ def risc_receiver(request):
             }, status=400)
         
         # Validate token
-        validator = RISCTokenValidator()
         try:
-            decoded_token = validator.validate_token(token_string)
+            decoded_token = validator.validate_token(token_string, jwks=jwks)
         except ValueError as e:
             error_msg = str(e)
             if 'already processed' in error_msg:
@@ -0,0 +1,18 @@
+"""RISC warm-up steps (see homework_scraper/warmup.py)"""
+from django.conf import settings
+
+from homework_scraper.warmup import register
+
+from .models import RISCConfiguration
+from .services import RISCTokenValidator
+
+
+@register('risc-jwks')
+def prime_jwks():
+    """Fetch Google's signing keys so the first security event isn't held up by it"""
+    # Same check as validate_token: without a receiver no event can arrive
+    if not (RISCConfiguration.objects.filter(is_active=True).exists()
+            or getattr(settings, 'RISC_RECEIVER_URL', None)):
+        return
+    # Fills the process-wide cache; the keys are re-fetched after a day
+    RISCTokenValidator().get_jwks()
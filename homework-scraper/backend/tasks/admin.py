@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import CalendarEventRecord, TaskListCheckpoint, TaskSyncRecord
+
+
+@admin.register(TaskSyncRecord)
+class TaskSyncRecordAdmin(admin.ModelAdmin):
+    list_display = ['user', 'homework_id', 'tasklist_id', 'task_id', 'synced_at']
+    list_filter = ['tasklist_id', 'synced_at']
+    search_fields = ['user__email', 'task_id']
+    readonly_fields = ['etag', 'content_hash', 'synced_at']
+
+
+@admin.register(TaskListCheckpoint)
+class TaskListCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['user', 'tasklist_id', 'updated_min', 'pulled_at']
+    search_fields = ['user__email', 'tasklist_id']
+
+
+@admin.register(CalendarEventRecord)
+class CalendarEventRecordAdmin(admin.ModelAdmin):
+    list_display = ['user', 'exam_id', 'calendar_id', 'event_id', 'synced_at']
+    list_filter = ['calendar_id', 'synced_at']
+    search_fields = ['user__email', 'event_id']
+    readonly_fields = ['etag', 'content_hash', 'synced_at']
@@ -0,0 +1,39 @@
+from django.apps import AppConfig, apps
+from django.conf import settings
+from django.db.models.signals import post_migrate
+
+PULL_TASK_NAME = 'Pull Google Tasks completions'
+
+
+def register_periodic_tasks(sender, **kwargs):
+    """
+    Schedule the completion pull with django-celery-beat's database scheduler
+
+    Runs after migrate, so TASKS_PULL_INTERVAL changes take effect on deploy;
+    an interval of 0 disables the entry.
+    """
+    if not apps.is_installed('django_celery_beat'):
+        return
+    from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+    interval = getattr(settings, 'TASKS_PULL_INTERVAL', 300)
+    if not interval:
+        PeriodicTask.objects.filter(name=PULL_TASK_NAME).update(enabled=False)
+        return
+
+    schedule, _ = IntervalSchedule.objects.get_or_create(every=interval, period=IntervalSchedule.SECONDS)
+    PeriodicTask.objects.update_or_create(
+        name=PULL_TASK_NAME,
+        defaults={
+            'task': 'tasks.tasks.pull_all_task_completions',
+            'interval': schedule,
+            'enabled': True,
+        }
+    )
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+
+    def ready(self):
+        post_migrate.connect(register_periodic_tasks, sender=self)
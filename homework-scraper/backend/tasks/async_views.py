@@ -0,0 +1,133 @@
+"""
+Async versions of the Google Tasks read views
+
+Served instead of the views in tasks/views.py when the app runs under ASGI
+(homework_scraper/async_views.py). Same URLs, parameters and responses, but
+a request waiting on Google holds no thread: calls go through the event
+loop's async session, and only the cache, token and quota lookups run in
+threads.
+"""
+import logging
+
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from homework_scraper.fastjson import JsonResponse
+from homework_scraper.google_api import GoogleAPIError
+
+from .cache import task_cache
+from .google_tasks import GoogleTasksClient
+from .streaming import NDJSON_CONTENT_TYPE, TaskQuery, astream_ndjson, wants_ndjson
+from .views import _conditional_response, _google_error_response
+
+logger = logging.getLogger(__name__)
+
+
+@require_http_methods(["GET"])
+async def get_task_lists(request):
+    """
+    Get all Google Task lists for the authenticated user
+
+    GET /api/tasks/lists (see tasks.views.get_task_lists)
+    """
+    try:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+
+        task_lists = [
+            {
+                'id': tasklist['id'],
+                'title': tasklist.get('title', ''),
+                'updated': tasklist.get('updated')
+            }
+            for tasklist in await task_cache.aget_tasklists(user)
+        ]
+
+        return _conditional_response(request, {
+            'success': True,
+            'task_lists': task_lists
+        })
+
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while fetching task lists: {str(e)}")
+        return _google_error_response(e)
+
+    except Exception as e:
+        logger.error(f"Error fetching task lists: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+async def get_tasks(request, list_id):
+    """
+    Get all tasks from a specific Google Task list
+
+    GET /api/tasks/lists/<list_id>/tasks (see tasks.views.get_tasks)
+    """
+    try:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+
+        try:
+            query = TaskQuery(request.GET)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+
+        if wants_ndjson(request):
+            return await _stream_tasks(user, list_id, query)
+
+        tasks = query.apply(await task_cache.aget_tasks(user, list_id))
+        tasks.sort(key=lambda task: (not task.get('due'), task.get('due') or '', task.get('title') or ''))
+
+        return _conditional_response(request, {
+            'success': True,
+            'tasks': tasks
+        })
+
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while fetching tasks: {str(e)}")
+        return _google_error_response(e)
+
+    except Exception as e:
+        logger.error(f"Error fetching tasks: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+async def _single_page(page):
+    yield page
+
+
+async def _stream_tasks(user, list_id, query):
+    """NDJSON response from a fresh cache entry, or page by page from Google"""
+    cached = await task_cache.apeek_tasks(user, list_id)
+    if cached is not None:
+        content = astream_ndjson(_single_page(cached), query)
+    else:
+        client = await GoogleTasksClient.afor_user(user)
+        pages = client.aiter_task_pages(list_id, prefetch=True, **query.upstream_params())
+        # Fetch the first page before answering, so auth and missing-list
+        # errors still get a proper status code
+        first_page = await anext(pages, [])
+        content = astream_ndjson(pages, query, first_page=first_page)
+
+    response = StreamingHttpResponse(content, content_type=NDJSON_CONTENT_TYPE)
+    response['Cache-Control'] = 'private, no-store'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,196 @@
+"""
+Google API batch requests (multipart/mixed)
+
+Google's batch endpoints accept many API calls in one HTTP request, each
+wrapped as an `application/http` part. Each part is answered with its own
+status and body, so a single failing item doesn't fail the batch.
+
+    results = execute_batch(session, batch_url, token, [
+        BatchOperation('hw-1', 'POST', '/tasks/v1/lists/@default/tasks', {...}),
+        BatchOperation('hw-2', 'DELETE', '/tasks/v1/lists/@default/tasks/abc'),
+    ])
+    results['hw-1'].status, results['hw-1'].data
+
+Used for both Google Tasks and Google Calendar.
+"""
+import json
+import re
+import uuid
+
+
+class BatchOperation:
+    """One API call inside a batch request"""
+
+    def __init__(self, id, method, path, body=None, headers=None):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers or {}
+
+
+class BatchResult:
+    """Response to one operation of a batch"""
+
+    def __init__(self, id, status, headers, data):
+        self.id = id
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    @property
+    def error(self):
+        if self.ok:
+            return None
+        if isinstance(self.data, dict):
+            error = self.data.get('error')
+            if isinstance(error, dict):
+                return error.get('message') or f'HTTP {self.status}'
+        return f'HTTP {self.status}'
+
+
+class BatchError(Exception):
+    """The batch request as a whole failed"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+_boundary_re = re.compile(r'boundary="?([^";]+)"?')
+_content_id_re = re.compile(r'^content-id:\s*<?(?:response-)?([^>\r\n]*)>?', re.IGNORECASE | re.MULTILINE)
+
+
+def build_batch_body(operations, boundary):
+    """Encode operations as a multipart/mixed batch body"""
+    lines = []
+    for op in operations:
+        lines.append(f'--{boundary}')
+        lines.append('Content-Type: application/http')
+        lines.append('Content-Transfer-Encoding: binary')
+        lines.append(f'Content-ID: <{op.id}>')
+        lines.append('')
+        lines.append(f'{op.method} {op.path} HTTP/1.1')
+        for name, value in op.headers.items():
+            lines.append(f'{name}: {value}')
+        if op.body is not None:
+            payload = json.dumps(op.body, separators=(',', ':'))
+            lines.append('Content-Type: application/json; charset=UTF-8')
+            lines.append('')
+            lines.append(payload)
+        else:
+            lines.append('')
+        lines.append('')
+    lines.append(f'--{boundary}--')
+    lines.append('')
+    return '\r\n'.join(lines).encode('utf-8')
+
+
+def _split_head(text):
+    """Split an HTTP-style message into header block and body"""
+    for separator in ('\r\n\r\n', '\n\n'):
+        if separator in text:
+            return text.split(separator, 1)
+    return text, ''
+
+
+def _iter_parts(content_type, content):
+    """Yield (content id, first line, headers, body) for each embedded HTTP message"""
+    match = _boundary_re.search(content_type or '')
+    if not match:
+        raise BatchError(f'Batch body has no boundary: {content_type}')
+    boundary = match.group(1)
+
+    text = content.decode('utf-8') if isinstance(content, bytes) else content
+
+    for part in text.split(f'--{boundary}'):
+        part = part.strip('\r\n')
+        if not part or part == '--':
+            continue
+
+        part_headers, http_message = _split_head(part)
+        id_match = _content_id_re.search(part_headers)
+        if not id_match:
+            continue
+
+        head, body = _split_head(http_message.lstrip('\r\n'))
+        head_lines = head.splitlines()
+        if not head_lines:
+            continue
+
+        headers = {}
+        for line in head_lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        yield id_match.group(1).strip(), head_lines[0], headers, body.strip()
+
+
+def _decode_json(body):
+    try:
+        return json.loads(body) if body else {}
+    except ValueError:
+        return {'raw': body}
+
+
+def parse_batch_response(content_type, content):
+    """Decode a multipart/mixed batch response into {operation id: BatchResult}"""
+    results = {}
+    for op_id, status_line, headers, body in _iter_parts(content_type, content):
+        status_parts = status_line.split(' ', 2)
+        status = int(status_parts[1]) if len(status_parts) > 1 else 0
+        results[op_id] = BatchResult(id=op_id, status=status, headers=headers, data=_decode_json(body))
+    return results
+
+
+def parse_batch_request(content_type, content):
+    """Decode a multipart/mixed batch request into a list of BatchOperation"""
+    operations = []
+    for op_id, request_line, headers, body in _iter_parts(content_type, content):
+        method, path = request_line.split(' ')[:2]
+        operations.append(BatchOperation(op_id, method, path, _decode_json(body) if body else None, headers))
+    return operations
+
+
+def execute_batch(session, batch_url, access_token, operations, timeout=60):
+    """
+    Send operations as one batch request and return their results by id
+
+    Operations missing from the response are reported with status 0 so
+    callers always get one result per operation.
+    """
+    if not operations:
+        return {}
+
+    boundary = f'batch_{uuid.uuid4().hex}'
+    response = session.post(
+        batch_url,
+        data=build_batch_body(operations, boundary),
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': f'multipart/mixed; boundary={boundary}',
+        },
+        timeout=timeout
+    )
+
+    if response.status_code != 200:
+        retry_after = response.headers.get('Retry-After')
+        raise BatchError(
+            f'Batch request failed: HTTP {response.status_code} {response.text[:200]}',
+            status=response.status_code,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+        )
+
+    results = parse_batch_response(response.headers.get('Content-Type'), response.content)
+    for op in operations:
+        if op.id not in results:
+            results[op.id] = BatchResult(
+                id=op.id, status=0, headers={}, data={'error': {'message': 'Missing from batch response'}}
+            )
+    return results
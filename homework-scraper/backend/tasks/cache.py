@@ -0,0 +1,235 @@
+"""
+Per-user cache of Google task lists and tasks
+
+Entries live in the Django cache (TASKS_CACHE_ALIAS, default 'default'):
+
+    tasks:lists:<user id>           the user's task lists and Google's etag
+    tasks:tasks:<user id>:<list>    every task of a list, keyed by task id
+
+Within TASKS_CACHE_TTL seconds (default 60) of the last check an entry is
+served without contacting Google. After that it is revalidated:
+
+- task lists with If-None-Match and the stored etag (304 = unchanged)
+- tasks with updatedMin set to the newest `updated` seen, which returns
+  only tasks changed since (deleted ones included), merged into the entry
+
+Entries are refetched in full after TASKS_CACHE_MAX_AGE seconds (default
+one hour). Syncs that write to a list call invalidate_list(), which marks
+that list's tasks and the user's task lists for revalidation on the next
+read instead of dropping them.
+
+Tasks are cached with completed and hidden ones included; views filter
+them locally. Streamed (NDJSON) reads use a fresh entry if there is one but
+never fill the cache, as that would mean holding the whole list.
+
+The `a`-prefixed methods are the same reads for async views.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .google_tasks import GoogleTasksClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIST_ALIAS = '@default'
+
+# Seconds our clock may be ahead of Google's
+CLOCK_SKEW = 300
+
+
+def get_fresh_ttl():
+    return getattr(settings, 'TASKS_CACHE_TTL', 60)
+
+
+def get_max_age():
+    return getattr(settings, 'TASKS_CACHE_MAX_AGE', 60 * 60)
+
+
+def _cache():
+    return caches[getattr(settings, 'TASKS_CACHE_ALIAS', 'default')]
+
+
+def _lists_key(user_id):
+    return f'tasks:lists:{user_id}'
+
+
+def _tasks_key(user_id, tasklist_id):
+    return f'tasks:tasks:{user_id}:{tasklist_id}'
+
+
+def rfc3339(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class TaskCache:
+    """Read-through cache in front of GoogleTasksClient for one process"""
+
+    def __init__(self, client_factory=GoogleTasksClient.for_user):
+        self.client_factory = client_factory
+
+    def get_tasklists(self, user, client=None):
+        """The user's task lists, from cache when fresh"""
+        key = _lists_key(user.pk)
+        entry = _cache().get(key)
+        now = time.time()
+
+        if self._is_fresh(entry, now):
+            return entry['items']
+
+        client = client or self.client_factory(user)
+        if self._can_revalidate(entry, now):
+            items, etag = client.list_tasklists_if_changed(entry['etag'])
+        else:
+            items, etag = client.list_tasklists_if_changed()
+
+        entry = self._tasklists_entry(entry, items, etag, now)
+        _cache().set(key, entry, get_max_age())
+        return entry['items']
+
+    async def aget_tasklists(self, user, client=None):
+        key = _lists_key(user.pk)
+        entry = await _cache().aget(key)
+        now = time.time()
+
+        if self._is_fresh(entry, now):
+            return entry['items']
+
+        client = client or await GoogleTasksClient.afor_user(user)
+        if self._can_revalidate(entry, now):
+            items, etag = await client.alist_tasklists_if_changed(entry['etag'])
+        else:
+            items, etag = await client.alist_tasklists_if_changed()
+
+        entry = self._tasklists_entry(entry, items, etag, now)
+        await _cache().aset(key, entry, get_max_age())
+        return entry['items']
+
+    def peek_tasks(self, user, tasklist_id):
+        """A list's tasks if the cached entry is fresh, else None; never calls Google"""
+        entry = _cache().get(_tasks_key(user.pk, tasklist_id))
+        if self._is_fresh(entry, time.time()):
+            return list(entry['tasks'].values())
+        return None
+
+    async def apeek_tasks(self, user, tasklist_id):
+        entry = await _cache().aget(_tasks_key(user.pk, tasklist_id))
+        if self._is_fresh(entry, time.time()):
+            return list(entry['tasks'].values())
+        return None
+
+    def get_tasks(self, user, tasklist_id, client=None):
+        """Every non-deleted task of a list (completed and hidden included)"""
+        key = _tasks_key(user.pk, tasklist_id)
+        entry = _cache().get(key)
+        now = time.time()
+
+        if self._is_fresh(entry, now):
+            return list(entry['tasks'].values())
+
+        client = client or self.client_factory(user)
+        delta = self._can_revalidate(entry, now)
+        changed = client.list_tasks(tasklist_id, **self._list_params(entry if delta else None))
+
+        entry = self._tasks_entry(entry, changed, now, delta)
+        _cache().set(key, entry, get_max_age())
+        return list(entry['tasks'].values())
+
+    async def aget_tasks(self, user, tasklist_id, client=None):
+        key = _tasks_key(user.pk, tasklist_id)
+        entry = await _cache().aget(key)
+        now = time.time()
+
+        if self._is_fresh(entry, now):
+            return list(entry['tasks'].values())
+
+        client = client or await GoogleTasksClient.afor_user(user)
+        delta = self._can_revalidate(entry, now)
+        changed = await client.alist_tasks(tasklist_id, **self._list_params(entry if delta else None))
+
+        entry = self._tasks_entry(entry, changed, now, delta)
+        await _cache().aset(key, entry, get_max_age())
+        return list(entry['tasks'].values())
+
+    def _is_fresh(self, entry, now):
+        return bool(entry) and not entry['stale'] and now - entry['checked_at'] < get_fresh_ttl()
+
+    def _can_revalidate(self, entry, now):
+        """Whether an entry may be updated in place rather than refetched in full"""
+        return bool(entry) and now - entry['fetched_at'] < get_max_age()
+
+    def _tasklists_entry(self, entry, items, etag, now):
+        if items is None:
+            # 304: the cached lists are still current
+            return dict(entry, checked_at=now, stale=False)
+        return {'items': items, 'etag': etag, 'fetched_at': now, 'checked_at': now, 'stale': False}
+
+    def _list_params(self, entry):
+        """Parameters for a full fetch, or a delta fetch since entry"""
+        if entry is None:
+            return {'showCompleted': 'true', 'showHidden': 'true'}
+        return {
+            'updatedMin': entry['updated_min'],
+            'showCompleted': 'true',
+            'showHidden': 'true',
+            'showDeleted': 'true',
+        }
+
+    def _tasks_entry(self, entry, changed, now, delta):
+        """Cache entry after a full fetch, or with a delta merged into entry"""
+        if delta:
+            tasks = entry['tasks']
+            for task in changed:
+                if task.get('deleted'):
+                    tasks.pop(task['id'], None)
+                else:
+                    tasks[task['id']] = task
+            fetched_at = entry['fetched_at']
+        else:
+            tasks = {task['id']: task for task in changed}
+            fetched_at = now
+
+        return {
+            'tasks': tasks,
+            'updated_min': self._updated_min(changed, entry, now),
+            'fetched_at': fetched_at,
+            'checked_at': now,
+            'stale': False,
+        }
+
+    def _updated_min(self, changed, entry, now):
+        """Lower bound for the next delta fetch"""
+        newest = max((task['updated'] for task in changed if task.get('updated')), default=None)
+        if entry and entry.get('updated_min'):
+            newest = max(newest or '', entry['updated_min'])
+        # Without any task to go by, allow for clock skew between us and Google
+        return newest or rfc3339(now - CLOCK_SKEW)
+
+    def invalidate_list(self, user_id, tasklist_id):
+        """Mark a list written by us (and the user's task lists) for revalidation"""
+        cache = _cache()
+        tasklist_ids = {tasklist_id}
+
+        lists_entry = cache.get(_lists_key(user_id))
+        if lists_entry:
+            # '@default' is Google's alias for the user's first list
+            if tasklist_id == DEFAULT_LIST_ALIAS and lists_entry['items']:
+                tasklist_ids.add(lists_entry['items'][0]['id'])
+            elif lists_entry['items'] and lists_entry['items'][0]['id'] == tasklist_id:
+                tasklist_ids.add(DEFAULT_LIST_ALIAS)
+            self._mark_stale(_lists_key(user_id), lists_entry)
+
+        for list_id in tasklist_ids:
+            key = _tasks_key(user_id, list_id)
+            self._mark_stale(key, cache.get(key))
+
+    def _mark_stale(self, key, entry):
+        if entry and not entry['stale']:
+            entry['stale'] = True
+            _cache().set(key, entry, get_max_age())
+
+
+task_cache = TaskCache()
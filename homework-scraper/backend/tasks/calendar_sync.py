@@ -0,0 +1,297 @@
+"""
+Exam -> Google Calendar sync engine
+
+Works like the homework sync (tasks/sync.py): every event created for an
+exam is tracked by a CalendarEventRecord holding a sha256 of the event body
+last sent, so unchanged exams cost no API call, and all writes go through
+the Calendar batch endpoint.
+
+Event ids are chosen by us: base32hex of a sha1 of the user and exam id.
+Inserting the same exam twice therefore hits the same event; Google answers
+409 and the event is patched instead. The same goes for an event the user
+deleted, which Google keeps as cancelled under its id; the patch restores
+it. A sync is one batch request per GOOGLE_TASKS_BATCH_SIZE (default 50)
+changed exams, plus a second round only for such conflicts.
+
+Settings:
+
+    TASKS_EXAM_MODEL              'app_label.Model', default 'scraper.ScrapedExam'
+    GOOGLE_CALENDAR_ID            target calendar, default 'primary'
+    GOOGLE_CALENDAR_EXAM_MINUTES  length of timed exam events, default 90
+"""
+import base64
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .google_calendar import GoogleCalendarClient
+from .google_tasks import GoogleTasksError
+from .models import CalendarEventRecord
+from .quota import INTERACTIVE
+from .sync import GONE_STATUSES, SyncResult, content_hash, run_batch
+
+logger = logging.getLogger(__name__)
+
+RECORD_UPDATE_FIELDS = ['calendar_id', 'event_id', 'etag', 'content_hash', 'synced_at']
+
+
+def get_exam_model():
+    """The scraper's exam model (TASKS_EXAM_MODEL, 'app_label.Model')"""
+    return apps.get_model(getattr(settings, 'TASKS_EXAM_MODEL', 'scraper.ScrapedExam'))
+
+
+def get_default_calendar_id():
+    return getattr(settings, 'GOOGLE_CALENDAR_ID', 'primary')
+
+
+def event_id_for(user_id, key):
+    """Stable Calendar event id (base32hex, as Google requires) for an exam"""
+    digest = hashlib.sha1(f'homework-scraper:exam:{user_id}:{key}'.encode('utf-8')).digest()
+    return base64.b32hexencode(digest).decode('ascii').lower().rstrip('=')
+
+
+def event_times(value):
+    """(start, end) of an exam: all-day for dates and midnight, timed otherwise"""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        if value.time() != datetime.min.time():
+            end = value + timedelta(minutes=getattr(settings, 'GOOGLE_CALENDAR_EXAM_MINUTES', 90))
+            time_zone = settings.TIME_ZONE
+            return (
+                {'dateTime': value.replace(tzinfo=None).isoformat(), 'timeZone': time_zone},
+                {'dateTime': end.replace(tzinfo=None).isoformat(), 'timeZone': time_zone},
+            )
+        value = value.date()
+    if isinstance(value, date):
+        return {'date': value.isoformat()}, {'date': (value + timedelta(days=1)).isoformat()}
+    raise ValueError(f'Unsupported exam date: {value!r}')
+
+
+def build_event_body(title, when, description='', subject='', source_id=None):
+    """Google Calendar representation of an exam"""
+    start, end = event_times(when)
+    body = {
+        'summary': (f'{subject}: {title}' if subject else title)[:1024],
+        'description': description[:8192],
+        'start': start,
+        'end': end,
+        'status': 'confirmed',
+    }
+    if source_id is not None:
+        body['extendedProperties'] = {'private': {'homeworkScraperExamId': str(source_id)}}
+    return body
+
+
+def build_exam_event_body(exam):
+    description = []
+    if getattr(exam, 'url', ''):
+        description.append(exam.url)
+    if getattr(exam, 'site', ''):
+        description.append(f'Source: {exam.site}')
+    return build_event_body(
+        exam.exam_name,
+        exam.exam_date,
+        description='\n\n'.join(description),
+        subject=getattr(exam, 'subject', ''),
+        source_id=exam.id
+    )
+
+
+def upsert_event(client, calendar_id, event_id, body):
+    """Insert an event under a stable id, patching it if Google already has that id"""
+    try:
+        return client._request('POST', client.event_path(calendar_id), json=dict(body, id=event_id))
+    except GoogleTasksError as e:
+        if e.status != 409:
+            raise
+    return client._request('PATCH', client.event_path(calendar_id, event_id), json=body)
+
+
+class ExamSyncResult(SyncResult):
+    """Per-exam outcome of a calendar sync"""
+
+    id_key = 'exam_id'
+    remote_id_key = 'event_id'
+
+
+def sync_exams(user, exam_ids=None, calendar_id=None, client=None, priority=INTERACTIVE):
+    """
+    Sync a user's exams to Google Calendar
+
+    With exam_ids, syncs those exams (deleting the events of ids that no
+    longer exist), and nothing for an empty list; with None, syncs all of
+    them and deletes events whose exam was removed. Whatever was applied is
+    saved before an error is raised.
+    """
+    result = ExamSyncResult()
+    if exam_ids is not None and not exam_ids:
+        return result
+
+    Exam = get_exam_model()
+    calendar_id = calendar_id or get_default_calendar_id()
+
+    queryset = Exam.objects.filter(user=user)
+    record_queryset = CalendarEventRecord.objects.filter(user=user)
+    if exam_ids is not None:
+        queryset = queryset.filter(id__in=exam_ids)
+        record_queryset = record_queryset.filter(exam_id__in=exam_ids)
+    exams = list(queryset)
+    records = {record.exam_id: record for record in record_queryset}
+
+    # op id -> (exam, body, hash, (action, calendar id, event id, body sent));
+    # exam, body and hash are None for deletes
+    operations = {}
+    for exam in exams:
+        try:
+            body = build_exam_event_body(exam)
+        except ValueError as e:
+            result.add(exam.id, 'skipped', False, error=str(e))
+            continue
+        body_hash = content_hash(body)
+        record = records.get(exam.id)
+
+        if record and record.calendar_id == calendar_id:
+            if record.content_hash == body_hash:
+                result.add(exam.id, 'unchanged', True, record.event_id)
+            else:
+                operations[f'patch-{exam.id}'] = (
+                    exam, body, body_hash, ('patch', calendar_id, record.event_id, body)
+                )
+            continue
+
+        if record:
+            # Target calendar changed: remove the old event; the insert replaces the record
+            operations[f'move-{exam.id}'] = (None, None, None, ('delete', record.calendar_id, record.event_id, None))
+        event_id = event_id_for(user.pk, exam.id)
+        operations[f'insert-{exam.id}'] = (
+            exam, body, body_hash, ('insert', calendar_id, event_id, dict(body, id=event_id))
+        )
+
+    found = {exam.id for exam in exams}
+    for exam_id, record in records.items():
+        if exam_id not in found and (exam_ids is None or exam_id in exam_ids):
+            operations[f'delete-{exam_id}'] = (None, None, None, ('delete', record.calendar_id, record.event_id, None))
+
+    if not operations:
+        return result
+
+    client = client or GoogleCalendarClient.for_user(user, priority=priority)
+    upserts, forgotten, retries = _apply_results(
+        user, calendar_id, operations, run_batch(client, _batch_operations(client, operations), result), result
+    )
+
+    if retries and not result.aborted:
+        # Inserts of an id Google already has (409) become patches, patches of
+        # a vanished event (404/410) become inserts
+        second = {}
+        for exam, body, body_hash, (action, _, _, _) in retries.values():
+            event_id = event_id_for(user.pk, exam.id)
+            if action == 'insert':
+                second[f'patch-{exam.id}'] = (exam, body, body_hash, ('patch', calendar_id, event_id, body))
+            else:
+                second[f'insert-{exam.id}'] = (
+                    exam, body, body_hash, ('insert', calendar_id, event_id, dict(body, id=event_id))
+                )
+        more_upserts, _, conflicts = _apply_results(
+            user, calendar_id, second, run_batch(client, _batch_operations(client, second), result), result
+        )
+        upserts.extend(more_upserts)
+        for exam, *_ in conflicts.values():
+            result.add(exam.id, 'failed', False, error='Event id conflicts with an existing event')
+
+    _save(user, exams, upserts, forgotten)
+
+    logger.info(
+        f"Synced exams for user {user.pk}: {result.changed_count} written, "
+        f"{len(result.items) - result.changed_count - len(result.errors)} unchanged, {len(result.errors)} errors"
+    )
+    if result.aborted:
+        raise result.aborted
+    return result
+
+
+def _batch_operations(client, operations):
+    batch = []
+    for op_id, (_, _, _, (action, calendar_id, event_id, body)) in operations.items():
+        if action == 'insert':
+            batch.append(client.insert_event_operation(op_id, calendar_id, body))
+        elif action == 'patch':
+            batch.append(client.patch_event_operation(op_id, calendar_id, event_id, body))
+        else:
+            batch.append(client.delete_event_operation(op_id, calendar_id, event_id))
+    return batch
+
+
+def _apply_results(user, calendar_id, operations, batch_results, result):
+    """Turn batch results into record upserts; returns (upserts, deleted exam ids, retries)"""
+    upserts, deleted, retries = [], set(), {}
+    now = timezone.now()
+    for op_id, entry in operations.items():
+        exam, body, body_hash, (action, _, event_id, _) = entry
+        batch_result = batch_results[op_id]
+        exam_id = int(op_id.split('-', 1)[1])
+
+        if action == 'delete':
+            if batch_result.ok or batch_result.status in GONE_STATUSES:
+                if op_id.startswith('delete-'):
+                    deleted.add(exam_id)
+                    result.add(exam_id, 'deleted', True, event_id)
+            elif op_id.startswith('delete-'):
+                result.add(exam_id, 'deleted', False, event_id, error=batch_result.error)
+            else:
+                logger.warning(f"Failed to remove moved event {event_id}: {batch_result.error}")
+            continue
+
+        if batch_result.ok:
+            data = batch_result.data or {}
+            upserts.append(CalendarEventRecord(
+                user=user,
+                exam_id=exam.id,
+                calendar_id=calendar_id,
+                event_id=data.get('id', event_id),
+                etag=data.get('etag', ''),
+                content_hash=body_hash,
+                synced_at=now
+            ))
+            result.add(exam.id, 'created' if action == 'insert' else 'updated', True, data.get('id', event_id))
+        elif (action == 'insert' and batch_result.status == 409) or \
+                (action == 'patch' and batch_result.status in GONE_STATUSES):
+            retries[op_id] = entry
+        else:
+            result.add(exam.id, 'created' if action == 'insert' else 'updated', False, event_id,
+                       error=batch_result.error)
+    return upserts, deleted, retries
+
+
+def _save(user, exams, upserts, forgotten):
+    """Persist record changes and the exams' sync fields in one transaction"""
+    Exam = get_exam_model()
+    event_ids = {record.exam_id: record.event_id for record in upserts}
+    changed_exams = []
+    for exam in exams:
+        if exam.id in event_ids and (
+                not exam.synced_to_google_calendar or exam.google_calendar_event_id != event_ids[exam.id]):
+            exam.synced_to_google_calendar = True
+            exam.google_calendar_event_id = event_ids[exam.id]
+            changed_exams.append(exam)
+
+    if not (upserts or forgotten or changed_exams):
+        return
+    with transaction.atomic():
+        if upserts:
+            CalendarEventRecord.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user', 'exam_id'],
+                update_fields=RECORD_UPDATE_FIELDS,
+            )
+        if forgotten:
+            CalendarEventRecord.objects.filter(user=user, exam_id__in=forgotten).delete()
+        if changed_exams:
+            Exam.objects.bulk_update(changed_exams, ['synced_to_google_calendar', 'google_calendar_event_id'])
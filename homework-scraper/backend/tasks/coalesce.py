@@ -0,0 +1,158 @@
+"""
+Coalescing of sync requests per user and task list
+
+The dashboard queues a sync after every scrape and the homework page has
+"Sync All", so one user can ask for overlapping syncs within seconds. Rather
+than one job per request:
+
+- the first request opens a pending run and queues its job with a
+  TASKS_SYNC_DEBOUNCE second countdown (default 2)
+- requests arriving before that job claims the run merge their homework_ids
+  into it (or turn it into a full sync) and get the same job id back
+- a job takes the user's per-list lock before syncing, so two syncs of one
+  list never overlap; a job that finds the lock held retries shortly after,
+  its pending run still open for merges meanwhile
+- once it holds the lock the job claims the pending run, so requests made
+  while it syncs open the next run instead
+
+Keys (list = the target task list id):
+
+    tasks:sync:pending:<user id>:<list>        hash: job_id, all
+    tasks:sync:pending:<user id>:<list>:ids    set of homework ids
+    tasks:sync:lock:<user id>:<list>           id of the job syncing
+
+The lock expires after TASKS_SYNC_LOCK_TTL seconds (default 900) unless
+extended, so a crashed worker doesn't block the user's syncs for long.
+"""
+import logging
+
+from django.conf import settings
+
+from homework_scraper.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a job that found the lock held tries again
+LOCK_RETRY_DELAY = 2
+
+_ENQUEUE_SCRIPT = """
+local job_id = redis.call('HGET', KEYS[1], 'job_id')
+local created = 0
+if not job_id then
+    job_id = ARGV[1]
+    redis.call('HSET', KEYS[1], 'job_id', job_id, 'all', '0')
+    created = 1
+end
+if ARGV[2] == '1' then
+    redis.call('HSET', KEYS[1], 'all', '1')
+end
+for i = 4, #ARGV do
+    redis.call('SADD', KEYS[2], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {job_id, created}
+"""
+
+_CLAIM_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'job_id') ~= ARGV[1] then
+    return false
+end
+local all = redis.call('HGET', KEYS[1], 'all')
+local ids = redis.call('SMEMBERS', KEYS[2])
+redis.call('DEL', KEYS[1], KEYS[2])
+return {all, ids}
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def get_debounce():
+    return getattr(settings, 'TASKS_SYNC_DEBOUNCE', 2)
+
+
+def get_lock_ttl():
+    return getattr(settings, 'TASKS_SYNC_LOCK_TTL', 15 * 60)
+
+
+def _pending_key(user_id, tasklist_id):
+    return f'tasks:sync:pending:{user_id}:{tasklist_id}'
+
+
+def _lock_key(user_id, tasklist_id):
+    return f'tasks:sync:lock:{user_id}:{tasklist_id}'
+
+
+def _run_script(script, keys, args):
+    return get_redis().register_script(script)(keys=keys, args=args)
+
+
+def enqueue(user_id, tasklist_id, job_id, homework_ids=None):
+    """
+    Add a request to the user's pending run, opening it with job_id if none
+
+    homework_ids None means all homework. Returns (job id of the run,
+    whether job_id opened it); the caller queues the job only if it did.
+    An empty homework_ids has nothing to sync: (None, False).
+    """
+    if homework_ids is not None and not homework_ids:
+        return None, False
+
+    key = _pending_key(user_id, tasklist_id)
+    # A pending run must outlive a job waiting for the previous one's lock
+    ttl = get_lock_ttl() * 2 + get_debounce()
+    run_job_id, created = _run_script(
+        _ENQUEUE_SCRIPT,
+        keys=[key, f'{key}:ids'],
+        args=[job_id, '1' if homework_ids is None else '0', ttl, *(homework_ids or [])]
+    )
+    return run_job_id.decode(), bool(created)
+
+
+def claim(user_id, tasklist_id, job_id):
+    """
+    Close job_id's pending run and return what it should sync
+
+    Returns (True, homework_ids or None for all), or (False, None) if the
+    job has no pending run (queued directly, or already claimed).
+    """
+    key = _pending_key(user_id, tasklist_id)
+    claimed = _run_script(_CLAIM_SCRIPT, keys=[key, f'{key}:ids'], args=[job_id])
+    if not claimed:
+        return False, None
+    all_homework, homework_ids = claimed
+    if all_homework == b'1':
+        return True, None
+    return True, sorted(int(homework_id) for homework_id in homework_ids)
+
+
+def acquire_lock(user_id, tasklist_id, job_id):
+    """Take the user's sync lock for a list; False if another job holds it"""
+    key = _lock_key(user_id, tasklist_id)
+    redis = get_redis()
+    if redis.set(key, job_id, nx=True, ex=get_lock_ttl()):
+        return True
+    # A retried job may already hold it
+    holder = redis.get(key)
+    return holder is not None and holder.decode() == job_id
+
+
+def extend_lock(user_id, tasklist_id, job_id):
+    """Push back the lock's expiry while a long sync makes progress"""
+    _run_script(_EXTEND_SCRIPT, keys=[_lock_key(user_id, tasklist_id)], args=[job_id, get_lock_ttl()])
+
+
+def release_lock(user_id, tasklist_id, job_id):
+    _run_script(_RELEASE_SCRIPT, keys=[_lock_key(user_id, tasklist_id)], args=[job_id])
@@ -0,0 +1,68 @@
+"""
+Google Calendar API client
+
+Shares the Tasks client's request handling and batch execution
+(tasks/google_tasks.py), pointed at the Calendar API: REST calls go to
+GOOGLE_CALENDAR_API_URL (default https://www.googleapis.com) and writes to
+its batch endpoint, /batch/calendar/v3. Calendar has its own, much larger
+quota, so calls are not scheduled through the Tasks quota buckets.
+"""
+from urllib.parse import quote
+
+from django.conf import settings
+
+from homework_scraper.google_api import get_access_token
+
+from .batch import BatchOperation
+from .google_tasks import GoogleTasksClient
+from .quota import INTERACTIVE
+
+DEFAULT_API_URL = 'https://www.googleapis.com'
+
+
+def get_api_url():
+    return getattr(settings, 'GOOGLE_CALENDAR_API_URL', DEFAULT_API_URL).rstrip('/')
+
+
+class GoogleCalendarClient(GoogleTasksClient):
+    """Minimal Google Calendar API client for one user's access token"""
+
+    def __init__(self, access_token, api_url=None, session=None, user_id=None, priority=INTERACTIVE, scheduler=None):
+        super().__init__(access_token, api_url=api_url or get_api_url(), session=session, user_id=user_id,
+                         priority=priority, scheduler=scheduler)
+        self.scheduler = scheduler
+
+    @classmethod
+    def for_user(cls, user, priority=INTERACTIVE):
+        return cls(get_access_token(user), user_id=user.pk, priority=priority)
+
+    @property
+    def batch_url(self):
+        return f'{self.api_url}/batch/calendar/v3'
+
+    def list_calendars(self):
+        """Return the calendars in the user's calendar list"""
+        calendars = []
+        params = {'maxResults': 250}
+        while True:
+            data = self._request('GET', '/calendar/v3/users/me/calendarList', params=params)
+            calendars.extend(data.get('items', []))
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return calendars
+            params = dict(params, pageToken=page_token)
+
+    def event_path(self, calendar_id, event_id=None):
+        path = f'/calendar/v3/calendars/{quote(calendar_id, safe="@")}/events'
+        if event_id:
+            path += f'/{quote(event_id)}'
+        return path
+
+    def insert_event_operation(self, op_id, calendar_id, body):
+        return BatchOperation(op_id, 'POST', self.event_path(calendar_id), body)
+
+    def patch_event_operation(self, op_id, calendar_id, event_id, body):
+        return BatchOperation(op_id, 'PATCH', self.event_path(calendar_id, event_id), body)
+
+    def delete_event_operation(self, op_id, calendar_id, event_id):
+        return BatchOperation(op_id, 'DELETE', self.event_path(calendar_id, event_id))
@@ -0,0 +1,359 @@
+"""
+Google Tasks API client
+
+Talks to the Tasks REST API for reads and to the batch endpoint for writes,
+so syncing hundreds of homework items costs a handful of HTTP requests.
+Requests go through the shared Google API session and token cache
+(homework_scraper/google_api.py). The API base URL can be pointed at the
+local stand-in (tasks/local_api.py) with the GOOGLE_TASKS_API_URL setting.
+
+Reads also have `a`-prefixed coroutine versions for async views, made on
+the event loop's async session with the same error and quota handling.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+
+from homework_scraper.google_api import (
+    GoogleAPIError, aget_access_token, get_access_token, get_async_session, get_session, token_cache
+)
+
+from .batch import BatchError, BatchOperation, execute_batch
+from .quota import INTERACTIVE, is_rate_limited, quota_scheduler, rate_limit_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://tasks.googleapis.com'
+
+# Times a rate-limited call or batch part is retried after backing off
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class GoogleTasksError(GoogleAPIError):
+    """A Google Tasks API call failed"""
+
+    def __init__(self, message, status=None, retry_after=None, partial_results=None):
+        super().__init__(message, status=status, retry_after=retry_after)
+        # Batch results received before the failure, by operation id
+        self.partial_results = partial_results or {}
+
+
+def get_api_url():
+    return getattr(settings, 'GOOGLE_TASKS_API_URL', DEFAULT_API_URL).rstrip('/')
+
+
+def get_batch_size():
+    return getattr(settings, 'GOOGLE_TASKS_BATCH_SIZE', 50)
+
+
+def _decode_error(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _retry_after(headers):
+    value = (headers or {}).get('retry-after')
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class GoogleTasksClient:
+    """
+    Minimal Google Tasks API client for one user's access token
+
+    Clients created for a user (for_user) schedule their calls through the
+    shared quota buckets (tasks/quota.py) at the given priority.
+    """
+
+    def __init__(self, access_token, api_url=None, session=None, user_id=None, priority=INTERACTIVE, scheduler=None):
+        self.access_token = access_token
+        self.api_url = (api_url or get_api_url()).rstrip('/')
+        self.session = session or get_session()
+        self.user_id = user_id
+        self.priority = priority
+        self.scheduler = scheduler or (quota_scheduler if user_id is not None else None)
+
+    @classmethod
+    def for_user(cls, user, priority=INTERACTIVE):
+        return cls(get_access_token(user), user_id=user.pk, priority=priority)
+
+    @classmethod
+    async def afor_user(cls, user, priority=INTERACTIVE):
+        return cls(await aget_access_token(user), user_id=user.pk, priority=priority)
+
+    def _acquire(self, cost):
+        if self.scheduler:
+            self.scheduler.acquire(self.user_id, cost, self.priority)
+
+    def _rate_limited(self, data, retry_after):
+        """Back off the quota bucket Google blamed"""
+        if self.scheduler:
+            self.scheduler.penalize(self.user_id, rate_limit_scope(data), retry_after)
+
+    @property
+    def batch_url(self):
+        return f'{self.api_url}/batch/tasks/v1'
+
+    def _request(self, method, path, headers=None, **kwargs):
+        """Make an API call; returns None for 304 Not Modified"""
+        import requests
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self._acquire(1)
+            try:
+                response = self.session.request(
+                    method,
+                    f'{self.api_url}{path}',
+                    headers={'Authorization': f'Bearer {self.access_token}', **(headers or {})},
+                    **kwargs
+                )
+            except requests.RequestException as e:
+                raise GoogleTasksError(f'{method} {path} failed: {str(e)}')
+
+            retry, data = self._handle_response(method, path, response, attempt)
+            if retry:
+                self._rate_limited(data, _retry_after(response.headers))
+                continue
+            return data
+
+    async def _arequest(self, method, path, headers=None, **kwargs):
+        """_request() on the event loop's async session"""
+        session = get_async_session()
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            if self.scheduler:
+                await self.scheduler.aacquire(self.user_id, 1, self.priority)
+            try:
+                response = await session.request(
+                    method,
+                    f'{self.api_url}{path}',
+                    headers={'Authorization': f'Bearer {self.access_token}', **(headers or {})},
+                    **kwargs
+                )
+            except GoogleAPIError as e:
+                raise GoogleTasksError(f'{method} {path} failed: {str(e)}')
+
+            retry, data = self._handle_response(method, path, response, attempt)
+            if retry:
+                await asyncio.to_thread(self._rate_limited, data, _retry_after(response.headers))
+                continue
+            return data
+
+    def _handle_response(self, method, path, response, attempt):
+        """
+        (retry, data) for a requests or httpx response
+
+        retry is True for a rate limit worth backing off and retrying, with
+        data the decoded error; otherwise data is the decoded body (None for
+        304 Not Modified). Other errors raise GoogleTasksError.
+        """
+        if response.status_code == 304:
+            return False, None
+        if response.status_code == 401 and self.user_id is not None:
+            token_cache.invalidate(self.user_id)
+        if response.status_code >= 400:
+            data = _decode_error(response)
+            if (is_rate_limited(response.status_code, data) and self.scheduler
+                    and attempt < MAX_RATE_LIMIT_RETRIES):
+                return True, data
+            raise GoogleTasksError(
+                f'{method} {path} failed: HTTP {response.status_code} {response.text[:200]}',
+                status=response.status_code,
+                retry_after=_retry_after(response.headers)
+            )
+        return False, response.json() if response.content else {}
+
+    def list_tasklists(self):
+        """Return all of the user's task lists"""
+        return self.list_tasklists_if_changed()[0]
+
+    def list_tasklists_if_changed(self, etag=None):
+        """
+        Return (task lists, etag), or (None, etag) if the lists still match etag
+
+        The etag is the one Google returns for the first page.
+        """
+        tasklists = []
+        params = {'maxResults': 100}
+        headers = {'If-None-Match': etag} if etag else None
+        data = self._request('GET', '/tasks/v1/users/@me/lists', headers=headers, params=params)
+        if data is None:
+            return None, etag
+        new_etag = data.get('etag')
+        while True:
+            tasklists.extend(data.get('items', []))
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return tasklists, new_etag
+            data = self._request('GET', '/tasks/v1/users/@me/lists', params=dict(params, pageToken=page_token))
+
+    async def alist_tasklists_if_changed(self, etag=None):
+        tasklists = []
+        params = {'maxResults': 100}
+        headers = {'If-None-Match': etag} if etag else None
+        data = await self._arequest('GET', '/tasks/v1/users/@me/lists', headers=headers, params=params)
+        if data is None:
+            return None, etag
+        new_etag = data.get('etag')
+        while True:
+            tasklists.extend(data.get('items', []))
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return tasklists, new_etag
+            data = await self._arequest(
+                'GET', '/tasks/v1/users/@me/lists', params=dict(params, pageToken=page_token)
+            )
+
+    def iter_task_pages(self, tasklist_id, prefetch=False, **params):
+        """
+        Yield pages of tasks, following nextPageToken
+
+        With prefetch, the next page is requested in a background thread
+        while the caller works on the current one.
+        """
+        params.setdefault('maxResults', 100)
+        path = self.task_path(tasklist_id)
+        if prefetch:
+            yield from self._iter_prefetched(path, params)
+            return
+        while True:
+            data = self._request('GET', path, params=params)
+            yield data.get('items', [])
+            page_token = data.get('nextPageToken')
+            if not page_token:
+                return
+            params = dict(params, pageToken=page_token)
+
+    def _iter_prefetched(self, path, params):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tasks-prefetch')
+        try:
+            future = executor.submit(self._request, 'GET', path, params=params)
+            while True:
+                data = future.result()
+                page_token = data.get('nextPageToken')
+                if page_token:
+                    params = dict(params, pageToken=page_token)
+                    future = executor.submit(self._request, 'GET', path, params=params)
+                yield data.get('items', [])
+                if not page_token:
+                    return
+        finally:
+            # Abandoned early (client went away): don't wait for the next page
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def aiter_task_pages(self, tasklist_id, prefetch=False, **params):
+        """
+        iter_task_pages() as an async generator
+
+        With prefetch, the next page is requested as a concurrent task
+        while the caller works on the current one.
+        """
+        params.setdefault('maxResults', 100)
+        path = self.task_path(tasklist_id)
+        pending = asyncio.ensure_future(self._arequest('GET', path, params=params)) if prefetch else None
+        try:
+            while True:
+                data = await pending if prefetch else await self._arequest('GET', path, params=params)
+                page_token = data.get('nextPageToken')
+                if page_token:
+                    params = dict(params, pageToken=page_token)
+                    if prefetch:
+                        pending = asyncio.ensure_future(self._arequest('GET', path, params=params))
+                yield data.get('items', [])
+                if not page_token:
+                    return
+        finally:
+            # Abandoned early (client went away): drop the next page
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    def list_tasks(self, tasklist_id, **params):
+        """Return every task in a list"""
+        tasks = []
+        for page in self.iter_task_pages(tasklist_id, **params):
+            tasks.extend(page)
+        return tasks
+
+    async def alist_tasks(self, tasklist_id, **params):
+        tasks = []
+        async for page in self.aiter_task_pages(tasklist_id, **params):
+            tasks.extend(page)
+        return tasks
+
+    def task_path(self, tasklist_id, task_id=None):
+        path = f'/tasks/v1/lists/{quote(tasklist_id, safe="@")}/tasks'
+        if task_id:
+            path += f'/{quote(task_id)}'
+        return path
+
+    def insert_operation(self, op_id, tasklist_id, body):
+        return BatchOperation(op_id, 'POST', self.task_path(tasklist_id), body)
+
+    def patch_operation(self, op_id, tasklist_id, task_id, body):
+        return BatchOperation(op_id, 'PATCH', self.task_path(tasklist_id, task_id), body)
+
+    def delete_operation(self, op_id, tasklist_id, task_id):
+        return BatchOperation(op_id, 'DELETE', self.task_path(tasklist_id, task_id))
+
+    def batch(self, operations, progress=None):
+        """
+        Run operations through the batch endpoint, GOOGLE_TASKS_BATCH_SIZE per request
+
+        Each request first takes one quota token per operation. Rate-limited
+        parts (or a rate-limited batch) back the quota off and are retried
+        up to MAX_RATE_LIMIT_RETRIES times. progress, if given, is called
+        with the number of operations finished after each request.
+
+        On failure the GoogleTasksError carries the results received so far
+        in partial_results.
+        """
+        import requests
+
+        results = {}
+        batch_size = get_batch_size()
+        pending = list(operations)
+        attempts = {}
+
+        while pending:
+            chunk, pending = pending[:batch_size], pending[batch_size:]
+            try:
+                self._acquire(len(chunk))
+                chunk_results = execute_batch(self.session, self.batch_url, self.access_token, chunk)
+            except BatchError as e:
+                if e.status == 401 and self.user_id is not None:
+                    token_cache.invalidate(self.user_id)
+                if e.status == 429 and self.scheduler and attempts.get(None, 0) < MAX_RATE_LIMIT_RETRIES:
+                    attempts[None] = attempts.get(None, 0) + 1
+                    self._rate_limited(None, e.retry_after)
+                    pending = chunk + pending
+                    continue
+                raise GoogleTasksError(str(e), status=e.status, retry_after=e.retry_after, partial_results=results)
+            except requests.RequestException as e:
+                raise GoogleTasksError(f'Batch request failed: {str(e)}', partial_results=results)
+            except GoogleAPIError as e:
+                raise GoogleTasksError(str(e), status=e.status, retry_after=e.retry_after, partial_results=results)
+
+            limited = []
+            for op in chunk:
+                result = chunk_results[op.id]
+                if (is_rate_limited(result.status, result.data) and self.scheduler
+                        and attempts.get(op.id, 0) < MAX_RATE_LIMIT_RETRIES):
+                    attempts[op.id] = attempts.get(op.id, 0) + 1
+                    limited.append(op)
+                else:
+                    results[op.id] = result
+
+            if limited:
+                first = chunk_results[limited[0].id]
+                self._rate_limited(first.data, _retry_after(first.headers))
+                pending.extend(limited)
+
+            if progress and len(chunk) > len(limited):
+                progress(len(chunk) - len(limited))
+        return results
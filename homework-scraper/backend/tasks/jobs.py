@@ -0,0 +1,153 @@
+"""
+Background sync job state
+
+POST /api/tasks/sync queues a Celery job (tasks.tasks.sync_homework_job)
+and returns its id; the job's status, progress, per-item errors and final
+summary are kept in Redis so any web worker can answer
+GET /api/tasks/sync/jobs/<job_id>.
+
+Keys (expire after TASKS_SYNC_JOB_TTL seconds, default one day):
+
+    tasks:sync:job:<job_id>          hash of status fields
+    tasks:sync:job:<job_id>:errors   list of JSON-encoded per-item errors
+"""
+import json
+import logging
+import time
+import uuid
+
+from django.conf import settings
+
+from homework_scraper.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'tasks:sync:job:'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Errors beyond this are counted but not stored
+MAX_STORED_ERRORS = 500
+
+
+def get_job_ttl():
+    return getattr(settings, 'TASKS_SYNC_JOB_TTL', 24 * 60 * 60)
+
+
+def _key(job_id):
+    return f'{KEY_PREFIX}{job_id}'
+
+
+def _errors_key(job_id):
+    return f'{KEY_PREFIX}{job_id}:errors'
+
+
+def create_job(user, homework_ids=None, tasklist_id=None):
+    """Record a queued job for a user and return its id"""
+    job_id = uuid.uuid4().hex
+    redis = get_redis()
+    redis.hset(_key(job_id), mapping={
+        'user_id': user.pk,
+        'status': QUEUED,
+        'homework_ids': json.dumps(homework_ids),
+        'tasklist_id': tasklist_id or '',
+        'processed': 0,
+        'total': 0,
+        'error_count': 0,
+        'requests': 1,
+        'created_at': time.time(),
+    })
+    redis.expire(_key(job_id), get_job_ttl())
+    return job_id
+
+
+def add_request(job_id, homework_ids=None):
+    """Count another sync request coalesced into a job, merging its homework_ids"""
+    key = _key(job_id)
+
+    def merge(pipe):
+        stored = pipe.hget(key, 'homework_ids')
+        merged = json.loads(stored) if stored else None
+        if merged is not None:
+            merged = None if homework_ids is None else sorted(set(merged) | set(homework_ids))
+        pipe.multi()
+        pipe.hincrby(key, 'requests', 1)
+        pipe.hset(key, 'homework_ids', json.dumps(merged))
+
+    get_redis().transaction(merge, key)
+
+
+def get_homework_ids(job_id):
+    """Homework ids requested of a job, None for all (or if the job is unknown)"""
+    stored = get_redis().hget(_key(job_id), 'homework_ids')
+    return json.loads(stored) if stored else None
+
+
+def discard_job(job_id):
+    """Remove a job that was never queued"""
+    get_redis().delete(_key(job_id), _errors_key(job_id))
+
+
+def update_job(job_id, **fields):
+    """Set status fields of a job, refreshing its expiry"""
+    pipe = get_redis().pipeline()
+    pipe.hset(_key(job_id), mapping=fields)
+    pipe.expire(_key(job_id), get_job_ttl())
+    pipe.execute()
+
+
+def add_errors(job_id, errors):
+    """Append per-item errors to a job"""
+    if not errors:
+        return
+    redis = get_redis()
+    pipe = redis.pipeline()
+    pipe.rpush(_errors_key(job_id), *[json.dumps(error) for error in errors])
+    pipe.ltrim(_errors_key(job_id), 0, MAX_STORED_ERRORS - 1)
+    pipe.hincrby(_key(job_id), 'error_count', len(errors))
+    pipe.expire(_errors_key(job_id), get_job_ttl())
+    pipe.execute()
+
+
+def set_progress(job_id, processed, total):
+    update_job(job_id, processed=processed, total=total)
+
+
+def get_job(job_id):
+    """Job state as a dict, or None if unknown or expired"""
+    redis = get_redis()
+    pipe = redis.pipeline()
+    pipe.hgetall(_key(job_id))
+    pipe.lrange(_errors_key(job_id), 0, -1)
+    fields, errors = pipe.execute()
+    if not fields:
+        return None
+
+    fields = {name.decode(): value.decode() for name, value in fields.items()}
+    processed = int(fields.get('processed', 0))
+    total = int(fields.get('total', 0))
+
+    def timestamp(name):
+        return float(fields[name]) if fields.get(name) else None
+
+    return {
+        'job_id': job_id,
+        'user_id': int(fields['user_id']),
+        'status': fields['status'],
+        'progress': {
+            'processed': processed,
+            'total': total,
+            'percent': round(processed / total * 100, 1) if total else (100.0 if fields['status'] == SUCCEEDED else 0.0),
+        },
+        'error_count': int(fields.get('error_count', 0)),
+        'requests': int(fields.get('requests', 1)),
+        'errors': [json.loads(error) for error in errors],
+        'summary': json.loads(fields['summary']) if fields.get('summary') else None,
+        'error': fields.get('error') or None,
+        'created_at': timestamp('created_at'),
+        'started_at': timestamp('started_at'),
+        'finished_at': timestamp('finished_at'),
+    }
@@ -0,0 +1,315 @@
+"""
+Local, in-memory stand-in for the Google Tasks API
+
+Implements the parts of the Tasks REST and batch API this app uses (and the
+Calendar events calls of the exam sync), so sync throughput can be measured
+offline:
+
+    server = LocalTasksServer(latency=0.05)
+    server.start()
+    client = GoogleTasksClient('local-token', api_url=server.url)
+    ...
+    server.stop()
+
+`latency` adds a fixed delay to every HTTP request (not to batch parts) to
+imitate the round-trip to Google. `rate_limit` (calls per second, batch
+parts included) answers calls over the limit with 429 rateLimitExceeded,
+like Google's quota. `request_count` counts HTTP requests.
+Used by the benchmark_tasks_sync management command.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from .batch import parse_batch_request
+
+_tasklists_path = re.compile(r'^/tasks/v1/users/@me/lists/?$')
+_tasks_path = re.compile(r'^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/?$')
+_task_path = re.compile(r'^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/(?P<task_id>[^/]+)$')
+_calendar_list_path = re.compile(r'^/calendar/v3/users/me/calendarList/?$')
+_events_path = re.compile(r'^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/events/?$')
+_event_path = re.compile(r'^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/events/(?P<event_id>[^/]+)$')
+_event_id_re = re.compile(r'^[a-v0-9]{5,1024}$')
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class LocalTasksAPI:
+    """In-memory task lists and tasks with Google Tasks semantics"""
+
+    def __init__(self, rate_limit=None):
+        self.lock = threading.Lock()
+        self.tasklists = {'@default': {'id': '@default', 'title': 'My Tasks', 'updated': _now(), 'tasks': {}}}
+        self.calendars = {'primary': {}}
+        self.rate_limit = rate_limit
+        self.rate_limited_count = 0
+        self._allowance = rate_limit or 0
+        self._allowance_at = time.monotonic()
+
+    def _over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        self._allowance = min(self.rate_limit, self._allowance + (now - self._allowance_at) * self.rate_limit)
+        self._allowance_at = now
+        if self._allowance < 1:
+            self.rate_limited_count += 1
+            return True
+        self._allowance -= 1
+        return False
+
+    def handle(self, method, path, query, body, headers=None):
+        """Dispatch one API call; returns (status, response body)"""
+        headers = headers or {}
+        with self.lock:
+            if self._over_rate_limit():
+                return 429, {'error': {
+                    'code': 429,
+                    'message': 'Rate Limit Exceeded',
+                    'errors': [{'reason': 'rateLimitExceeded', 'message': 'Rate Limit Exceeded'}],
+                }}
+
+            if _tasklists_path.match(path):
+                if method == 'GET':
+                    page = self._page([self._tasklist_resource(t) for t in self.tasklists.values()], query)
+                    page['etag'] = self._etag(page)
+                    if headers.get('if-none-match') == page['etag']:
+                        return 304, None
+                    return 200, page
+                if method == 'POST':
+                    tasklist_id = uuid.uuid4().hex[:16]
+                    self.tasklists[tasklist_id] = {
+                        'id': tasklist_id, 'title': (body or {}).get('title', ''), 'updated': _now(), 'tasks': {}
+                    }
+                    return 200, self._tasklist_resource(self.tasklists[tasklist_id])
+
+            match = _tasks_path.match(path)
+            if match:
+                tasklist = self.tasklists.get(match.group('list_id'))
+                if not tasklist:
+                    return 404, {'error': {'code': 404, 'message': 'Task list not found'}}
+                if method == 'GET':
+                    return 200, self._page(self._filter_tasks(tasklist, query), query)
+                if method == 'POST':
+                    task = self._write_task({'id': uuid.uuid4().hex[:22], 'kind': 'tasks#task'}, body or {})
+                    tasklist['tasks'][task['id']] = task
+                    tasklist['updated'] = task['updated']
+                    return 200, task
+
+            match = _task_path.match(path)
+            if match:
+                tasklist = self.tasklists.get(match.group('list_id'))
+                task = tasklist['tasks'].get(match.group('task_id')) if tasklist else None
+                if not task or task.get('deleted'):
+                    return 404, {'error': {'code': 404, 'message': 'Task not found'}}
+                if method == 'GET':
+                    return 200, task
+                if method in ('PATCH', 'PUT'):
+                    if method == 'PUT':
+                        task = {'id': task['id'], 'kind': 'tasks#task'}
+                    task = self._write_task(task, body or {})
+                    tasklist['tasks'][task['id']] = task
+                    tasklist['updated'] = task['updated']
+                    return 200, task
+                if method == 'DELETE':
+                    task['deleted'] = True
+                    task['updated'] = _now()
+                    tasklist['updated'] = task['updated']
+                    return 204, None
+
+            if path.startswith('/calendar/'):
+                return self._handle_calendar(method, path, body)
+
+        return 404, {'error': {'code': 404, 'message': f'Unknown endpoint: {method} {path}'}}
+
+    def _handle_calendar(self, method, path, body):
+        """Calendar events: ids chosen by the client, deleted events kept as cancelled"""
+        if _calendar_list_path.match(path) and method == 'GET':
+            return 200, {'items': [{'id': calendar_id, 'summary': calendar_id} for calendar_id in self.calendars]}
+
+        match = _events_path.match(path) or _event_path.match(path)
+        events = self.calendars.get(match.group('calendar_id')) if match else None
+        if events is None:
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+
+        if _events_path.match(path) and method == 'POST':
+            event_id = (body or {}).get('id') or uuid.uuid4().hex
+            if not _event_id_re.match(event_id):
+                return 400, {'error': {'code': 400, 'message': 'Invalid resource id value.'}}
+            if event_id in events:
+                return 409, {'error': {'code': 409, 'message': 'The requested identifier already exists.'}}
+            events[event_id] = self._write_event({'id': event_id, 'kind': 'calendar#event'}, body or {})
+            return 200, events[event_id]
+
+        event = events.get(match.group('event_id')) if _event_path.match(path) else None
+        if event is None:
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        if method == 'GET':
+            return 200, event
+        if method in ('PATCH', 'PUT'):
+            return 200, self._write_event(event, body or {})
+        if method == 'DELETE':
+            if event['status'] == 'cancelled':
+                return 410, {'error': {'code': 410, 'message': 'Resource has been deleted'}}
+            event['status'] = 'cancelled'
+            return 204, None
+        return 404, {'error': {'code': 404, 'message': f'Unknown endpoint: {method} {path}'}}
+
+    def _write_event(self, event, changes):
+        event.update({k: v for k, v in changes.items() if k not in ('id', 'etag', 'updated')})
+        event.setdefault('status', 'confirmed')
+        event['updated'] = _now()
+        event['etag'] = self._etag(event)
+        return event
+
+    def _etag(self, data):
+        return '"' + hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest() + '"'
+
+    def _tasklist_resource(self, tasklist):
+        return {
+            'kind': 'tasks#taskList',
+            'id': tasklist['id'],
+            'title': tasklist['title'],
+            'updated': tasklist['updated'],
+        }
+
+    def _write_task(self, task, changes):
+        task.update({k: v for k, v in changes.items() if k not in ('id', 'etag', 'updated')})
+        if task.get('status') == 'completed':
+            task.setdefault('completed', _now())
+        else:
+            task.pop('completed', None)
+        task['updated'] = _now()
+        task['etag'] = f'"{uuid.uuid4().hex}"'
+        return task
+
+    def _filter_tasks(self, tasklist, query):
+        show_completed = query.get('showCompleted', 'true') == 'true'
+        show_hidden = query.get('showHidden', 'false') == 'true'
+        show_deleted = query.get('showDeleted', 'false') == 'true'
+        updated_min = query.get('updatedMin')
+        due_min = query.get('dueMin')
+        due_max = query.get('dueMax')
+
+        tasks = []
+        for task in tasklist['tasks'].values():
+            if task.get('deleted') and not show_deleted:
+                continue
+            if task.get('status') == 'completed' and not show_completed:
+                continue
+            if task.get('hidden') and not show_hidden:
+                continue
+            if updated_min and task['updated'] < updated_min:
+                continue
+            if due_min and (not task.get('due') or task['due'] < due_min):
+                continue
+            if due_max and (not task.get('due') or task['due'] >= due_max):
+                continue
+            tasks.append(task)
+        return tasks
+
+    def _page(self, items, query):
+        page_size = min(int(query.get('maxResults', 100)), 100)
+        start = int(query.get('pageToken', 0) or 0)
+        page = {'items': items[start:start + page_size]}
+        if start + page_size < len(items):
+            page['nextPageToken'] = str(start + page_size)
+        return page
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; avoid delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        server = self.server
+        with server.count_lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        if url.path.startswith('/batch/'):
+            self._send_batch(raw_body)
+            return
+
+        body = json.loads(raw_body) if raw_body else None
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        status, data = server.api.handle(self.command, url.path, query, body, headers)
+        self._send(status, 'application/json; charset=UTF-8', json.dumps(data).encode() if data is not None else b'')
+
+    def _send_batch(self, raw_body):
+        content_type = self.headers.get('Content-Type', '')
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        for op in parse_batch_request(content_type, raw_body):
+            url = urlsplit(op.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            status, data = self.server.api.handle(op.method, url.path, query, op.body, op.headers)
+            payload = json.dumps(data) if data is not None else ''
+            parts.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{op.id}>\r\n\r\n'
+                f'HTTP/1.1 {status} {"OK" if status < 400 else "Error"}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n{payload}\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n')
+        self._send(200, f'multipart/mixed; boundary={boundary}', ''.join(parts).encode())
+
+    def _send(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+
+class LocalTasksServer:
+    """Runs LocalTasksAPI over HTTP on a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate_limit=None):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.api = LocalTasksAPI(rate_limit=rate_limit)
+        self.httpd.latency = latency
+        self.httpd.request_count = 0
+        self.httpd.count_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api(self):
+        return self.httpd.api
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.local_api import LocalTasksServer
+
+# Where manage.py and the gunicorn configs live
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+MODES = {
+    'gthread': ('gunicorn_config_optimized.py', 'homework_scraper.wsgi:application'),
+    'asgi': ('gunicorn_config_asgi.py', 'homework_scraper.asgi:application'),
+}
+
+ENDPOINTS = {
+    # One Google call per request: the cache revalidates every time
+    'tasks': '/api/tasks/lists',
+    # Four shell commands per request, uncached
+    'monitoring': '/api/monitoring/system-status/',
+}
+
+SETTINGS_SHIM = '''\
+from {base} import *  # noqa: F401,F403
+
+ALLOWED_HOSTS = [*ALLOWED_HOSTS, '127.0.0.1']
+GOOGLE_TASKS_API_URL = {api_url!r}
+TASKS_CACHE_TTL = 0
+GOOGLE_TASKS_QUOTA = {{'user_rate': 1e6, 'user_burst': 1e6, 'project_rate': 1e6, 'project_burst': 1e6}}
+MONITORING_CACHE_TTLS = {{'system-status': 0}}
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare how many concurrent requests the gthread (WSGI) and uvicorn (ASGI) '
+        'gunicorn setups serve with the same workers, against the local Google Tasks '
+        'stand-in with a simulated round-trip time. Starts both servers itself.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(ENDPOINTS),
+            default='tasks',
+            help='tasks: Google-bound task lists view; monitoring: subprocess-bound system status view'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Workers for both servers, i.e. the same memory budget'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads per gthread worker'
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='4,16,64,128',
+            help='Comma-separated numbers of concurrent clients to test'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds per concurrency level'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=100,
+            help='Simulated Google round-trip time'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=sorted(MODES),
+            action='append',
+            dest='modes',
+            help='Only run this server setup (repeatable; default both)'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Port the servers listen on'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be comma-separated integers')
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            raise CommandError('httpx is required (it is also needed for ASGI mode)')
+
+        modes = options['modes'] or list(MODES)
+        path = ENDPOINTS[options['endpoint']]
+
+        upstream = LocalTasksServer(latency=options['latency_ms'] / 1000).start()
+        user = self.create_user()
+        shim_dir = tempfile.mkdtemp(prefix='benchmark-asgi-')
+        try:
+            shim = self.write_settings_shim(shim_dir, upstream.url)
+            cookies = {settings.SESSION_COOKIE_NAME: self.create_session(user)}
+
+            self.stdout.write(
+                f"{path} with {options['workers']} workers "
+                f"(gthread: {options['threads']} threads each), "
+                f"{options['latency_ms']:.0f}ms upstream latency, {options['duration']:.0f}s per level\n"
+            )
+            self.stdout.write(
+                f"{'mode':<8} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                f"{'errors':>7} {'worker RSS MB':>14}"
+            )
+            for mode in modes:
+                self.run_mode(mode, shim, path, cookies, levels, options)
+        finally:
+            upstream.stop()
+            user.delete()
+            shutil.rmtree(shim_dir, ignore_errors=True)
+
+    def create_user(self):
+        """Throwaway user with a non-expiring Google token the local API accepts"""
+        from allauth.socialaccount.models import SocialAccount, SocialToken
+
+        name = f'benchmark-asgi-{uuid.uuid4().hex[:12]}'
+        user = get_user_model().objects.create_user(username=name)
+        account = SocialAccount.objects.create(user=user, provider='google', uid=name)
+        SocialToken.objects.create(account=account, token='local-token')
+        return user
+
+    def create_session(self, user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    def write_settings_shim(self, shim_dir, api_url):
+        """Settings module pointing the servers at the local API with caches off"""
+        with open(os.path.join(shim_dir, 'benchmark_asgi_settings.py'), 'w') as f:
+            f.write(SETTINGS_SHIM.format(base=os.environ['DJANGO_SETTINGS_MODULE'], api_url=api_url))
+        return shim_dir
+
+    def run_mode(self, mode, shim_dir, path, cookies, levels, options):
+        config, app = MODES[mode]
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='benchmark_asgi_settings',
+            PYTHONPATH=os.pathsep.join([shim_dir, BACKEND_DIR, os.environ.get('PYTHONPATH', '')]),
+            GUNICORN_WORKERS=str(options['workers']),
+            GUNICORN_THREADS=str(options['threads']),
+            GUNICORN_BIND=f"127.0.0.1:{options['port']}",
+            GUNICORN_ACCESS_LOG='/dev/null',
+        )
+        log = open(os.path.join(shim_dir, f'{mode}.log'), 'w+')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', config, app],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        base_url = f"http://127.0.0.1:{options['port']}"
+        errors = 0
+        try:
+            self.wait_until_up(server, base_url, log)
+            # Let every worker open its connections before measuring
+            asyncio.run(self.load(base_url + path, cookies, options['workers'] * 4, 2))
+            for clients in levels:
+                stats = asyncio.run(self.load(base_url + path, cookies, clients, options['duration']))
+                errors += stats['errors']
+                self.stdout.write(
+                    f"{mode:<8} {clients:>7} {stats['rate']:>8.1f} {stats['p50']:>8.0f} "
+                    f"{stats['p95']:>8.0f} {stats['errors']:>7} {worker_rss_mb(server.pid):>14.0f}"
+                )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            if errors:
+                log.seek(0)
+                self.stderr.write(f'{mode} server log (last lines):\n{log.read()[-3000:]}')
+            log.close()
+
+    def wait_until_up(self, server, base_url, log):
+        import httpx
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'Server exited:\n{log.read()[-2000:]}')
+            try:
+                httpx.get(f'{base_url}/api/health', timeout=1)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        raise CommandError('Server did not start within 60s')
+
+    async def load(self, url, cookies, clients, duration):
+        """Closed-loop load: each client sends its next request when the last one returns"""
+        import httpx
+
+        latencies = []
+        errors = 0
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        async with httpx.AsyncClient(cookies=cookies, limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + duration
+
+            async def run_client():
+                nonlocal errors
+                while time.monotonic() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    else:
+                        errors += 1
+
+            started = time.monotonic()
+            await asyncio.gather(*(run_client() for _ in range(clients)))
+            elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            'rate': len(latencies) / elapsed,
+            'p50': latencies[len(latencies) // 2] if latencies else 0,
+            'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            'errors': errors,
+        }
+
+
+def worker_rss_mb(master_pid):
+    """Combined RSS of a gunicorn master's workers"""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            pids = f.read().split()
+    except OSError:
+        return 0
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / (1024 * 1024)
@@ -0,0 +1,96 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from tasks.google_tasks import GoogleTasksClient
+from tasks.local_api import LocalTasksServer
+from tasks.sync import SyncResult, build_task_body, plan_sync, push_changes
+
+
+class FakeHomework:
+    """Stand-in for a homework row, so the benchmark needs no database"""
+
+    def __init__(self, id):
+        self.id = id
+        self.title = f'Exercise {id}'
+        self.description = f'Pages {id}-{id + 3}, all odd problems'
+        self.subject = ['Math', 'Physics', 'History', 'Lithuanian'][id % 4]
+        self.site = 'manodienynas'
+        self.due_date = date.today() + timedelta(days=id % 14)
+        self.completed = False
+
+
+class Command(BaseCommand):
+    help = 'Measure Google Tasks sync throughput against the local Tasks API stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=500,
+            help='Number of homework items to sync'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=50,
+            help='Simulated round-trip time per HTTP request'
+        )
+        parser.add_argument(
+            '--compare-single',
+            action='store_true',
+            help='Also time one HTTP request per item for comparison'
+        )
+
+    def handle(self, *args, **options):
+        items = [FakeHomework(i) for i in range(1, options['items'] + 1)]
+        latency = options['latency_ms'] / 1000
+
+        server = LocalTasksServer(latency=latency).start()
+        try:
+            client = GoogleTasksClient('local-token', api_url=server.url)
+            records = {}
+
+            self.run('batch insert', server, lambda: self.sync(client, items, records))
+            self.run('no changes', server, lambda: self.sync(client, items, records))
+
+            for homework in items[::10]:
+                homework.completed = True
+            self.run('10% changed', server, lambda: self.sync(client, items, records))
+
+            if options['compare_single']:
+                self.run('single requests', server, lambda: self.sync_single(client, items))
+        finally:
+            server.stop()
+
+    def sync(self, client, items, records):
+        """One delta sync, keeping sync records in memory instead of the database"""
+        result = SyncResult()
+        plan = plan_sync(items, records, '@default')
+        for record in plan.unchanged:
+            result.add(record.homework_id, 'unchanged', True, task_id=record.task_id)
+        if not plan.is_empty:
+            upserts, _ = push_changes(client, None, '@default', plan, result)
+            records.update((record.homework_id, record) for record in upserts)
+        return result
+
+    def sync_single(self, client, items):
+        result = SyncResult()
+        for homework in items:
+            task = client._request('POST', client.task_path('@default'), json=build_task_body(homework))
+            result.add(homework.id, 'created', True, task_id=task['id'])
+        return result
+
+    def run(self, label, server, func):
+        requests_before = server.request_count
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+
+        synced = len(result.synced_ids)
+        self.stdout.write(
+            f"{label:<16} {synced:>5} items in {elapsed:7.2f}s "
+            f"({synced / elapsed:8.1f} items/s, {result.changed_count} sent, "
+            f"{server.request_count - requests_before} HTTP requests, {len(result.errors)} errors)"
+        )
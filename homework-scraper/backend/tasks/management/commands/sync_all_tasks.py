@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from homework_scraper.google_api import GoogleAPIError
+
+from tasks import coalesce
+from tasks.models import TaskSyncRecord
+from tasks.quota import BULK
+from tasks.sync import get_default_tasklist_id, get_homework_model, sync_homework
+
+
+class Command(BaseCommand):
+    help = (
+        'Sync every user with unsynced homework, or with tasks whose homework was deleted, '
+        'to Google Tasks in parallel. Edits to already synced homework are not detected '
+        'without hashing every row, so use --force (or --user with --force) to push those. '
+        'Runs at bulk quota priority and checkpoints finished users to a file, '
+        'so an interrupted run continues with --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Users synced at the same time (the shared quota still caps the call rate)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Re-sync every user's homework and re-send every task, changed or not"
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only sync this user id (repeatable)'
+        )
+        parser.add_argument(
+            '--list-id',
+            default=None,
+            help='Target task list (default GOOGLE_TASKS_LIST_ID)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default='sync_all_tasks.checkpoint',
+            help='File recording finished users, one JSON line each'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip users the checkpoint file records as done'
+        )
+        parser.add_argument(
+            '--lock-wait',
+            type=float,
+            default=60,
+            help='Seconds to wait for a sync of the same user already running'
+        )
+        parser.add_argument(
+            '--report-every',
+            type=float,
+            default=10,
+            help='Seconds between progress lines'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        self.tasklist_id = options['list_id'] or get_default_tasklist_id()
+        self.force = options['force']
+        self.lock_wait = options['lock_wait']
+
+        user_ids = self.select_users(options['user_ids'])
+        done = self.read_checkpoint(options['checkpoint']) if options['resume'] else set()
+        pending = [user_id for user_id in user_ids if user_id not in done]
+
+        self.stdout.write(
+            f"{len(user_ids)} users selected, {len(user_ids) - len(pending)} already done, "
+            f"{len(pending)} to sync with concurrency {options['concurrency']}"
+        )
+        if not pending:
+            return
+
+        mode = 'a' if options['resume'] else 'w'
+        with open(options['checkpoint'], mode) as checkpoint:
+            self.run(pending, options['concurrency'], checkpoint, options['report_every'])
+
+    def select_users(self, user_ids):
+        """
+        Users with homework not yet synced or tasks whose homework was deleted,
+        or everyone with homework or tasks if forced
+        """
+        Homework = get_homework_model()
+        if self.force:
+            selected = set(Homework.objects.values_list('user_id', flat=True).distinct())
+            selected.update(TaskSyncRecord.objects.values_list('user_id', flat=True).distinct())
+        else:
+            selected = set(
+                Homework.objects.filter(synced_to_google_tasks=False)
+                .values_list('user_id', flat=True).distinct()
+            )
+            selected.update(
+                TaskSyncRecord.objects.exclude(homework_id__in=Homework.objects.values('id'))
+                .values_list('user_id', flat=True).distinct()
+            )
+        if user_ids:
+            selected &= set(user_ids)
+        return sorted(selected)
+
+    def read_checkpoint(self, path):
+        done = set()
+        if not os.path.exists(path):
+            return done
+        with open(path) as checkpoint:
+            for line in checkpoint:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted run
+                    continue
+                if entry.get('status') == 'done':
+                    done.add(entry['user_id'])
+        return done
+
+    def run(self, pending, concurrency, checkpoint, report_every):
+        totals = Counter()
+        failures = Counter()
+        start = time.monotonic()
+        last_report = start
+        self.stop = threading.Event()
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sync-all')
+        futures = {executor.submit(self.sync_user, user_id): user_id for user_id in pending}
+        try:
+            while futures:
+                finished, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    user_id = futures.pop(future)
+                    entry = future.result()
+                    checkpoint.write(json.dumps(entry) + '\n')
+                    checkpoint.flush()
+
+                    totals['users'] += 1
+                    totals[entry['status']] += 1
+                    for key in ('synced', 'changed', 'errors'):
+                        totals[key] += entry.get(key, 0)
+                    if entry['status'] != 'done':
+                        failures[entry['error']] += 1
+                        self.stderr.write(f"User {user_id}: {entry['error']}")
+
+                now = time.monotonic()
+                if now - last_report >= report_every:
+                    self.report(totals, len(pending), now - start)
+                    last_report = now
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.stderr.write('Interrupted; finishing users in progress (run again with --resume to continue)')
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, user_id in futures.items():
+                if future.done() and not future.cancelled():
+                    checkpoint.write(json.dumps(future.result()) + '\n')
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        self.summarize(totals, failures, time.monotonic() - start)
+
+    def sync_user(self, user_id):
+        """Sync one user; returns their checkpoint entry"""
+        started = time.monotonic()
+        entry = {'user_id': user_id}
+        job_id = f'sync-all-{os.getpid()}-{user_id}'
+        locked = False
+        try:
+            if self.stop.is_set():
+                return dict(entry, status='skipped', error='Interrupted')
+
+            deadline = time.monotonic() + self.lock_wait
+            while not coalesce.acquire_lock(user_id, self.tasklist_id, job_id):
+                if time.monotonic() > deadline or self.stop.is_set():
+                    return dict(entry, status='failed', error='Another sync of this user is running')
+                time.sleep(coalesce.LOCK_RETRY_DELAY)
+            locked = True
+
+            user = User.objects.get(pk=user_id)
+            if self.force:
+                # An empty hash never matches, so every task is re-sent
+                TaskSyncRecord.objects.filter(user=user, tasklist_id=self.tasklist_id).update(content_hash='')
+            result = sync_homework(
+                user, tasklist_id=self.tasklist_id, priority=BULK,
+                # Bulk quota waits can be long; keep interactive syncs of this list out
+                progress=lambda processed, total: coalesce.extend_lock(user_id, self.tasklist_id, job_id)
+            )
+            entry.update(
+                status='done',
+                synced=len(result.synced_ids),
+                changed=result.changed_count,
+                errors=len(result.errors)
+            )
+        except User.DoesNotExist:
+            entry.update(status='failed', error='User not found')
+        except GoogleAPIError as e:
+            entry.update(status='failed', error=str(e)[:200], error_status=e.status)
+        except Exception as e:
+            entry.update(status='failed', error=f'{type(e).__name__}: {str(e)[:200]}')
+        finally:
+            if locked:
+                coalesce.release_lock(user_id, self.tasklist_id, job_id)
+            # Worker threads open their own database connections
+            connections.close_all()
+        entry['seconds'] = round(time.monotonic() - started, 2)
+        return entry
+
+    def report(self, totals, total_users, elapsed):
+        self.stdout.write(
+            f"[{elapsed:7.1f}s] {totals['users']}/{total_users} users, "
+            f"{totals['synced']} items synced, {totals['changed']} sent "
+            f"({totals['changed'] / elapsed if elapsed else 0:.1f}/s), "
+            f"{totals['failed']} users failed"
+        )
+
+    def summarize(self, totals, failures, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f"Finished in {elapsed:.1f}s: {totals['done']} users synced, {totals['failed']} failed, "
+            f"{totals['synced']} items synced, {totals['changed']} tasks written, "
+            f"{totals['errors']} item errors "
+            f"({totals['users'] / elapsed if elapsed else 0:.2f} users/s, "
+            f"{totals['changed'] / elapsed if elapsed else 0:.1f} writes/s)"
+        ))
+        if failures:
+            self.stdout.write('Most common failures:')
+            for error, count in failures.most_common(5):
+                self.stdout.write(f"  {count:>5}  {error}")
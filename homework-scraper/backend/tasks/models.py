@@ -0,0 +1,77 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class TaskSyncRecord(models.Model):
+    """Google Task created for a homework item, and a hash of what was last sent"""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_sync_records')
+    
+    # Plain id rather than a foreign key: the record has to outlive the
+    # homework row so the remote task can be deleted after it is removed
+    homework_id = models.BigIntegerField()
+    
+    # Remote task
+    tasklist_id = models.CharField(max_length=255)
+    task_id = models.CharField(max_length=255)
+    etag = models.CharField(max_length=255, blank=True)
+    
+    # sha256 of the task fields last sent (title, notes, due, status)
+    content_hash = models.CharField(max_length=64)
+    synced_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'homework_id'], name='unique_task_per_homework'),
+        ]
+        indexes = [
+            models.Index(fields=['tasklist_id', 'task_id']),
+        ]
+    
+    def __str__(self):
+        return f"Homework {self.homework_id} -> {self.tasklist_id}/{self.task_id}"
+
+
+class TaskListCheckpoint(models.Model):
+    """How far a user's task list has been pulled back into homework"""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_list_checkpoints')
+    tasklist_id = models.CharField(max_length=255)
+    
+    # Newest `updated` timestamp seen (RFC 3339), passed as updatedMin next time
+    updated_min = models.CharField(max_length=64)
+    pulled_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tasklist_id'], name='unique_checkpoint_per_list'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.tasklist_id} since {self.updated_min}"
+
+
+class CalendarEventRecord(models.Model):
+    """Google Calendar event created for an exam, and a hash of what was last sent"""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='calendar_event_records')
+    
+    # Plain id for the same reason as TaskSyncRecord.homework_id
+    exam_id = models.BigIntegerField()
+    
+    # Remote event; the id is derived from the exam (see tasks/calendar_sync.py)
+    calendar_id = models.CharField(max_length=255)
+    event_id = models.CharField(max_length=1024)
+    etag = models.CharField(max_length=255, blank=True)
+    
+    content_hash = models.CharField(max_length=64)
+    synced_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exam_id'], name='unique_event_per_exam'),
+        ]
+    
+    def __str__(self):
+        return f"Exam {self.exam_id} -> {self.calendar_id}/{self.event_id}"
@@ -0,0 +1,178 @@
+"""
+Google Tasks -> homework completion pull
+
+Ticking a task off in Google Tasks (or reopening it) is copied back to the
+homework item it was created for. Every list holding synced tasks has a
+TaskListCheckpoint: the newest `updated` timestamp seen there. A pull asks
+Google only for tasks changed since then (updatedMin, completed, hidden and
+deleted tasks included, a minimal field set), maps them to homework through
+TaskSyncRecord.task_id and applies the completion changes with one bulk
+update. A pull with nothing new costs one list call per list and no writes.
+
+Sync records get the new hash, so the next push doesn't send the same
+status back to Google. Homework changed locally since its last push (its
+record's hash no longer matches, e.g. marked done in the app) is left
+alone as a conflict: the local change wins and the next push sends it.
+
+pull_all_task_completions (tasks/tasks.py) runs this for every user with
+synced tasks every TASKS_PULL_INTERVAL seconds (default 300, 0 disables);
+see tasks/apps.py for how it is scheduled.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from homework_scraper.google_api import GoogleAuthError
+
+from .cache import CLOCK_SKEW, rfc3339
+from .google_tasks import GoogleTasksClient, GoogleTasksError
+from .models import TaskListCheckpoint, TaskSyncRecord
+from .quota import BULK
+from .sync import build_task_body, content_hash, get_homework_model
+
+logger = logging.getLogger(__name__)
+
+PULL_FIELDS = 'nextPageToken,items(id,status,completed,updated,deleted)'
+
+
+class PullResult:
+    """Outcome of pulling one user's lists"""
+
+    def __init__(self):
+        self.lists = 0
+        self.changed_tasks = 0
+        self.completed_ids = []
+        self.reopened_ids = []
+        self.conflict_ids = []
+        self.errors = []
+
+    def as_dict(self):
+        return {
+            'lists': self.lists,
+            'changed_tasks': self.changed_tasks,
+            'completed': len(self.completed_ids),
+            'reopened': len(self.reopened_ids),
+            'conflicts': len(self.conflict_ids),
+            'errors': self.errors,
+        }
+
+
+def _completed_at(task):
+    return (parse_datetime(task['completed']) if task.get('completed') else None) or timezone.now()
+
+
+def pull_completions(user, client=None, priority=BULK):
+    """Apply completion changes made in Google Tasks since the last pull"""
+    result = PullResult()
+    lists = (
+        TaskSyncRecord.objects.filter(user=user)
+        .values('tasklist_id')
+        .annotate(oldest=Min('synced_at'))
+    )
+    if not lists:
+        return result
+
+    checkpoints = {
+        checkpoint.tasklist_id: checkpoint.updated_min
+        for checkpoint in TaskListCheckpoint.objects.filter(user=user)
+    }
+    client = client or GoogleTasksClient.for_user(user, priority=priority)
+
+    # homework id -> (completed, completed_at), from the newest change seen
+    changes = {}
+    advanced = {}
+    for row in lists:
+        tasklist_id = row['tasklist_id']
+        # First pull of a list: nothing before our own first write matters
+        updated_min = checkpoints.get(tasklist_id) or rfc3339(row['oldest'].timestamp() - CLOCK_SKEW)
+        try:
+            tasks = client.list_tasks(
+                tasklist_id,
+                updatedMin=updated_min,
+                showCompleted='true',
+                showHidden='true',
+                showDeleted='true',
+                fields=PULL_FIELDS
+            )
+        except GoogleAuthError:
+            raise
+        except GoogleTasksError as e:
+            logger.warning(f"Pull of list {tasklist_id} for user {user.pk} failed: {str(e)}")
+            result.errors.append({'tasklist_id': tasklist_id, 'error': str(e), 'status': e.status})
+            continue
+
+        result.lists += 1
+        newest = max((task['updated'] for task in tasks if task.get('updated')), default=updated_min)
+        if newest != checkpoints.get(tasklist_id):
+            advanced[tasklist_id] = max(newest, updated_min)
+
+        live = {task['id']: task for task in tasks if not task.get('deleted')}
+        if not live:
+            continue
+        result.changed_tasks += len(live)
+        for record in TaskSyncRecord.objects.filter(user=user, tasklist_id=tasklist_id, task_id__in=live):
+            task = live[record.task_id]
+            done = task.get('status') == 'completed'
+            changes[record.homework_id] = (done, _completed_at(task) if done else None)
+
+    _apply(user, changes, advanced, result)
+    if result.completed_ids or result.reopened_ids or result.conflict_ids:
+        logger.info(
+            f"Pulled completions for user {user.pk}: {len(result.completed_ids)} completed, "
+            f"{len(result.reopened_ids)} reopened, {len(result.conflict_ids)} changed here kept"
+        )
+    return result
+
+
+def _apply(user, changes, advanced, result):
+    """Bulk-update changed homework and their records, and advance checkpoints"""
+    Homework = get_homework_model()
+    fields = ['completed']
+    if any(field.name == 'completed_at' for field in Homework._meta.get_fields()):
+        fields.append('completed_at')
+
+    updated, records = [], []
+    if changes:
+        by_homework = {
+            record.homework_id: record
+            for record in TaskSyncRecord.objects.filter(user=user, homework_id__in=changes)
+        }
+        for homework in Homework.objects.filter(user=user, id__in=changes):
+            done, done_at = changes[homework.id]
+            if bool(homework.completed) == done:
+                continue
+            record = by_homework.get(homework.id)
+            if record is None or record.content_hash != content_hash(build_task_body(homework)):
+                # Changed here since the last push; that push will overwrite Google's
+                result.conflict_ids.append(homework.id)
+                continue
+            homework.completed = done
+            if 'completed_at' in fields:
+                homework.completed_at = done_at
+            record.content_hash = content_hash(build_task_body(homework))
+            updated.append(homework)
+            records.append(record)
+            (result.completed_ids if done else result.reopened_ids).append(homework.id)
+
+    if not updated and not advanced:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        if updated:
+            Homework.objects.bulk_update(updated, fields)
+        if records:
+            TaskSyncRecord.objects.bulk_update(records, ['content_hash'])
+        if advanced:
+            TaskListCheckpoint.objects.bulk_create(
+                [
+                    TaskListCheckpoint(user=user, tasklist_id=tasklist_id, updated_min=updated_min, pulled_at=now)
+                    for tasklist_id, updated_min in advanced.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'tasklist_id'],
+                update_fields=['updated_min', 'pulled_at']
+            )
@@ -0,0 +1,301 @@
+"""
+Quota-aware scheduling of Google Tasks API calls
+
+Every call (each part of a batch counts as one, as it does for Google's
+quota) takes tokens from two buckets stored in Redis, so all web and Celery
+workers share them:
+
+    tasks:quota:user:<user id>    per-user bucket
+    tasks:quota:project           bucket for the whole Cloud project
+
+Both are refilled continuously at their rate up to their burst size and
+are checked and charged atomically by a Lua script.
+
+Priorities: INTERACTIVE calls (a user pressed "Sync") may use a bucket down
+to empty; BULK calls (beat-triggered and batch syncs) must leave a reserve of
+GOOGLE_TASKS_QUOTA['bulk_reserve'] of each bucket, so interactive work
+goes ahead of a bulk backlog.
+
+Adaptive backoff: a 429 (or a 403 rateLimitExceeded) halves the bucket's
+effective rate, drains it to the interactive reserve and blocks it until Retry-After (one second
+when Google gives none; growing exponentially once the rate is at
+min_factor). The rate then recovers linearly
+(recovery_per_second), so throughput climbs back to just under the quota
+ceiling instead of oscillating through retry storms.
+
+Settings, GOOGLE_TASKS_QUOTA (defaults below):
+
+    'user_rate': 10, 'user_burst': 100,        # calls/second, bucket size
+    'project_rate': 50, 'project_burst': 500,
+    'bulk_reserve': 0.2,                       # fraction kept for INTERACTIVE
+    'min_factor': 0.01, 'recovery_per_second': 0.02,
+    'max_backoff': 60,
+"""
+import asyncio
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from homework_scraper.google_api import GoogleAPIError
+from homework_scraper.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+USER_SCOPE = 'user'
+PROJECT_SCOPE = 'project'
+
+PROJECT_KEY = 'tasks:quota:project'
+
+DEFAULT_QUOTA = {
+    'user_rate': 10,
+    'user_burst': 100,
+    'project_rate': 50,
+    'project_burst': 500,
+    'bulk_reserve': 0.2,
+    'min_factor': 0.01,
+    'recovery_per_second': 0.02,
+    'max_backoff': 60,
+}
+
+# Longest time acquire() blocks before giving up, per priority
+DEFAULT_MAX_WAIT = {INTERACTIVE: 30, BULK: 600}
+
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded')
+
+# Bucket hash fields: tokens, ts (last refill), factor (rate multiplier),
+# backoff_until, strikes (recent 429s)
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local recovery = tonumber(ARGV[4])
+
+local wait = 0
+local state = {}
+for i = 1, 2 do
+    local rate = tonumber(ARGV[3 + i * 2])
+    local burst = tonumber(ARGV[4 + i * 2])
+    local b = redis.call('HMGET', KEYS[i], 'tokens', 'ts', 'factor', 'backoff_until')
+    local ts = tonumber(b[2]) or now
+    local elapsed = math.max(0, now - ts)
+    local factor = math.min(1, (tonumber(b[3]) or 1) + elapsed * recovery)
+    local tokens = math.min(burst, (tonumber(b[1]) or burst) + elapsed * rate * factor)
+    local needed = math.min(cost, burst) + reserve * burst
+    if needed > burst then needed = burst end
+    if tokens < needed then
+        wait = math.max(wait, (needed - tokens) / (rate * factor))
+    end
+    wait = math.max(wait, (tonumber(b[4]) or 0) - now)
+    state[i] = {tokens, factor, burst}
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+for i = 1, 2 do
+    local charged = state[i][1] - math.min(cost, state[i][3])
+    redis.call('HSET', KEYS[i], 'tokens', charged, 'ts', now, 'factor', state[i][2])
+    redis.call('EXPIRE', KEYS[i], 86400)
+end
+return '0'
+"""
+
+_PENALIZE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry_after = tonumber(ARGV[2])
+local min_factor = tonumber(ARGV[3])
+local max_backoff = tonumber(ARGV[4])
+local reserve_tokens = tonumber(ARGV[5])
+
+local b = redis.call('HMGET', KEYS[1], 'factor', 'backoff_until', 'strikes', 'strike_ts', 'tokens')
+local factor = tonumber(b[1]) or 1
+local strikes = tonumber(b[3]) or 0
+local strike_ts = tonumber(b[4]) or 0
+if now - strike_ts > max_backoff then strikes = 0 end
+
+-- 429s landing together (concurrent workers, parts of one batch) are one
+-- signal; only count them once per second
+if now - strike_ts >= 1 then
+    if factor > min_factor then
+        factor = math.max(min_factor, factor * 0.5)
+    else
+        -- Already at the lowest rate: back off exponentially instead
+        strikes = strikes + 1
+    end
+    strike_ts = now
+end
+
+local delay = retry_after
+if delay <= 0 then
+    delay = math.min(max_backoff, 2 ^ strikes)
+end
+local backoff_until = math.max(tonumber(b[2]) or 0, now + delay)
+
+-- Drain the bucket down to the interactive reserve, so bulk calls resume at
+-- the reduced rate rather than in a burst
+local tokens = math.min(tonumber(b[5]) or reserve_tokens, reserve_tokens)
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', backoff_until, 'factor', factor,
+           'backoff_until', backoff_until, 'strikes', strikes, 'strike_ts', strike_ts)
+redis.call('EXPIRE', KEYS[1], 86400)
+return tostring(backoff_until - now)
+"""
+
+
+class QuotaWaitExceeded(GoogleAPIError):
+    """Quota would not allow a call within the caller's maximum wait"""
+
+
+def get_quota_settings():
+    return {**DEFAULT_QUOTA, **getattr(settings, 'GOOGLE_TASKS_QUOTA', {})}
+
+
+def user_key(user_id):
+    return f'tasks:quota:user:{user_id}'
+
+
+def is_rate_limited(status, data=None):
+    """Whether a response means a quota or rate limit was hit"""
+    if status == 429:
+        return True
+    if status == 403 and isinstance(data, dict):
+        error = data.get('error')
+        if isinstance(error, dict):
+            reasons = [item.get('reason') for item in error.get('errors', []) if isinstance(item, dict)]
+            return any(reason in RATE_LIMIT_REASONS for reason in reasons)
+    return False
+
+
+def rate_limit_scope(data):
+    """USER_SCOPE if Google blamed the per-user limit, else PROJECT_SCOPE"""
+    if isinstance(data, dict) and isinstance(data.get('error'), dict):
+        for item in data['error'].get('errors', []):
+            if isinstance(item, dict) and item.get('reason') == 'userRateLimitExceeded':
+                return USER_SCOPE
+    return PROJECT_SCOPE
+
+
+class QuotaScheduler:
+    """Shared token buckets for Google Tasks calls"""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+        self._acquire = None
+        self._penalize = None
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    def _scripts(self):
+        if self._acquire is None:
+            self._acquire = self.redis.register_script(_ACQUIRE_SCRIPT)
+            self._penalize = self.redis.register_script(_PENALIZE_SCRIPT)
+        return self._acquire, self._penalize
+
+    def try_acquire(self, user_id, cost=1, priority=INTERACTIVE):
+        """Take tokens if available; returns 0, or seconds to wait before trying again"""
+        quota = get_quota_settings()
+        acquire, _ = self._scripts()
+        wait = acquire(
+            keys=[user_key(user_id), PROJECT_KEY],
+            args=[
+                time.time(),
+                cost,
+                quota['bulk_reserve'] if priority == BULK else 0,
+                quota['recovery_per_second'],
+                quota['user_rate'], quota['user_burst'],
+                quota['project_rate'], quota['project_burst'],
+            ]
+        )
+        return float(wait)
+
+    def acquire(self, user_id, cost=1, priority=INTERACTIVE, max_wait=None):
+        """Block until cost tokens are granted; raises QuotaWaitExceeded after max_wait"""
+        deadline = self._deadline(priority, max_wait)
+        waited = 0.0
+
+        while True:
+            try:
+                wait = self.try_acquire(user_id, cost, priority)
+            except Exception as e:
+                # Never block Google calls on a Redis outage
+                logger.warning(f"Quota check failed, proceeding without it: {e}")
+                return waited
+            wait = self._next_wait(wait, waited, deadline, user_id, priority)
+            if wait is None:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, user_id, cost=1, priority=INTERACTIVE, max_wait=None):
+        """acquire() for async callers: the Redis call runs in a thread, waits don't block the loop"""
+        deadline = self._deadline(priority, max_wait)
+        waited = 0.0
+
+        while True:
+            try:
+                wait = await asyncio.to_thread(self.try_acquire, user_id, cost, priority)
+            except Exception as e:
+                logger.warning(f"Quota check failed, proceeding without it: {e}")
+                return waited
+            wait = self._next_wait(wait, waited, deadline, user_id, priority)
+            if wait is None:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def _deadline(self, priority, max_wait):
+        if max_wait is None:
+            max_wait = getattr(settings, 'GOOGLE_TASKS_QUOTA_MAX_WAIT', DEFAULT_MAX_WAIT)[priority]
+        return time.monotonic() + max_wait
+
+    def _next_wait(self, wait, waited, deadline, user_id, priority):
+        """Seconds to sleep before trying again, None once granted"""
+        if wait <= 0:
+            if waited > 1:
+                logger.info(f"Waited {waited:.1f}s for Google Tasks quota (user {user_id}, {priority})")
+            return None
+
+        # Jitter so workers released by the same refill don't collide
+        wait = wait * random.uniform(1.0, 1.2)
+        if time.monotonic() + wait > deadline:
+            raise QuotaWaitExceeded(
+                f'Google Tasks quota exhausted; retry in {wait:.0f}s',
+                status=429,
+                retry_after=wait
+            )
+        return wait
+
+    def penalize(self, user_id, scope=PROJECT_SCOPE, retry_after=None):
+        """Back off a bucket after a rate-limit response; returns the delay in seconds"""
+        quota = get_quota_settings()
+        key = user_key(user_id) if scope == USER_SCOPE else PROJECT_KEY
+        burst = quota['user_burst'] if scope == USER_SCOPE else quota['project_burst']
+        try:
+            _, penalize = self._scripts()
+            delay = float(penalize(
+                keys=[key],
+                args=[
+                    time.time(), retry_after or 0, quota['min_factor'], quota['max_backoff'],
+                    quota['bulk_reserve'] * burst,
+                ]
+            ))
+        except Exception as e:
+            logger.warning(f"Failed to record Google Tasks rate limit: {e}")
+            return retry_after or 1
+        logger.warning(f"Google Tasks rate limited ({scope}, user {user_id}); backing off {delay:.1f}s")
+        return delay
+
+    def status(self):
+        """Current state of the project bucket"""
+        fields = self.redis.hgetall(PROJECT_KEY)
+        return {key.decode(): float(value) for key, value in fields.items()}
+
+
+quota_scheduler = QuotaScheduler()
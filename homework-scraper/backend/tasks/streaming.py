@@ -0,0 +1,195 @@
+"""
+Filtering, projection and NDJSON streaming of task lists
+
+GET /api/tasks/lists/<list_id>/tasks accepts, besides show_completed and
+show_hidden:
+
+    status=needsAction|completed    only tasks with that status
+    due_min=..., due_max=...        due date range (YYYY-MM-DD or RFC 3339;
+                                    due_min inclusive, due_max exclusive)
+    fields=id,title,due             fields returned for each task
+
+With Accept: application/x-ndjson (or format=ndjson) the tasks are streamed
+one JSON object per line. Filters are passed on to Google, and the next page
+is fetched while the current one is written out. At most two pages are held
+in memory, however long the list is.
+"""
+import json
+import logging
+from datetime import datetime, time, timezone
+
+from homework_scraper.fastjson import dumps
+from homework_scraper.google_api import GoogleAPIError
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+TASK_FIELDS = (
+    'id', 'title', 'notes', 'due', 'status', 'completed', 'updated',
+    'parent', 'position', 'hidden', 'webViewLink',
+)
+DEFAULT_TASK_FIELDS = ('id', 'title', 'notes', 'due', 'status', 'completed', 'updated')
+TASK_STATUSES = ('needsAction', 'completed')
+
+# Values for fields Google leaves out of a task
+FIELD_DEFAULTS = {'title': '', 'notes': '', 'status': 'needsAction'}
+
+# Fields needed to apply the filters to a task
+FILTER_FIELDS = ('id', 'status', 'hidden', 'due')
+
+
+def parse_due_bound(value):
+    """Aware datetime for a YYYY-MM-DD or RFC 3339 query parameter"""
+    try:
+        if len(value) == 10:
+            parsed = datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min)
+        else:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Invalid date: {value}')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _rfc3339(value):
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _flag(query, name, default):
+    value = query.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class TaskQuery:
+    """Filters and field projection for a task list, parsed from query parameters"""
+
+    def __init__(self, query):
+        self.show_completed = _flag(query, 'show_completed', True)
+        self.show_hidden = _flag(query, 'show_hidden', False)
+
+        self.status = query.get('status') or None
+        if self.status and self.status not in TASK_STATUSES:
+            raise ValueError(f"status must be one of: {', '.join(TASK_STATUSES)}")
+        if self.status == 'completed':
+            self.show_completed = True
+
+        self.due_min = parse_due_bound(query['due_min']) if query.get('due_min') else None
+        self.due_max = parse_due_bound(query['due_max']) if query.get('due_max') else None
+
+        if query.get('fields'):
+            self.fields = tuple(dict.fromkeys(name.strip() for name in query['fields'].split(',') if name.strip()))
+            unknown = [name for name in self.fields if name not in TASK_FIELDS]
+            if unknown or not self.fields:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(TASK_FIELDS)}")
+        else:
+            self.fields = DEFAULT_TASK_FIELDS
+
+    def upstream_params(self):
+        """Google Tasks list parameters applying the same filters"""
+        params = {
+            'showCompleted': 'true' if self.show_completed and self.status != 'needsAction' else 'false',
+            'showHidden': 'true' if self.show_hidden else 'false',
+            'fields': f"nextPageToken,items({','.join(dict.fromkeys(self.fields + FILTER_FIELDS))})",
+        }
+        if self.due_min:
+            params['dueMin'] = _rfc3339(self.due_min)
+        if self.due_max:
+            params['dueMax'] = _rfc3339(self.due_max)
+        return params
+
+    def matches(self, task):
+        status = task.get('status', 'needsAction')
+        if self.status and status != self.status:
+            return False
+        if status == 'completed' and not self.show_completed:
+            return False
+        if task.get('hidden') and not self.show_hidden:
+            return False
+        if self.due_min or self.due_max:
+            if not task.get('due'):
+                return False
+            due = parse_due_bound(task['due'])
+            if self.due_min and due < self.due_min:
+                return False
+            if self.due_max and due >= self.due_max:
+                return False
+        return True
+
+    def project(self, task):
+        return {name: task.get(name, FIELD_DEFAULTS.get(name)) for name in self.fields}
+
+    def apply(self, tasks):
+        """Matching tasks, projected"""
+        return [self.project(task) for task in tasks if self.matches(task)]
+
+
+def wants_ndjson(request):
+    return (
+        request.GET.get('format') == 'ndjson'
+        or NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+    )
+
+
+def stream_ndjson(pages, query, first_page=None):
+    """
+    Encode pages of tasks as NDJSON, one chunk per page
+
+    An upstream failure mid-stream (the status code is already sent) ends
+    the stream with an {"error": ..., "status": ...} line. The page
+    iterator is closed when the client goes away.
+    """
+    try:
+        if first_page is not None:
+            pages = _prepend(first_page, pages)
+        for page in pages:
+            chunk = _encode_page(page, query)
+            if chunk:
+                yield chunk
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while streaming tasks: {str(e)}")
+        yield json.dumps({'error': str(e), 'status': e.status}) + '\n'
+    finally:
+        close = getattr(pages, 'close', None)
+        if close:
+            close()
+
+
+def _prepend(first_page, pages):
+    try:
+        yield first_page
+        yield from pages
+    finally:
+        close = getattr(pages, 'close', None)
+        if close:
+            close()
+
+
+async def astream_ndjson(pages, query, first_page=None):
+    """stream_ndjson() over an async iterator of pages, for async views"""
+    try:
+        if first_page is not None:
+            chunk = _encode_page(first_page, query)
+            if chunk:
+                yield chunk
+        async for page in pages:
+            chunk = _encode_page(page, query)
+            if chunk:
+                yield chunk
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while streaming tasks: {str(e)}")
+        yield json.dumps({'error': str(e), 'status': e.status}) + '\n'
+    finally:
+        aclose = getattr(pages, 'aclose', None)
+        if aclose:
+            await aclose()
+
+
+def _encode_page(page, query):
+    return b''.join(
+        dumps(query.project(task)) + b'\n'
+        for task in page if query.matches(task)
+    )
@@ -0,0 +1,429 @@
+"""
+Homework -> Google Tasks sync engine
+
+Every task this app creates is tracked by a TaskSyncRecord: the remote task
+id and etag, and a sha256 of the task body that was last sent. A sync
+builds each homework item's task body, hashes it and compares it against the
+record, so that:
+
+- items with no record are inserted
+- items whose hash changed are patched
+- items whose hash is unchanged are skipped without an API call
+- records whose homework no longer exists have their task deleted
+
+All remaining writes go through the Tasks batch endpoint, and the record
+upserts, record deletes and synced_to_google_tasks flags are saved in one
+transaction. A sync with nothing to change loads the homework and the
+user's records and makes no API calls or writes.
+
+Tasks created before records existed carry a marker line in their notes
+(`homework-scraper:#<id>`); they are adopted on the user's first sync
+instead of being duplicated.
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import date, datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from homework_scraper.google_api import GoogleAPIError
+
+from .batch import BatchResult
+from .cache import task_cache
+from .google_tasks import GoogleTasksClient
+from .quota import INTERACTIVE
+from .models import TaskSyncRecord
+
+logger = logging.getLogger(__name__)
+
+MARKER_PREFIX = 'homework-scraper:#'
+_marker_re = re.compile(re.escape(MARKER_PREFIX) + r'(\d+)')
+
+# Statuses meaning the remote task is already gone
+GONE_STATUSES = (404, 410)
+
+RECORD_UPDATE_FIELDS = ['tasklist_id', 'task_id', 'etag', 'content_hash', 'synced_at']
+
+
+def get_homework_model():
+    """The scraper's homework model (TASKS_HOMEWORK_MODEL, 'app_label.Model')"""
+    return apps.get_model(getattr(settings, 'TASKS_HOMEWORK_MODEL', 'scraper.ScrapedHomework'))
+
+
+def get_default_tasklist_id():
+    return getattr(settings, 'GOOGLE_TASKS_LIST_ID', '@default')
+
+
+def format_due(value):
+    """Google Tasks only keeps the date part of `due`, as RFC 3339 midnight UTC"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return f'{value.isoformat()}T00:00:00.000Z'
+    return None
+
+
+def build_task_body(homework):
+    """Google Tasks representation of a homework item"""
+    subject = getattr(homework, 'subject', '')
+    title = f'{subject}: {homework.title}' if subject else homework.title
+
+    notes = []
+    if getattr(homework, 'description', ''):
+        notes.append(homework.description)
+    if getattr(homework, 'site', ''):
+        notes.append(f'Source: {homework.site}')
+    notes.append(f'{MARKER_PREFIX}{homework.id}')
+
+    body = {
+        'title': title[:1024],
+        'notes': '\n\n'.join(notes)[:8192],
+        'status': 'completed' if getattr(homework, 'completed', False) else 'needsAction',
+    }
+    due = format_due(getattr(homework, 'due_date', None))
+    if due:
+        body['due'] = due
+    return body
+
+
+def content_hash(body):
+    """Stable sha256 of a task body"""
+    payload = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def parse_marker(notes):
+    """Homework id from a task's notes marker, or None"""
+    match = _marker_re.search(notes or '')
+    return int(match.group(1)) if match else None
+
+
+def adopt_marked_tasks(client, user, tasklist_id):
+    """
+    Records for tasks created before sync records existed, found by marker
+
+    The records get an empty content hash so the next push patches them.
+    """
+    records = {}
+    for task in client.list_tasks(tasklist_id, showCompleted='true', showHidden='true'):
+        homework_id = parse_marker(task.get('notes'))
+        if homework_id is not None:
+            records[homework_id] = TaskSyncRecord(
+                user=user,
+                homework_id=homework_id,
+                tasklist_id=tasklist_id,
+                task_id=task['id'],
+                etag=task.get('etag', ''),
+                content_hash='',
+            )
+    logger.info(f"Adopted {len(records)} existing Google Tasks for user {user.pk}")
+    return records
+
+
+class SyncResult:
+    """Per-item outcome of a sync run"""
+
+    # Item keys for the local and remote ids
+    id_key = 'homework_id'
+    remote_id_key = 'task_id'
+
+    def __init__(self):
+        self.items = []
+        # Error that stopped the run part-way; raised once state is saved
+        self.aborted = None
+
+    def add(self, homework_id, action, success, task_id=None, error=None):
+        self.items.append({
+            self.id_key: homework_id,
+            'action': action,
+            'success': success,
+            self.remote_id_key: task_id,
+            'error': error,
+        })
+
+    @property
+    def synced_ids(self):
+        return [
+            item[self.id_key] for item in self.items
+            if item['success'] and item['action'] != 'deleted'
+        ]
+
+    @property
+    def changed_count(self):
+        return sum(
+            1 for item in self.items
+            if item['success'] and item['action'] in ('created', 'updated', 'deleted')
+        )
+
+    @property
+    def errors(self):
+        return [item for item in self.items if not item['success']]
+
+
+class SyncPlan:
+    """What a sync has to send, worked out from hashes without any API call"""
+
+    def __init__(self):
+        self.inserts = []    # (homework_id, body, hash)
+        self.patches = []    # (homework_id, body, hash, record)
+        self.deletes = []    # (record, forget) - forget=False when the task moved lists
+        self.unchanged = []  # record
+
+    @property
+    def is_empty(self):
+        return not (self.inserts or self.patches or self.deletes)
+
+
+def plan_sync(homework_items, records, tasklist_id, removed_ids=()):
+    """
+    Compare homework against its sync records
+
+    records maps homework id -> TaskSyncRecord; removed_ids are homework ids
+    whose records should have their tasks deleted.
+    """
+    plan = SyncPlan()
+    for homework in homework_items:
+        body = build_task_body(homework)
+        body_hash = content_hash(body)
+        record = records.get(homework.id)
+
+        if record is None:
+            plan.inserts.append((homework.id, body, body_hash))
+        elif record.tasklist_id != tasklist_id:
+            # Target list changed: recreate there and remove the old task
+            plan.inserts.append((homework.id, body, body_hash))
+            plan.deletes.append((record, False))
+        elif record.content_hash == body_hash:
+            plan.unchanged.append(record)
+        else:
+            plan.patches.append((homework.id, body, body_hash, record))
+
+    for homework_id in removed_ids:
+        plan.deletes.append((records[homework_id], True))
+    return plan
+
+
+def run_batch(client, operations, result, progress=None):
+    """
+    client.batch() that keeps the results received before a failure
+
+    Operations left without a result get a status 0 result carrying the
+    error, and the error is kept in result.aborted.
+    """
+    try:
+        return client.batch(operations, progress=progress)
+    except GoogleAPIError as e:
+        logger.error(f"Batch sync stopped part-way: {str(e)}")
+        result.aborted = e
+        batch_results = dict(getattr(e, 'partial_results', None) or {})
+        for op in operations:
+            if op.id not in batch_results:
+                batch_results[op.id] = BatchResult(
+                    id=op.id, status=0, headers={}, data={'error': {'message': str(e)}}
+                )
+        return batch_results
+
+
+def push_changes(client, user, tasklist_id, plan, result, progress=None):
+    """
+    Send a plan through the batch endpoint
+
+    Returns (records to upsert, homework ids whose records should be
+    deleted). Patches of tasks deleted on Google's side are re-inserted.
+    progress is passed on to GoogleTasksClient.batch. If the batch fails
+    part-way, the changes Google did apply are still returned and the
+    error is left in result.aborted.
+    """
+    upserts = []
+    forgotten = []
+    now = timezone.now()
+
+    def record_for(homework_id, data, body_hash):
+        return TaskSyncRecord(
+            user=user,
+            homework_id=homework_id,
+            tasklist_id=tasklist_id,
+            task_id=data['id'],
+            etag=data.get('etag', ''),
+            content_hash=body_hash,
+            synced_at=now,
+        )
+
+    operations = {}
+    for homework_id, body, body_hash, record in plan.patches:
+        op_id = f'hw-{homework_id}'
+        operations[op_id] = ('updated', homework_id, body, body_hash, record,
+                             client.patch_operation(op_id, tasklist_id, record.task_id, body))
+    for record, forget in plan.deletes:
+        op_id = f'del-{record.homework_id}-{record.tasklist_id}'
+        operations[op_id] = ('deleted', record.homework_id, None, None, record,
+                             client.delete_operation(op_id, record.tasklist_id, record.task_id))
+    for homework_id, body, body_hash in plan.inserts:
+        op_id = f'hw-{homework_id}'
+        operations[op_id] = ('created', homework_id, body, body_hash, None,
+                             client.insert_operation(op_id, tasklist_id, body))
+
+    batch_results = run_batch(client, [entry[-1] for entry in operations.values()], result, progress)
+
+    reinserts = []
+    forget_ids = {record.homework_id for record, forget in plan.deletes if forget}
+    for op_id, (action, homework_id, body, body_hash, record, _) in operations.items():
+        batch_result = batch_results[op_id]
+
+        if action == 'deleted':
+            if homework_id not in forget_ids:
+                # Old task of a moved item; the new record replaces this one
+                if not batch_result.ok and batch_result.status not in GONE_STATUSES:
+                    logger.warning(f"Could not delete moved task {record.task_id}: {batch_result.error}")
+                continue
+            gone = batch_result.ok or batch_result.status in GONE_STATUSES
+            if gone:
+                forgotten.append(homework_id)
+            result.add(homework_id, 'deleted', gone, task_id=record.task_id,
+                       error=None if gone else batch_result.error)
+            continue
+
+        if action == 'updated' and batch_result.status in GONE_STATUSES:
+            reinserts.append((homework_id, body, body_hash))
+            continue
+
+        if batch_result.ok:
+            upserts.append(record_for(homework_id, batch_result.data, body_hash))
+        result.add(
+            homework_id,
+            action,
+            batch_result.ok,
+            task_id=batch_result.data.get('id') if batch_result.ok else None,
+            error=batch_result.error
+        )
+
+    if reinserts and result.aborted:
+        for homework_id, _, _ in reinserts:
+            result.add(homework_id, 'created', False, error=str(result.aborted))
+    elif reinserts:
+        operations = {
+            f'hw-{homework_id}': (homework_id, body_hash, client.insert_operation(f'hw-{homework_id}', tasklist_id, body))
+            for homework_id, body, body_hash in reinserts
+        }
+        batch_results = run_batch(client, [op for _, _, op in operations.values()], result)
+        for op_id, (homework_id, body_hash, _) in operations.items():
+            batch_result = batch_results[op_id]
+            if batch_result.ok:
+                upserts.append(record_for(homework_id, batch_result.data, body_hash))
+            result.add(
+                homework_id,
+                'created',
+                batch_result.ok,
+                task_id=batch_result.data.get('id') if batch_result.ok else None,
+                error=batch_result.error
+            )
+
+    return upserts, forgotten
+
+
+def save_sync_state(user, upserts, forgotten, newly_synced_ids):
+    """Persist record changes and synced flags in one transaction"""
+    Homework = get_homework_model()
+    with transaction.atomic():
+        if upserts:
+            TaskSyncRecord.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user', 'homework_id'],
+                update_fields=RECORD_UPDATE_FIELDS,
+            )
+        if forgotten:
+            TaskSyncRecord.objects.filter(user=user, homework_id__in=forgotten).delete()
+        if newly_synced_ids:
+            Homework.objects.filter(id__in=newly_synced_ids).update(synced_to_google_tasks=True)
+
+
+def sync_homework(user, homework_ids=None, tasklist_id=None, client=None, progress=None, priority=INTERACTIVE):
+    """
+    Sync a user's homework to Google Tasks
+
+    With homework_ids, syncs those items (deleting the tasks of ids that no
+    longer exist), and nothing for an empty list; with None, syncs all of
+    the user's homework and deletes tasks whose homework was removed.
+
+    progress, if given, is called as progress(processed, total) once the
+    changes are planned and after each batch request. priority is the
+    quota priority of the Google calls (tasks/quota.py).
+
+    If Google calls fail part-way, whatever was applied is saved before
+    the error is raised.
+    """
+    result = SyncResult()
+    if homework_ids is not None and not homework_ids:
+        return result
+
+    Homework = get_homework_model()
+    tasklist_id = tasklist_id or get_default_tasklist_id()
+
+    queryset = Homework.objects.filter(user=user)
+    record_queryset = TaskSyncRecord.objects.filter(user=user)
+    if homework_ids is not None:
+        queryset = queryset.filter(id__in=homework_ids)
+        record_queryset = record_queryset.filter(homework_id__in=homework_ids)
+    homework_items = list(queryset)
+    records = {record.homework_id: record for record in record_queryset}
+
+    if not records and any(homework.synced_to_google_tasks for homework in homework_items):
+        client = client or GoogleTasksClient.for_user(user, priority=priority)
+        records = adopt_marked_tasks(client, user, tasklist_id)
+
+    found = {homework.id for homework in homework_items}
+    removed_ids = [homework_id for homework_id in records if homework_id not in found]
+    if homework_ids is not None:
+        requested = set(homework_ids)
+        removed_ids = [homework_id for homework_id in removed_ids if homework_id in requested]
+        for homework_id in homework_ids:
+            if homework_id not in found and homework_id not in records:
+                result.add(homework_id, 'skipped', False, error='Homework not found')
+
+    plan = plan_sync(homework_items, records, tasklist_id, removed_ids)
+    for record in plan.unchanged:
+        result.add(record.homework_id, 'unchanged', True, task_id=record.task_id)
+
+    total = len(plan.unchanged) + len(plan.inserts) + len(plan.patches) + len(plan.deletes)
+    processed = len(plan.unchanged)
+    on_batch = None
+    if progress:
+        progress(processed, total)
+
+        def on_batch(count):
+            nonlocal processed
+            processed = min(processed + count, total)
+            progress(processed, total)
+
+    upserts, forgotten = [], []
+    if not plan.is_empty:
+        client = client or GoogleTasksClient.for_user(user, priority=priority)
+        upserts, forgotten = push_changes(client, user, tasklist_id, plan, result, progress=on_batch)
+
+    synced = set(result.synced_ids)
+    newly_synced_ids = [
+        homework.id for homework in homework_items
+        if homework.id in synced and not homework.synced_to_google_tasks
+    ]
+    if upserts or forgotten or newly_synced_ids:
+        save_sync_state(user, upserts, forgotten, newly_synced_ids)
+
+    if not plan.is_empty:
+        for written_list_id in {tasklist_id} | {record.tasklist_id for record, _ in plan.deletes}:
+            task_cache.invalidate_list(user.pk, written_list_id)
+
+    logger.info(
+        f"Synced homework for user {user.pk}: {len(plan.inserts)} inserts, {len(plan.patches)} patches, "
+        f"{len(plan.deletes)} deletes, {len(plan.unchanged)} unchanged, {len(result.errors)} errors"
+    )
+    if result.aborted:
+        raise result.aborted
+    return result
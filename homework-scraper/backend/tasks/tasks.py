@@ -0,0 +1,122 @@
+"""
+Celery tasks for Google Tasks sync
+"""
+import json
+import logging
+import time
+
+from celery import shared_task
+from django.contrib.auth.models import User
+
+from homework_scraper.google_api import GoogleAPIError
+
+from . import coalesce, jobs
+from .models import TaskSyncRecord
+from .pull import pull_completions
+from .quota import INTERACTIVE
+from .sync import get_default_tasklist_id, sync_homework
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes to Redis
+PROGRESS_INTERVAL = 0.5
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def sync_homework_job(self, job_id, user_id, homework_ids=None, tasklist_id=None, priority=INTERACTIVE):
+    """
+    Run a queued sync and record its progress and outcome in the job state
+
+    Waits (by retrying) while another sync of the same list holds the lock,
+    then syncs whatever was coalesced into the job's pending run. If the run
+    is gone (it expired while the job waited), the job syncs the homework_ids
+    recorded with it instead.
+    """
+    lock_list_id = tasklist_id or get_default_tasklist_id()
+    if not coalesce.acquire_lock(user_id, lock_list_id, job_id):
+        raise self.retry(countdown=coalesce.LOCK_RETRY_DELAY)
+
+    try:
+        claimed, claimed_ids = coalesce.claim(user_id, lock_list_id, job_id)
+        if claimed:
+            homework_ids = claimed_ids
+        elif homework_ids is None:
+            homework_ids = jobs.get_homework_ids(job_id)
+        jobs.update_job(job_id, status=jobs.RUNNING, started_at=time.time(), homework_ids=json.dumps(homework_ids))
+        _run_sync_job(job_id, user_id, homework_ids, tasklist_id, priority, lock_list_id)
+    finally:
+        coalesce.release_lock(user_id, lock_list_id, job_id)
+
+
+def _run_sync_job(job_id, user_id, homework_ids, tasklist_id, priority, lock_list_id):
+    last_write = 0
+
+    def progress(processed, total):
+        nonlocal last_write
+        now = time.monotonic()
+        if processed >= total or now - last_write >= PROGRESS_INTERVAL:
+            jobs.set_progress(job_id, processed, total)
+            coalesce.extend_lock(user_id, lock_list_id, job_id)
+            last_write = now
+
+    try:
+        user = User.objects.get(pk=user_id)
+        result = sync_homework(
+            user, homework_ids=homework_ids, tasklist_id=tasklist_id, progress=progress, priority=priority
+        )
+    except User.DoesNotExist:
+        jobs.update_job(job_id, status=jobs.FAILED, error='User not found', finished_at=time.time())
+        return
+    except GoogleAPIError as e:
+        logger.error(f"Sync job {job_id} failed: {str(e)}")
+        jobs.update_job(job_id, status=jobs.FAILED, error=str(e), error_status=e.status or '',
+                        finished_at=time.time())
+        return
+    except Exception as e:
+        logger.error(f"Sync job {job_id} crashed: {str(e)}", exc_info=True)
+        jobs.update_job(job_id, status=jobs.FAILED, error=str(e), finished_at=time.time())
+        return
+
+    actions = {}
+    for item in result.items:
+        if item['success']:
+            actions[item['action']] = actions.get(item['action'], 0) + 1
+
+    summary = {
+        'synced_count': len(result.synced_ids),
+        'changed_count': result.changed_count,
+        'error_count': len(result.errors),
+        'actions': actions,
+    }
+    jobs.add_errors(job_id, result.errors)
+    jobs.update_job(
+        job_id,
+        status=jobs.SUCCEEDED,
+        summary=json.dumps(summary),
+        finished_at=time.time()
+    )
+    logger.info(f"Sync job {job_id} finished for user {user_id}: {summary}")
+
+
+@shared_task(ignore_result=True)
+def pull_task_completions(user_id):
+    """Copy completion changes made in Google Tasks back to one user's homework"""
+    try:
+        user = User.objects.get(pk=user_id)
+        result = pull_completions(user)
+    except User.DoesNotExist:
+        return
+    except GoogleAPIError as e:
+        logger.warning(f"Completion pull for user {user_id} failed: {str(e)}")
+        return
+    if result.errors:
+        logger.warning(f"Completion pull for user {user_id} finished with errors: {result.as_dict()}")
+
+
+@shared_task(ignore_result=True)
+def pull_all_task_completions():
+    """Queue a completion pull for every user with synced tasks (periodic)"""
+    user_ids = list(TaskSyncRecord.objects.values_list('user_id', flat=True).distinct())
+    for user_id in user_ids:
+        pull_task_completions.delay(user_id)
+    logger.info(f"Queued completion pulls for {len(user_ids)} users")
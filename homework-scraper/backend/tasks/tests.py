@@ -0,0 +1,104 @@
+from django.test import SimpleTestCase
+
+from .batch import (
+    BatchError, BatchOperation, build_batch_body, execute_batch, parse_batch_request, parse_batch_response
+)
+
+BOUNDARY = 'batch_test'
+CONTENT_TYPE = f'multipart/mixed; boundary={BOUNDARY}'
+
+
+def response_part(content_id, status_line, body=None):
+    """One part of a batch response, as Google sends it"""
+    lines = ['Content-Type: application/http']
+    if content_id is not None:
+        lines.append(f'Content-ID: <response-{content_id}>')
+    lines += ['', status_line, 'Content-Type: application/json; charset=UTF-8', '']
+    if body is not None:
+        lines.append(body)
+    return '\r\n'.join(lines)
+
+
+def response_body(*parts):
+    return ''.join(f'--{BOUNDARY}\r\n{part}\r\n' for part in parts) + f'--{BOUNDARY}--\r\n'
+
+
+class FakeResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content.encode('utf-8')
+        self.text = content
+        self.headers = headers
+
+
+class FakeSession:
+    """Answers every post with one canned response, keeping the request"""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.requests.append((url, data, headers))
+        return self.response
+
+
+class BatchEncodingTests(SimpleTestCase):
+    def test_request_round_trip(self):
+        operations = [
+            BatchOperation('hw-1', 'POST', '/tasks/v1/lists/@default/tasks', {'title': 'Matematika: 1–5 psl.'}),
+            BatchOperation('hw-2', 'PATCH', '/tasks/v1/lists/@default/tasks/abc', {'status': 'completed'},
+                           headers={'If-Match': '"etag"'}),
+            BatchOperation('hw-3', 'DELETE', '/tasks/v1/lists/@default/tasks/def'),
+        ]
+        decoded = parse_batch_request(CONTENT_TYPE, build_batch_body(operations, BOUNDARY))
+
+        self.assertEqual(
+            [(op.id, op.method, op.path, op.body) for op in decoded],
+            [(op.id, op.method, op.path, op.body) for op in operations]
+        )
+        self.assertEqual(decoded[1].headers['if-match'], '"etag"')
+
+    def test_partial_failure(self):
+        results = parse_batch_response(CONTENT_TYPE, response_body(
+            response_part('hw-1', 'HTTP/1.1 200 OK', '{"id": "task-1"}'),
+            response_part('hw-2', 'HTTP/1.1 404 Not Found', '{"error": {"code": 404, "message": "Task not found"}}'),
+            response_part('hw-3', 'HTTP/1.1 204 No Content'),
+        ))
+
+        self.assertTrue(results['hw-1'].ok)
+        self.assertEqual(results['hw-1'].data, {'id': 'task-1'})
+        self.assertFalse(results['hw-2'].ok)
+        self.assertEqual(results['hw-2'].error, 'Task not found')
+        self.assertTrue(results['hw-3'].ok)
+        self.assertEqual(results['hw-3'].data, {})
+
+    def test_missing_content_id(self):
+        session = FakeSession(FakeResponse(200, response_body(
+            response_part('hw-1', 'HTTP/1.1 200 OK', '{"id": "task-1"}'),
+            response_part(None, 'HTTP/1.1 200 OK', '{"id": "task-2"}'),
+        ), {'Content-Type': CONTENT_TYPE}))
+        operations = [
+            BatchOperation('hw-1', 'POST', '/tasks/v1/lists/@default/tasks', {'title': 'a'}),
+            BatchOperation('hw-2', 'POST', '/tasks/v1/lists/@default/tasks', {'title': 'b'}),
+        ]
+
+        results = execute_batch(session, 'https://example.com/batch', 'token', operations)
+
+        self.assertTrue(results['hw-1'].ok)
+        self.assertEqual(results['hw-2'].status, 0)
+        self.assertEqual(results['hw-2'].error, 'Missing from batch response')
+
+    def test_failed_batch(self):
+        session = FakeSession(FakeResponse(429, 'Rate limit exceeded', {'Retry-After': '30'}))
+
+        with self.assertRaises(BatchError) as raised:
+            execute_batch(session, 'https://example.com/batch', 'token', [
+                BatchOperation('hw-1', 'DELETE', '/tasks/v1/lists/@default/tasks/abc'),
+            ])
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_response_without_boundary(self):
+        with self.assertRaises(BatchError):
+            parse_batch_response('application/json', b'{}')
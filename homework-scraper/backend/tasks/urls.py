@@ -2,7 +2,11 @@
 URL configuration for Google Tasks integration
 """
 from django.urls import path
-from . import views
+from homework_scraper.async_views import sync_or_async
+from . import async_views, views
+
+get_task_lists = sync_or_async(views.get_task_lists, async_views.get_task_lists)
+get_tasks = sync_or_async(views.get_tasks, async_views.get_tasks)
 
 app_name = 'tasks'
 
@@ -11,11 +15,23 @@ urlpatterns = [
     path('sync', views.sync_homework_to_tasks, name='sync-homework-to-tasks'),
     path('sync/', views.sync_homework_to_tasks, name='sync-homework-to-tasks-slash'),
     
+    # Background sync job status
+    path('sync/jobs/<str:job_id>', views.get_sync_job, name='sync-job-status'),
+    path('sync/jobs/<str:job_id>/', views.get_sync_job, name='sync-job-status-slash'),
+    
     # Get Google Task lists
-    path('lists', views.get_task_lists, name='get-task-lists'),
-    path('lists/', views.get_task_lists, name='get-task-lists-slash'),
+    path('lists', get_task_lists, name='get-task-lists'),
+    path('lists/', get_task_lists, name='get-task-lists-slash'),
     
     # Get tasks from a specific list
-    path('lists/<str:list_id>/tasks', views.get_tasks, name='get-tasks'),
-    path('lists/<str:list_id>/tasks/', views.get_tasks, name='get-tasks-slash'),
+    path('lists/<str:list_id>/tasks', get_tasks, name='get-tasks'),
+    path('lists/<str:list_id>/tasks/', get_tasks, name='get-tasks-slash'),
+    
+    # Google Calendar: exam sync, calendar list, single exam events
+    path('calendar/exams/sync', views.sync_exams_to_calendar, name='sync-exams-to-calendar'),
+    path('calendar/exams/sync/', views.sync_exams_to_calendar, name='sync-exams-to-calendar-slash'),
+    path('calendar/calendars', views.get_calendars, name='get-calendars'),
+    path('calendar/calendars/', views.get_calendars, name='get-calendars-slash'),
+    path('calendar/exam', views.create_exam_event, name='create-exam-event'),
+    path('calendar/exam/', views.create_exam_event, name='create-exam-event-slash'),
 ]
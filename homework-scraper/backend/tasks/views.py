@@ -1,11 +1,24 @@
 """
 Views for Google Tasks integration
 """
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+import hashlib
 import json
 import logging
+from homework_scraper.fastjson import JsonResponse
+from homework_scraper.google_api import GoogleAPIError
+from . import coalesce, jobs
+from .cache import task_cache
+from .calendar_sync import build_event_body, event_id_for, get_default_calendar_id, sync_exams, upsert_event
+from .google_calendar import GoogleCalendarClient
+from .google_tasks import GoogleTasksClient
+from .streaming import NDJSON_CONTENT_TYPE, TaskQuery, stream_ndjson, wants_ndjson
+from .sync import get_default_tasklist_id
+from .tasks import sync_homework_job
 
 logger = logging.getLogger(__name__)
 
@@ -14,61 +27,171 @@ logger = logging.getLogger(__name__)
 @require_http_methods(["POST"])
 def sync_homework_to_tasks(request):
     """
-    Sync homework items to Google Tasks
+    Queue a background sync of homework items to Google Tasks
     
     POST /api/tasks/sync
     Body: {
-        "homework_ids": [1, 2, 3]  # Optional: specific homework IDs to sync
+        "homework_ids": [1, 2, 3],  # Optional: specific homework IDs to sync
+        "list_id": "..."            # Optional: target task list (default GOOGLE_TASKS_LIST_ID)
     }
     
-    Returns:
+    Returns (202):
         {
             "success": true,
-            "message": "Synced X homework items to Google Tasks",
-            "synced_count": X,
-            "errors": []
+            "job_id": "...",
+            "status": "queued",
+            "coalesced": false,         # true if merged into an already pending sync
+            "status_url": "/api/tasks/sync/jobs/<job_id>"
         }
+    
+    Requests are coalesced per user and list (tasks/coalesce.py): while a
+    sync is pending, further requests are merged into it.
     """
     try:
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        
         # Parse request body
         body = json.loads(request.body) if request.body else {}
         homework_ids = body.get('homework_ids', None)
+        tasklist_id = body.get('list_id', None)
         
-        logger.info(f"Sync request received. Homework IDs: {homework_ids}")
+        if homework_ids is not None:
+            try:
+                homework_ids = [int(homework_id) for homework_id in homework_ids]
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'homework_ids must be a list of integers'
+                }, status=400)
+            if not homework_ids:
+                # Omit homework_ids to sync everything
+                return JsonResponse({
+                    'success': False,
+                    'error': 'homework_ids must not be empty'
+                }, status=400)
         
-        # TODO: Implement actual Google Tasks sync logic
-        # This is a placeholder that returns success
-        # You need to implement:
-        # 1. Get user from request.user or session
-        # 2. Fetch homework items from database
-        # 3. Get user's Google OAuth credentials
-        # 4. Use Google Tasks API to create tasks
-        # 5. Update homework items as synced
+        logger.info(f"Sync request received. Homework IDs: {homework_ids}")
         
-        # Placeholder response
-        synced_count = len(homework_ids) if homework_ids else 0
+        new_job_id = jobs.create_job(request.user, homework_ids=homework_ids, tasklist_id=tasklist_id)
+        job_id, created = coalesce.enqueue(
+            request.user.pk, tasklist_id or get_default_tasklist_id(), new_job_id, homework_ids
+        )
+        if created:
+            sync_homework_job.apply_async(
+                (job_id, request.user.pk),
+                {'tasklist_id': tasklist_id},
+                countdown=coalesce.get_debounce()
+            )
+        else:
+            jobs.discard_job(new_job_id)
+            jobs.add_request(job_id, homework_ids)
+            logger.info(f"Sync request coalesced into job {job_id}")
         
         return JsonResponse({
             'success': True,
-            'message': f'Synced {synced_count} homework items to Google Tasks',
-            'synced_count': synced_count,
-            'errors': []
-        })
+            'job_id': job_id,
+            'status': jobs.QUEUED,
+            'coalesced': not created,
+            'status_url': reverse('tasks:sync-job-status', args=[job_id])
+        }, status=202)
         
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
             'error': 'Invalid JSON in request body'
         }, status=400)
+    
+    except Exception as e:
+        logger.error(f"Error queueing homework sync: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_sync_job(request, job_id):
+    """
+    Get the progress and outcome of a sync job
+    
+    GET /api/tasks/sync/jobs/<job_id>
+    
+    Returns:
+        {
+            "success": true,
+            "job": {
+                "job_id": "...",
+                "status": "queued|running|succeeded|failed",
+                "progress": {"processed": 40, "total": 120, "percent": 33.3},
+                "error_count": 0,
+                "errors": [{"homework_id": 1, "action": "created", "error": "..."}],
+                "summary": {"synced_count": 120, "changed_count": 12, ...},  # once succeeded
+                "error": null,                                               # set if failed
+                "created_at": ..., "started_at": ..., "finished_at": ...
+            }
+        }
+    """
+    try:
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        
+        job = jobs.get_job(job_id)
+        if not job or job['user_id'] != request.user.pk:
+            return JsonResponse({
+                'success': False,
+                'error': 'Sync job not found'
+            }, status=404)
+        
+        return JsonResponse({
+            'success': True,
+            'job': job
+        })
         
     except Exception as e:
-        logger.error(f"Error syncing homework to tasks: {str(e)}", exc_info=True)
+        logger.error(f"Error fetching sync job {job_id}: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+def _conditional_response(request, payload):
+    """
+    JSON response with an ETag of its content; 304 if the client has it
+
+    Cache-Control makes browsers revalidate every time, so unchanged data
+    costs a 304 without a body.
+    """
+    etag = '"' + hashlib.sha1(
+        json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    ).hexdigest() + '"'
+    
+    if_none_match = request.headers.get('If-None-Match', '')
+    client_etags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    if etag in client_etags or '*' in client_etags:
+        response = HttpResponse(status=304)
+    else:
+        response = JsonResponse(payload)
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _google_error_response(e):
+    return JsonResponse({
+        'success': False,
+        'error': str(e)
+    }, status=e.status if e.status in (401, 403, 404, 429) else 502)
+
+
 @require_http_methods(["GET"])
 def get_task_lists(request):
     """
@@ -76,6 +199,9 @@ def get_task_lists(request):
     
     GET /api/tasks/lists
     
+    Served from the per-user task cache (tasks/cache.py); supports
+    If-None-Match / 304.
+    
     Returns:
         {
             "success": true,
@@ -89,25 +215,30 @@ def get_task_lists(request):
         }
     """
     try:
-        # TODO: Implement actual Google Tasks API call
-        # This is a placeholder
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
         
-        return JsonResponse({
+        task_lists = [
+            {
+                'id': tasklist['id'],
+                'title': tasklist.get('title', ''),
+                'updated': tasklist.get('updated')
+            }
+            for tasklist in task_cache.get_tasklists(request.user)
+        ]
+        
+        return _conditional_response(request, {
             'success': True,
-            'task_lists': [
-                {
-                    'id': 'default',
-                    'title': 'My Tasks',
-                    'updated': '2025-10-29T12:00:00Z'
-                },
-                {
-                    'id': 'homework',
-                    'title': 'Homework',
-                    'updated': '2025-10-29T12:00:00Z'
-                }
-            ]
+            'task_lists': task_lists
         })
         
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while fetching task lists: {str(e)}")
+        return _google_error_response(e)
+        
     except Exception as e:
         logger.error(f"Error fetching task lists: {str(e)}", exc_info=True)
         return JsonResponse({
@@ -121,7 +252,13 @@ def get_tasks(request, list_id):
     """
     Get all tasks from a specific Google Task list
     
-    GET /api/tasks/lists/<list_id>/tasks
+    GET /api/tasks/lists/<list_id>/tasks?show_completed=true&show_hidden=false
+        &status=needsAction&due_min=2025-01-01&due_max=2025-02-01&fields=id,title,due
+    
+    Filters and fields are described in tasks/streaming.py. The JSON response
+    is served from the per-user task cache (tasks/cache.py) and supports
+    If-None-Match / 304. With Accept: application/x-ndjson (or
+    format=ndjson) tasks are streamed one per line in Google's order instead.
     
     Returns:
         {
@@ -138,17 +275,252 @@ def get_tasks(request, list_id):
         }
     """
     try:
-        # TODO: Implement actual Google Tasks API call
-        # This is a placeholder
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
         
-        return JsonResponse({
+        try:
+            query = TaskQuery(request.GET)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        
+        if wants_ndjson(request):
+            return _stream_tasks(request, list_id, query)
+        
+        tasks = query.apply(task_cache.get_tasks(request.user, list_id))
+        tasks.sort(key=lambda task: (not task.get('due'), task.get('due') or '', task.get('title') or ''))
+        
+        return _conditional_response(request, {
             'success': True,
-            'tasks': []
+            'tasks': tasks
         })
         
+    except GoogleAPIError as e:
+        logger.error(f"Google Tasks error while fetching tasks: {str(e)}")
+        return _google_error_response(e)
+        
     except Exception as e:
         logger.error(f"Error fetching tasks: {str(e)}", exc_info=True)
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
+
+
+def _stream_tasks(request, list_id, query):
+    """NDJSON response from a fresh cache entry, or page by page from Google"""
+    cached = task_cache.peek_tasks(request.user, list_id)
+    if cached is not None:
+        content = stream_ndjson([cached], query)
+    else:
+        client = GoogleTasksClient.for_user(request.user)
+        pages = client.iter_task_pages(list_id, prefetch=True, **query.upstream_params())
+        # Fetch the first page before answering, so auth and missing-list
+        # errors still get a proper status code
+        first_page = next(pages, [])
+        content = stream_ndjson(pages, query, first_page=first_page)
+    
+    response = StreamingHttpResponse(content, content_type=NDJSON_CONTENT_TYPE)
+    response['Cache-Control'] = 'private, no-store'
+    # Let nginx pass chunks through as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def sync_exams_to_calendar(request):
+    """
+    Sync the user's scraped exams to Google Calendar
+    
+    POST /api/tasks/calendar/exams/sync
+    Body: {
+        "exam_ids": [1, 2, 3],      # Optional: specific exam IDs to sync
+        "calendar_id": "..."        # Optional: target calendar (default GOOGLE_CALENDAR_ID)
+    }
+    
+    Unchanged exams are skipped and the rest are written in one batch
+    request (tasks/calendar_sync.py), so this runs inline.
+    
+    Returns:
+        {
+            "success": true,
+            "synced_count": 12,
+            "changed_count": 3,
+            "results": [{"exam_id": 1, "action": "created", "success": true, "event_id": "..."}],
+            "errors": []
+        }
+    """
+    try:
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        
+        body = json.loads(request.body) if request.body else {}
+        exam_ids = body.get('exam_ids', None)
+        if exam_ids is not None:
+            try:
+                exam_ids = [int(exam_id) for exam_id in exam_ids]
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'exam_ids must be a list of integers'
+                }, status=400)
+            if not exam_ids:
+                # Omit exam_ids to sync everything
+                return JsonResponse({
+                    'success': False,
+                    'error': 'exam_ids must not be empty'
+                }, status=400)
+        
+        result = sync_exams(request.user, exam_ids=exam_ids, calendar_id=body.get('calendar_id') or None)
+        
+        return JsonResponse({
+            'success': not result.errors,
+            'synced_count': len(result.synced_ids),
+            'changed_count': result.changed_count,
+            'results': result.items,
+            'errors': result.errors
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON in request body'
+        }, status=400)
+    
+    except GoogleAPIError as e:
+        logger.error(f"Google Calendar error while syncing exams: {str(e)}")
+        return _google_error_response(e)
+    
+    except Exception as e:
+        logger.error(f"Error syncing exams to calendar: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def get_calendars(request):
+    """
+    Get the user's Google calendars
+    
+    GET /api/tasks/calendar/calendars
+    
+    Returns:
+        {
+            "success": true,
+            "calendars": [{"id": "...", "summary": "...", "description": "...", "primary": true}]
+        }
+    """
+    try:
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        
+        calendars = [
+            {
+                'id': calendar['id'],
+                'summary': calendar.get('summaryOverride') or calendar.get('summary', ''),
+                'description': calendar.get('description', ''),
+                'primary': calendar.get('primary', False)
+            }
+            for calendar in GoogleCalendarClient.for_user(request.user).list_calendars()
+            if calendar.get('accessRole', 'owner') in ('owner', 'writer')
+        ]
+        
+        return _conditional_response(request, {
+            'success': True,
+            'calendars': calendars
+        })
+        
+    except GoogleAPIError as e:
+        logger.error(f"Google Calendar error while fetching calendars: {str(e)}")
+        return _google_error_response(e)
+        
+    except Exception as e:
+        logger.error(f"Error fetching calendars: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def create_exam_event(request):
+    """
+    Create (or update) a single exam event in Google Calendar
+    
+    POST /api/tasks/calendar/exam
+    Body: {
+        "title": "Math exam",
+        "date": "2025-01-15" or "2025-01-15T09:00",
+        "description": "...",       # Optional
+        "calendar_id": "..."        # Optional (default GOOGLE_CALENDAR_ID)
+    }
+    
+    The event id is derived from the title and date, so submitting the same
+    exam twice updates one event instead of creating a duplicate.
+    """
+    try:
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        
+        body = json.loads(request.body) if request.body else {}
+        title = (body.get('title') or '').strip()
+        raw_date = body.get('date') or ''
+        when = parse_datetime(raw_date) or parse_date(raw_date)
+        if not title or not when:
+            return JsonResponse({
+                'success': False,
+                'error': 'title and a valid date are required'
+            }, status=400)
+        
+        calendar_id = body.get('calendar_id') or get_default_calendar_id()
+        event_id = event_id_for(request.user.pk, f'manual:{title}:{when.isoformat()}')
+        event = upsert_event(
+            GoogleCalendarClient.for_user(request.user),
+            calendar_id,
+            event_id,
+            build_event_body(title, when, description=body.get('description') or '')
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'event': {
+                'id': event.get('id', event_id),
+                'calendar_id': calendar_id,
+                'html_link': event.get('htmlLink')
+            }
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON in request body'
+        }, status=400)
+    
+    except GoogleAPIError as e:
+        logger.error(f"Google Calendar error while creating exam event: {str(e)}")
+        return _google_error_response(e)
+    
+    except Exception as e:
+        logger.error(f"Error creating exam event: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
@@ -0,0 +1,9 @@
+"""Google Tasks warm-up steps (see homework_scraper/warmup.py)"""
+from homework_scraper.google_api import get_session
+from homework_scraper.warmup import register
+
+
+@register('google-session')
+def build_google_session():
+    """Import requests and build the worker's pooled Google API session"""
+    get_session()
@@ -10,6 +10,7 @@ import { Spinner } from "@heroui/spinner";
 import { Switch } from "@heroui/switch";
 import { addToast } from "@heroui/toast";
 import { title } from "@/components/primitives";
+import { waitForSyncJob } from "@/lib/api";
 
 // Get API base URL from environment
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || '/api';
@@ -222,9 +223,11 @@ export default function DashboardPage() {
               });
               
               if (syncResponse.ok) {
-                const syncResult = await syncResponse.json();
+                // The sync runs in the background; wait for its job to finish
+                const queued = await syncResponse.json();
+                const job = await waitForSyncJob(queued.status_url, { baseUrl: API_BASE_URL });
                 await fetchDashboardData();
-                const syncedCount = syncResult.synced_count || 0;
+                const syncedCount = job.summary?.synced_count || 0;
                 return { 
                   success: true, 
                   message: `Scraped ${scrapedCount} items and synced ${syncedCount} to Google Tasks` 
@@ -11,6 +11,7 @@ import { Spinner } from "@heroui/spinner";
 import { Modal, ModalContent, ModalHeader, ModalBody, ModalFooter, useDisclosure } from "@heroui/modal";
 import { SearchIcon } from "@/components/icons";
 import { title } from "@/components/primitives";
+import { waitForSyncJob } from "@/lib/api";
 
 interface HomeworkItem {
   id: number;
@@ -166,17 +167,23 @@ export default function HomeworkPage() {
       });
       
       if (response.ok) {
-        const result = await response.json();
-        alert(`✅ ${result.message}`);
+        // The sync runs in the background; wait for its job to finish
+        const queued = await response.json();
+        const job = await waitForSyncJob(queued.status_url, { baseUrl: API_BASE_URL });
+        const summary = job.summary!;
+        alert(
+          summary.error_count
+            ? `⚠️ Synced ${summary.synced_count} items, ${summary.error_count} failed`
+            : `✅ Synced ${summary.synced_count} items to Google Tasks`
+        );
         
-        // Update UI to show items as synced
-        if (homeworkIds) {
-          setHomework(prev => prev.map(hw => 
-            homeworkIds.includes(hw.id) ? { ...hw, synced_to_google_tasks: true } : hw
-          ));
-        } else {
-          setHomework(prev => prev.map(hw => ({ ...hw, synced_to_google_tasks: true })));
-        }
+        // Update UI to show items as synced, except those that failed
+        const failedIds = new Set(job.errors.map(error => error.homework_id));
+        setHomework(prev => prev.map(hw =>
+          (!homeworkIds || homeworkIds.includes(hw.id)) && !failedIds.has(hw.id)
+            ? { ...hw, synced_to_google_tasks: true }
+            : hw
+        ));
       } else {
         const error = await response.json();
         alert(`❌ Sync failed: ${error.error || 'Please make sure you are logged in and have connected your Google account.'}`);